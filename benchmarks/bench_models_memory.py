@@ -0,0 +1,114 @@
+"""Memory held by 100k playlist items: plain dataclasses vs. models.py.
+
+Items are decoded from JSON the way PlaylistStorage loads them, so every
+artist and URL starts out as its own string object. Run from the repo root:
+
+    python benchmarks/bench_models_memory.py [count]
+"""
+
+import json
+import os
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import MediaFile, OnlineMediaFile, SourceProvider  # noqa: E402
+
+
+# The previous definitions, for comparison
+@dataclass
+class LegacyMediaFile:
+    title: str
+    artist: str
+    duration: int
+    file_path: str
+    provider: SourceProvider = SourceProvider.local
+    note: Optional[str] = None
+
+
+@dataclass
+class LegacyOnlineMediaFile(LegacyMediaFile):
+    url: str = ""
+    source_id: Optional[str] = None
+    streaming_quality: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+
+
+def _records(count: int) -> bytes:
+    out = []
+    for i in range(count):
+        kind = i % 10
+        if kind < 7:
+            vid = f"v{i:010d}"
+            out.append({
+                "title": f"Video title number {i}",
+                "artist": f"Channel {i % 300}",
+                "duration": 200 + i % 300,
+                "file_path": "",
+                "provider": "youtube",
+                "note": None,
+                "url": f"https://www.youtube.com/watch?v={vid}",
+                "source_id": vid,
+                "streaming_quality": None,
+                "thumbnail_url": f"https://i.ytimg.com/vi/{vid}/mqdefault.jpg",
+            })
+        elif kind < 8:
+            out.append({
+                "title": f"Track {i}",
+                "artist": f"Artist {i % 200}",
+                "duration": 180,
+                "file_path": "",
+                "provider": "soundcloud",
+                "note": None,
+                "url": f"https://soundcloud.com/artist-{i % 200}/track-{i}",
+                "source_id": str(i),
+                "streaming_quality": None,
+                "thumbnail_url": None,
+            })
+        else:
+            out.append({
+                "title": f"Song {i}",
+                "artist": f"Band {i % 500}",
+                "duration": 240,
+                "file_path": f"/music/Band {i % 500}/Album/{i:05d} Song {i}.flac",
+                "provider": "local",
+                "note": None,
+            })
+    return json.dumps(out).encode()
+
+
+def _build(raw: bytes, media_cls, online_cls) -> list:  # noqa: ANN001
+    items = []
+    for d in json.loads(raw):
+        d["provider"] = SourceProvider(d["provider"])
+        items.append(online_cls(**d) if "url" in d else media_cls(**d))
+    return items
+
+
+def _measure(raw: bytes, media_cls, online_cls):  # noqa: ANN001, ANN202
+    tracemalloc.start()
+    items = _build(raw, media_cls, online_cls)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return items, current
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    raw = _records(count)
+    legacy, before = _measure(raw, LegacyMediaFile, LegacyOnlineMediaFile)
+    del legacy
+    compact, after = _measure(raw, MediaFile, OnlineMediaFile)
+    assert compact[0].url.startswith("https://www.youtube.com/watch?v=")
+    mb = 1024 * 1024
+    print(f"{count} items")
+    print(f"  plain dataclasses: {before / mb:7.1f} MB ({before / count:.0f} B/item)")
+    print(f"  models.py:         {after / mb:7.1f} MB ({after / count:.0f} B/item)")
+    print(f"  reduction:         {before / after:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
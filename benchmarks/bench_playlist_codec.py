@@ -0,0 +1,72 @@
+"""Playlist save/load throughput: the old dict-per-item JSON vs. codec rows.
+
+"legacy" is what PlaylistStorage wrote before: one dict per item and the
+whole file indented, decoded with keyword construction. "codec" is the
+current snapshot layout (compact rows, one playlist per line). Run from the
+repo root:
+
+    python benchmarks/bench_playlist_codec.py [count]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_models_memory import _records  # noqa: E402
+from models import Playlist  # noqa: E402
+from musicplayer.playlist.storage import PlaylistStorage, _dict_to_mediafile, _mediafile_to_dict  # noqa: E402
+
+
+def _timed(fn):  # noqa: ANN001, ANN202
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def _legacy_save(path: str, playlists: list) -> None:
+    data = [{"name": p.name, "media_files": [_mediafile_to_dict(it) for it in p.media_files]} for p in playlists]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+def _legacy_load(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    return [Playlist(p["name"], [_dict_to_mediafile(it) for it in p["media_files"]]) for p in raw]
+
+
+def _codec_load(path: str) -> list:
+    playlists = PlaylistStorage(path).load()
+    for p in playlists:
+        p.media_files  # decode every playlist, like the legacy load
+    return playlists
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    items = [_dict_to_mediafile(d) for d in json.loads(_records(count))]
+    playlists = [Playlist(f"Playlist {i}", items[i::20]) for i in range(20)]
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.json")
+        codec_path = os.path.join(tmp, "codec.json")
+        _, legacy_save = _timed(lambda: _legacy_save(legacy_path, playlists))
+        _, codec_save = _timed(lambda: PlaylistStorage(codec_path).save(playlists))
+        legacy_loaded, legacy_load = _timed(lambda: _legacy_load(legacy_path))
+        codec_loaded, codec_load = _timed(lambda: _codec_load(codec_path))
+        assert [p.media_files for p in codec_loaded] == [p.media_files for p in legacy_loaded]
+        legacy_mb = os.path.getsize(legacy_path) / (1024 * 1024)
+        codec_mb = os.path.getsize(codec_path) / (1024 * 1024)
+    print(f"{count} items in {len(playlists)} playlists")
+    print(f"         {'legacy':>10} {'codec':>10} {'speedup':>8}")
+    print(f"  save   {legacy_save:9.3f}s {codec_save:9.3f}s {legacy_save / codec_save:7.1f}x")
+    print(f"  load   {legacy_load:9.3f}s {codec_load:9.3f}s {legacy_load / codec_load:7.1f}x")
+    print(f"  size   {legacy_mb:8.1f}MB {codec_mb:8.1f}MB {legacy_mb / codec_mb:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -99,4 +99,8 @@ def main() -> int:
 
 
 if __name__ == "__main__":
+    # Library scans use a process pool; required for frozen Windows builds
+    import multiprocessing
+
+    multiprocessing.freeze_support()
     raise SystemExit(main())
@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+import sys
+from dataclasses import InitVar, dataclass, field
 from enum import Enum
 from typing import Optional, List
 
@@ -9,7 +10,15 @@ class SourceProvider(str, Enum):
     soundcloud = "soundcloud"
 
 
-@dataclass
+_YOUTUBE_WATCH_PREFIX = "https://www.youtube.com/watch?v="
+_YOUTUBE_THUMB_PREFIX = "https://i.ytimg.com/vi/"
+_YOUTUBE_THUMB_SUFFIX = "/mqdefault.jpg"
+_DERIVED = sys.intern("\0derived")
+
+
+# Slotted, and with repeated strings shared, so large playlists stay small in
+# memory; see benchmarks/bench_models_memory.py
+@dataclass(slots=True)
 class MediaFile:
     title: str
     artist: str
@@ -18,23 +27,80 @@ class MediaFile:
     provider: SourceProvider = SourceProvider.local
     note: Optional[str] = None
 
+    def __post_init__(self) -> None:
+        # The same few artists/channels repeat across thousands of items
+        if isinstance(self.artist, str):
+            self.artist = sys.intern(self.artist)
+        if not isinstance(self.provider, SourceProvider):
+            self.provider = SourceProvider(self.provider)
+
 @dataclass
 class Playlist:
     name: str
     media_files: List[MediaFile]
 
 
-@dataclass
+# ``url`` and ``thumbnail_url`` are constructor arguments (InitVars) backed by
+# properties, not dataclass fields: with slots a field and a property cannot
+# share a name. So ``dataclasses.fields()``/``asdict()`` list the raw ``_url``/
+# ``_thumb`` slots (which may hold the "derived" marker) instead, and
+# ``dataclasses.replace()`` resets both URLs unless they are passed again.
+# Read them through the properties; ``playlist.storage._mediafile_to_dict``
+# and ``playlist.codec`` do.
+@dataclass(slots=True)
 class OnlineMediaFile(MediaFile):
     # Defaults are required because base class ends with a default field (note)
     # and dataclass requires all non-defaults precede defaults across the MRO.
-    url: str = ""  # Source URL (YouTube watch URL or SoundCloud permalink)
+    url: InitVar[str] = ""  # Source URL (YouTube watch URL or SoundCloud permalink)
     source_id: Optional[str] = None  # e.g., YouTube video ID or SoundCloud track ID
     streaming_quality: Optional[str] = None  # e.g., '1080p', '720p', '480p'
-    thumbnail_url: Optional[str] = None
+    thumbnail_url: InitVar[Optional[str]] = None
+    # 'public', 'unlisted', 'private', 'region_blocked', 'not_embeddable' or
+    # 'unavailable' (deleted, or hidden from the API); None until checked
+    availability: Optional[str] = None
+    # url/thumbnail_url are properties; these hold them only when they differ
+    # from what source_id implies (standard YouTube watch/thumbnail URLs).
+    # _DERIVED marks "same as implied", so None/"" keep their own meaning.
+    _url: Optional[str] = field(default=None, init=False, repr=False)
+    _thumb: Optional[str] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self, url: str, thumbnail_url: Optional[str]) -> None:  # type: ignore[override]
+        MediaFile.__post_init__(self)
+        if isinstance(self.streaming_quality, str):
+            self.streaming_quality = sys.intern(self.streaming_quality)
+        if isinstance(self.availability, str):
+            self.availability = sys.intern(self.availability)
+        self.url = url
+        self.thumbnail_url = thumbnail_url
+
+    def _derived_url(self) -> str:
+        if self.provider == SourceProvider.youtube and self.source_id:
+            return _YOUTUBE_WATCH_PREFIX + self.source_id
+        return ""
+
+    def _derived_thumb(self) -> Optional[str]:
+        if self.provider == SourceProvider.youtube and self.source_id:
+            return _YOUTUBE_THUMB_PREFIX + self.source_id + _YOUTUBE_THUMB_SUFFIX
+        return None
+
+    def _get_url(self) -> str:
+        return self._derived_url() if self._url == _DERIVED else self._url  # type: ignore[return-value]
+
+    def _set_url(self, value: str) -> None:
+        self._url = _DERIVED if value and value == self._derived_url() else value
+
+    def _get_thumb(self) -> Optional[str]:
+        return self._derived_thumb() if self._thumb == _DERIVED else self._thumb
+
+    def _set_thumb(self, value: Optional[str]) -> None:
+        self._thumb = _DERIVED if value and value == self._derived_thumb() else value
+
+
+# Installed after the dataclass is built so the InitVars above keep feeding __init__
+OnlineMediaFile.url = property(OnlineMediaFile._get_url, OnlineMediaFile._set_url)  # type: ignore[assignment]
+OnlineMediaFile.thumbnail_url = property(OnlineMediaFile._get_thumb, OnlineMediaFile._set_thumb)  # type: ignore[assignment]
 
 __all__ = ["MediaFile", "Playlist", "OnlineMediaFile", "SourceProvider"]
     
     
 __all__ = ["MediaFile", "Playlist", "OnlineMediaFile"]
-    
\ No newline at end of file
@@ -14,6 +14,12 @@ import sys
 DEFAULT_CONFIG = {
     "music_root": "",
     "webengine_flags": None,
+    "scan_workers": 8,
+    "playlist_storage": "json",
+    "http_timeout": 15.0,
+    "http_retries": 3,
+    "http_cache_mb": 32,
+    "youtube_region": None,
 }
 
 DEFAULT_PLAYLISTS = []  # start with no playlists
@@ -13,6 +13,18 @@ class Config:
     music_root: str
     # Optional Chromium flags for Qt WebEngine, space-separated
     webengine_flags: Optional[str] = None
+    # Concurrent directory listings when scanning music_root (helps on SMB/NFS)
+    scan_workers: int = 8
+    # Playlist backend: "json" (playlists.json + journal) or "sqlite" (playlists.db)
+    playlist_storage: str = "json"
+    # Read timeout (seconds) and retries for YouTube/SoundCloud API requests
+    http_timeout: float = 15.0
+    http_retries: int = 3
+    # Size cap (MB) of the on-disk cache of YouTube searches/lookups; 0 disables it
+    http_cache_mb: int = 32
+    # Country (ISO 3166 code) for the availability audit's region check;
+    # None uses the system locale's
+    youtube_region: Optional[str] = None
 
 
 def _default_music_root() -> str:
@@ -32,6 +44,12 @@ def load_config(path: str = DEFAULT_CONFIG_PATH) -> Config:
     return Config(
         music_root=data.get("music_root") or _default_music_root(),
         webengine_flags=data.get("webengine_flags"),
+        scan_workers=int(data.get("scan_workers") or 8),
+        playlist_storage=data.get("playlist_storage") or "json",
+        http_timeout=float(data.get("http_timeout") or 15.0),
+        http_retries=int(data.get("http_retries") if data.get("http_retries") is not None else 3),
+        http_cache_mb=int(data.get("http_cache_mb") if data.get("http_cache_mb") is not None else 32),
+        youtube_region=data.get("youtube_region") or None,
     )
 
 
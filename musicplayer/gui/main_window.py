@@ -1,4 +1,6 @@
-from typing import Optional
+import os
+import threading
+from typing import Dict, Optional, Tuple
 
 from PySide6.QtCore import Qt
 from PySide6.QtCore import QUrl, QTimer, QThread, QObject, Signal
@@ -39,28 +41,206 @@ from MusicPlayer.config.loader import (
     set_soundcloud_client_id,
     get_soundcloud_client_id,
 )
-from MusicPlayer.playlist.manager import PlaylistManager
+from MusicPlayer.playlist.manager import PlaylistManager, item_key
+from MusicPlayer.playlist.sqlite_storage import SqlitePlaylistStorage, migrate_json
+from MusicPlayer.playlist.formats import FILE_FILTER, export_file, iter_entries, resolve_entries
+from MusicPlayer.playlist.audit import LABELS, UNPLAYABLE, AvailabilityAudit, default_region, youtube_ids
+from MusicPlayer.library.index import LibraryIndex
+from MusicPlayer.library.watcher import LibraryWatcher
+from MusicPlayer.library.dedup import find_duplicates
+from MusicPlayer.library.probe import probe_durations
+from MusicPlayer.library.query import is_structured
 from MusicPlayer.player.facade import PlayerFacade
-from MusicPlayer.search.local import search_local
-from MusicPlayer.search.youtube import search_youtube, from_url as youtube_from_url
+from MusicPlayer.search import http
+from MusicPlayer.search.cache import ResponseCache
+from MusicPlayer.search.local import iter_search_local, search_local_ranked
+from MusicPlayer.search.youtube import search_youtube, iter_playlist as youtube_playlist, from_url as youtube_from_url
 from MusicPlayer.search.soundcloud import search_soundcloud, from_url as sc_from_url
 
 
 class ImportWorker(QObject):
-    finished = Signal(list, str, str)  # items, remote_title, error
+    batch = Signal(list, str)  # items, remote_title
+    status = Signal(str)  # non-fatal problem, e.g. track details could not be looked up
+    finished = Signal(str)  # error
 
     def __init__(self, url, fetch_func):
         super().__init__()
         self.url = url
         self.fetch_func = fetch_func
+        self.cancel = threading.Event()
 
     def run(self):
-        # Only data fetching; no UI operations here
+        # Only data fetching; no UI operations here. Chunks are emitted as
+        # they arrive so the GUI thread can add them while the rest loads
         try:
-            items, remote_title = self.fetch_func(self.url)
-            self.finished.emit(items, remote_title, "")
+            chunks = self.fetch_func(self.url)
+            try:
+                for items, remote_title, warning in chunks:
+                    if self.cancel.is_set():
+                        break
+                    self.batch.emit(items, remote_title)
+                    if warning:
+                        self.status.emit(warning)
+            finally:
+                chunks.close()
+            self.finished.emit("")
+        except Exception as e:
+            self.finished.emit(str(e))
+
+
+class PlaylistFileWorker(QObject):
+    batch = Signal(list, int)  # items, missing
+    finished = Signal(str)  # error
+
+    def __init__(self, path, index):
+        super().__init__()
+        self.path = path
+        self.index = index
+
+    def run(self):
+        # Parses and resolves in chunks; the GUI thread adds each chunk
+        try:
+            base_dir = os.path.dirname(os.path.abspath(self.path))
+            for items, missing in resolve_entries(iter_entries(self.path), base_dir, self.index):
+                self.batch.emit(items, missing)
+            self.finished.emit("")
+        except Exception as e:
+            self.finished.emit(str(e))
+
+
+class SearchWorker(QObject):
+    batch = Signal(int, list)  # generation, items
+    finished = Signal(int, str)  # generation, error
+
+    def __init__(self, generation, root, query, index, cancel, workers):
+        super().__init__()
+        self.generation = generation
+        self.root = root
+        self.query = query
+        self.index = index
+        self.cancel = cancel
+        self.workers = workers
+
+    def run(self):
+        try:
+            found = False
+            for items in iter_search_local(
+                self.root, self.query, index=self.index, cancel=self.cancel, workers=self.workers
+            ):
+                found = True
+                self.batch.emit(self.generation, items)
+            # Nothing matched exactly: fall back to typo-tolerant ranked results
+            if (
+                not found
+                and self.query
+                and not is_structured(self.query)
+                and not self.cancel.is_set()
+                and self.index.is_built_for(self.root)
+            ):
+                items = search_local_ranked(self.root, self.query, self.index)
+                if items and not self.cancel.is_set():
+                    self.batch.emit(self.generation, items)
+            # First search on a new music folder streamed from a walk; build the index now
+            # (skipped if another search is already building it)
+            if not self.cancel.is_set() and self.index.build(self.root):
+                self.index.warm_fuzzy()
+            self.finished.emit(self.generation, "")
+        except Exception as e:
+            self.finished.emit(self.generation, str(e))
+
+
+class LibraryRefreshWorker(QObject):
+    finished = Signal(object, str)  # ScanDiff, error
+
+    def __init__(self, index, root):
+        super().__init__()
+        self.index = index
+        self.root = root
+
+    def run(self):
+        try:
+            self.finished.emit(self.index.refresh(self.root), "")
+        except Exception as e:
+            self.finished.emit(None, str(e))
+
+
+class DuplicateWorker(QObject):
+    finished = Signal(object, str)  # DuplicateReport, error
+
+    def __init__(self, files):
+        super().__init__()
+        self.files = files
+
+    def run(self):
+        try:
+            self.finished.emit(find_duplicates(self.files), "")
+        except Exception as e:
+            self.finished.emit(None, str(e))
+
+
+class DurationProbeWorker(QObject):
+    batch = Signal(dict)  # path -> seconds
+    probed = Signal(dict)  # path -> (mtime_ns, seconds or 0 if it could not be probed)
+    finished = Signal()
+
+    def __init__(self, paths, index, fallback, seen):
+        super().__init__()
+        self.paths = paths
+        self.index = index
+        self.fallback = fallback
+        # Results of earlier runs; files unchanged since are not probed again
+        self.seen = seen
+
+    def run(self):
+        mtimes = {}
+        results = {}
+        try:
+            known = {}
+            for path in self.paths:
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue  # missing file, nothing to probe
+                prev = self.seen.get(path)
+                if prev is not None and prev[0] == mtime:
+                    if prev[1]:
+                        known[path] = prev[1]
+                else:
+                    mtimes[path] = mtime
+            if known:
+                self.batch.emit(known)
+            for found in probe_durations(list(mtimes), index=self.index, fallback=self.fallback):
+                results.update(found)
+                self.batch.emit(found)
+            # Only a completed run tells which files could not be probed
+            self.probed.emit({path: (mtime, results.get(path, 0)) for path, mtime in mtimes.items()})
+        except Exception:
+            self.probed.emit({path: (mtimes[path], d) for path, d in results.items()})
+        finally:
+            self.finished.emit()
+
+
+class AvailabilityAuditWorker(QObject):
+    finished = Signal(object, str)  # AuditResult, error
+
+    def __init__(self, audit, api_key, ids, region, max_age):
+        super().__init__()
+        self.audit = audit
+        self.api_key = api_key
+        self.ids = ids
+        self.region = region
+        self.max_age = max_age
+
+    def run(self):
+        try:
+            self.finished.emit(self.audit.run(self.api_key, self.ids, self.region, max_age=self.max_age), "")
         except Exception as e:
-            self.finished.emit([], "", str(e))
+            self.finished.emit(None, str(e))
+
+
+class LibraryEvents(QObject):
+    # Emitted from the watcher thread; delivered to the GUI thread via Qt's queued connection
+    changed = Signal(object)  # ScanDiff
 
 
 class MainWindow(QMainWindow):
@@ -69,7 +249,18 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Music Player")
 
         self.cfg = load_config()
-        self.pm = PlaylistManager()
+        http.configure(
+            timeout=self.cfg.http_timeout,
+            retries=self.cfg.http_retries,
+            cache=ResponseCache(max_bytes=self.cfg.http_cache_mb * 1024 * 1024) if self.cfg.http_cache_mb > 0 else None,
+        )
+        storage = None
+        if self.cfg.playlist_storage == "sqlite":
+            migrate_json()  # first run on SQLite: import playlists.json
+            storage = SqlitePlaylistStorage()
+        # Saves run on a background thread, coalescing bursts of edits
+        self.pm = PlaylistManager(storage, write_delay=0.5)
+        self.library = LibraryIndex(scan_workers=self.cfg.scan_workers)
         self.player = PlayerFacade()
         self._net = QNetworkAccessManager(self)
         # Shuffle and loop state
@@ -77,6 +268,10 @@ class MainWindow(QMainWindow):
         self.loop_enabled = True  # Loop is active by default
         self._shuffled_indices = []
         self._played_indices = set()
+        # Streaming local search state; a new search cancels the previous one
+        self._search_generation = 0
+        self._search_cancel = None
+        self._search_threads = []
 
         # Left: Playlists
         self.playlists = QListWidget()
@@ -114,6 +309,9 @@ class MainWindow(QMainWindow):
         self.advanced_details = False  # Advanced details toggle
         left_box.addWidget(QLabel("Playlist Items"))
         left_box.addWidget(self.playlist_items)
+        self.playlist_info = QLabel("")
+        self.playlist_info.setStyleSheet("color:#555")
+        left_box.addWidget(self.playlist_info)
         actions_row = QHBoxLayout()
         btn_remove = QPushButton("Remove Selected")
         btn_save_order = QPushButton("Save Order")
@@ -133,6 +331,12 @@ class MainWindow(QMainWindow):
         self.source.addItems(["Local", "YouTube", "SoundCloud"])
         self.query = QLineEdit()
         self.query.setPlaceholderText("Search title...")
+        self.query.setToolTip(
+            "Local searches also accept filters, e.g.\n"
+            "artist:radiohead album:\"ok computer\" ext:flac\n"
+            "duration>300 duration:3:00..5:00 size<20mb mtime>7d dir:/music/Rock\n"
+            "sort:-mtime sort:artist"
+        )
         self.results = QListWidget()
         # Higher contrast on white background
         self.results.setStyleSheet("QListWidget { background: #fff; color: #222; selection-background-color: #e0e7ff; selection-color: #222; border: 1px solid #ccc; }")
@@ -254,6 +458,38 @@ class MainWindow(QMainWindow):
         if self.playlists.count() > 0 and self.playlists.currentRow() < 0:
             self.playlists.setCurrentRow(0)
 
+        # Keep the library index live while the window is open
+        self._watcher = None
+        self._library_events = LibraryEvents()
+        self._library_events.changed.connect(self._on_library_changed)
+        self._ensure_library_watcher()
+
+        # Unknown lengths of local items are probed in the background as
+        # playlists are opened (opening loads a playlist's items)
+        self._probe_thread = None
+        # path -> (mtime_ns, seconds or 0) of every file probed so far
+        self._probed: Dict[str, Tuple[int, int]] = {}
+        self._file_import_thread = None
+
+        # YouTube items are re-checked for removed/private/region-blocked
+        # videos shortly after start and then hourly; each run only checks
+        # the IDs whose last check is older than a day
+        self.audit = AvailabilityAudit()
+        self._audit_thread = None
+        self._audit_timer = QTimer(self)
+        self._audit_timer.setInterval(3600 * 1000)
+        self._audit_timer.timeout.connect(lambda: self._audit_availability())
+        self._audit_timer.start()
+        QTimer.singleShot(15000, lambda: self._audit_availability())
+
+        # Other processes (e.g. a headless importer) may edit the same
+        # playlists; pick up what they commit
+        self.pm.subscribe(self._on_playlists_changed)
+        self._sync_timer = QTimer(self)
+        self._sync_timer.setInterval(2000)
+        self._sync_timer.timeout.connect(self.pm.sync)
+        self._sync_timer.start()
+
     # --- UI helpers ---
     def _build_menubar(self) -> None:
         menubar = QMenuBar(self)
@@ -262,6 +498,18 @@ class MainWindow(QMainWindow):
         act_music = settings_menu.addAction("Music Folder...")
         act_music.triggered.connect(self._choose_music_folder)
 
+        act_rescan = settings_menu.addAction("Refresh Music Library")
+        act_rescan.triggered.connect(self._refresh_library)
+
+        act_dupes = settings_menu.addAction("Find Duplicate Files...")
+        act_dupes.triggered.connect(self._find_duplicates)
+
+        act_probe = settings_menu.addAction("Probe Track Durations")
+        act_probe.triggered.connect(lambda: self._probe_durations())
+
+        act_audit = settings_menu.addAction("Check YouTube Availability")
+        act_audit.triggered.connect(lambda: self._audit_availability(manual=True))
+
         act_flags = settings_menu.addAction("WebEngine Flags...")
         act_flags.triggered.connect(self._open_flags_dialog)
 
@@ -337,6 +585,7 @@ class MainWindow(QMainWindow):
     def _on_playlist_selected(self, name: str) -> None:
         p = self.pm.get(name)
         self.playlist_items.clear()
+        self._update_playlist_info()
         if not p:
             return
         if self.advanced_details:
@@ -355,23 +604,60 @@ class MainWindow(QMainWindow):
                 t.setStyleSheet("font-weight:600;color:#111")
                 sub = QLabel(getattr(it, "artist", getattr(it, "uploader", "")))
                 sub.setStyleSheet("color:#555")
+                if getattr(it, "availability", None) in UNPLAYABLE:
+                    sub.setText(f"{sub.text()} [{LABELS[it.availability]}]")
+                    t.setStyleSheet("font-weight:600;color:#999")
                 box.addWidget(t)
                 box.addWidget(sub)
                 lay.addLayout(box)
                 itemw = QListWidgetItem(self.playlist_items)
                 itemw.setSizeHint(w.sizeHint())
-                itemw.setData(Qt.UserRole, self._item_key(it))
+                itemw.setData(Qt.UserRole, item_key(it))
                 self.playlist_items.addItem(itemw)
                 self.playlist_items.setItemWidget(itemw, w)
         else:
             for it in p.media_files:
                 itemw = QListWidgetItem(it.title)
-                itemw.setData(Qt.UserRole, self._item_key(it))
+                availability = getattr(it, "availability", None)
+                if availability in UNPLAYABLE:
+                    # Keep the saved title so the user knows what went missing
+                    itemw.setText(f"{it.title} [{LABELS[availability]}]")
+                    itemw.setForeground(Qt.gray)
+                itemw.setData(Qt.UserRole, item_key(it))
                 self.playlist_items.addItem(itemw)
         # Set queue to this playlist
             self._queue_items = p.media_files[:]
             self._queue_index = -1
             self._reset_shuffle()
+        self._probe_durations(name)
+
+    def _on_playlists_changed(self, names) -> None:  # noqa: ANN001
+        cur = self._current_playlist_name()
+        if self.pm.names != [self.playlists.item(i).text() for i in range(self.playlists.count())]:
+            self.playlists.blockSignals(True)
+            self.playlists.clear()
+            self.playlists.addItems(self.pm.names)
+            for i in range(self.playlists.count()):
+                if self.playlists.item(i).text() == cur:
+                    self.playlists.setCurrentRow(i)
+                    break
+            self.playlists.blockSignals(False)
+        if cur and (names is None or cur in names):
+            self._on_playlist_selected(cur if self.pm.get(cur) else "")
+
+    def _update_playlist_info(self) -> None:
+        p = self.pm.get(self._current_playlist_name() or "")
+        if not p:
+            self.playlist_info.setText("")
+            return
+        total = sum(max(0, it.duration or 0) for it in p.media_files)
+        unknown = sum(1 for it in p.media_files if not it.duration)
+        h, rem = divmod(int(total), 3600)
+        text = f"{len(p.media_files)} items, {h}:{rem // 60:02d}:{rem % 60:02d}"
+        if unknown:
+            text += f" ({unknown} unknown)"
+        self.playlist_info.setText(text)
+
     def _toggle_shuffle(self, state):
         self.shuffle_enabled = bool(state)
         self._reset_shuffle()
@@ -394,8 +680,221 @@ class MainWindow(QMainWindow):
         if folder:
             self.cfg.music_root = folder
             save_config(self.cfg)
+            self._ensure_library_watcher()
             QMessageBox.information(self, "Saved", f"Music folder set to:\n{folder}")
 
+    def _ensure_library_watcher(self) -> None:
+        root = self.cfg.music_root
+        if self._watcher is not None:
+            if self._watcher.root == root and self._watcher.running:
+                return
+            self._watcher.stop()
+            self._watcher = None
+        # The watcher applies changes to an existing index; the first search builds it
+        if root and os.path.isdir(root) and self.library.is_built_for(root):
+            self._watcher = LibraryWatcher(self.library, root, on_change=self._library_events.changed.emit)
+            self._watcher.start()
+
+    def _on_library_changed(self, diff) -> None:  # noqa: ANN001
+        self.statusBar().showMessage(
+            f"Library updated: {len(diff.added)} added, {len(diff.removed)} removed, {len(diff.changed)} changed",
+            5000,
+        )
+
+    def _refresh_library(self) -> None:
+        root = self.cfg.music_root
+        if not root or not os.path.isdir(root):
+            QMessageBox.information(self, "Music Folder", "Set a valid music folder first.")
+            return
+        if getattr(self, "_refresh_thread", None) is not None:
+            return  # already running
+        self.statusBar().showMessage("Scanning the music folder...")
+        self._refresh_thread = QThread()
+        self._refresh_worker = LibraryRefreshWorker(self.library, root)
+        self._refresh_worker.moveToThread(self._refresh_thread)
+        self._refresh_thread.started.connect(self._refresh_worker.run)
+        self._refresh_thread.finished.connect(self._refresh_thread.deleteLater)
+        self._refresh_worker.finished.connect(self._refresh_worker.deleteLater)
+        self._refresh_worker.finished.connect(self._on_library_refreshed)
+        self._refresh_thread.start()
+
+    def _on_library_refreshed(self, diff, error) -> None:  # noqa: ANN001
+        thr = self._refresh_thread
+        self._refresh_thread = None
+        if thr is not None:
+            thr.quit()
+        self.statusBar().clearMessage()
+        if error:
+            QMessageBox.warning(self, "Library", f"Library refresh failed: {error}")
+            return
+        msg = f"Library refreshed: {self.library.count()} tracks.\n{diff.summary()}"
+        if diff.removed:
+            # Point out playlist entries that now reference missing files
+            gone = set(diff.removed)
+            missing = sum(
+                1
+                for _, it in self.pm.iter_items()
+                if it.provider == SourceProvider.local and it.file_path in gone
+            )
+            if missing:
+                msg += f"\n{missing} playlist item(s) reference removed files."
+        self._ensure_library_watcher()
+        QMessageBox.information(self, "Library", msg)
+
+    def _find_duplicates(self) -> None:
+        if getattr(self, "_dupes_thread", None) is not None:
+            return  # already running
+        # Library files plus any local playlist items outside the library
+        files = {path: sig[0] for path, sig in self.library.signatures().items()}
+        for _, it in self.pm.iter_items():
+            if it.provider == SourceProvider.local and it.file_path and it.file_path not in files:
+                try:
+                    files[it.file_path] = os.path.getsize(it.file_path)
+                except OSError:
+                    pass
+        self.statusBar().showMessage(f"Checking {len(files)} files for duplicates...")
+        self._dupes_thread = QThread()
+        self._dupes_worker = DuplicateWorker(list(files.items()))
+        self._dupes_worker.moveToThread(self._dupes_thread)
+        self._dupes_thread.started.connect(self._dupes_worker.run)
+        self._dupes_thread.finished.connect(self._dupes_thread.deleteLater)
+        self._dupes_worker.finished.connect(self._dupes_worker.deleteLater)
+        self._dupes_worker.finished.connect(self._on_duplicates_found)
+        self._dupes_thread.start()
+
+    def _on_duplicates_found(self, report, error) -> None:  # noqa: ANN001
+        thr = self._dupes_thread
+        self._dupes_thread = None
+        if thr is not None:
+            thr.quit()
+        self.statusBar().clearMessage()
+        if error:
+            QMessageBox.warning(self, "Duplicates", f"Duplicate check failed: {error}")
+            return
+        if not report.groups:
+            QMessageBox.information(self, "Duplicates", f"No duplicates among {report.files_considered} files.")
+            return
+        copies = sum(len(g) - 1 for g in report.groups)
+        preview = "\n".join(" = ".join(g) for g in report.groups[:10])
+        if len(report.groups) > 10:
+            preview += f"\n... and {len(report.groups) - 10} more"
+        answer = QMessageBox.question(
+            self,
+            "Duplicates",
+            f"{copies} redundant copies in {len(report.groups)} groups "
+            f"({report.wasted_bytes / (1024 * 1024):.1f} MB).\n\n{preview}\n\n"
+            "Collapse duplicates in all playlists to a single copy?",
+        )
+        if answer == QMessageBox.Yes:
+            changed = self.pm.collapse_duplicates(report.canonical_map())
+            self._on_playlist_selected(self._current_playlist_name() or "")
+            QMessageBox.information(self, "Duplicates", f"Updated {changed} playlist item(s).")
+
+    def _probe_durations(self, name: Optional[str] = None) -> None:
+        if self._probe_thread is not None:
+            return  # already running
+        playlists = [self.pm.get(name)] if name else self.pm.all()
+        paths = {
+            it.file_path
+            for p in playlists
+            if p
+            for it in p.media_files
+            if it.provider == SourceProvider.local and not it.duration and it.file_path
+        }
+        if not paths:
+            return
+        self.statusBar().showMessage(f"Probing durations of {len(paths)} tracks...")
+        self._probe_thread = QThread()
+        self._probe_worker = DurationProbeWorker(
+            sorted(paths), self.library, self.player.local.parse_length_ms, dict(self._probed)
+        )
+        self._probe_worker.moveToThread(self._probe_thread)
+        self._probe_thread.started.connect(self._probe_worker.run)
+        self._probe_thread.finished.connect(self._probe_thread.deleteLater)
+        self._probe_worker.batch.connect(self._on_durations_probed)
+        self._probe_worker.probed.connect(self._probed.update)
+        self._probe_worker.finished.connect(self._probe_worker.deleteLater)
+        self._probe_worker.finished.connect(self._on_probe_finished)
+        self._probe_thread.start()
+
+    def _on_durations_probed(self, durations) -> None:  # noqa: ANN001
+        # One playlists.json write per batch, not per track
+        if self.pm.update_durations(durations):
+            self._update_playlist_info()
+
+    def _on_probe_finished(self) -> None:
+        thr = self._probe_thread
+        self._probe_thread = None
+        if thr is not None:
+            thr.quit()
+        self.statusBar().clearMessage()
+
+    def _audit_availability(self, manual: bool = False) -> None:
+        if self._audit_thread is not None:
+            return  # already running
+        api_key = get_youtube_api_key()
+        if not api_key:
+            if manual:
+                QMessageBox.warning(self, "YouTube", "Set a YouTube API key first (Settings → Edit API Keys).")
+            return
+        ids = youtube_ids(self.pm)
+        if not ids:
+            if manual:
+                QMessageBox.information(self, "YouTube", "No YouTube items in any playlist.")
+            return
+        self.statusBar().showMessage(f"Checking availability of {len(ids)} YouTube videos...")
+        self._audit_manual = manual
+        self._audit_thread = QThread()
+        region = self.cfg.youtube_region or default_region()
+        # Asked for explicitly: check every ID now, not only the due ones
+        self._audit_worker = AvailabilityAuditWorker(self.audit, api_key, ids, region, 0.0 if manual else None)
+        self._audit_worker.moveToThread(self._audit_thread)
+        self._audit_thread.started.connect(self._audit_worker.run)
+        self._audit_thread.finished.connect(self._audit_thread.deleteLater)
+        self._audit_worker.finished.connect(self._audit_worker.deleteLater)
+        self._audit_worker.finished.connect(self._on_audit_finished)
+        self._audit_thread.start()
+
+    def _on_audit_finished(self, result, error: str) -> None:  # noqa: ANN001
+        thr = self._audit_thread
+        self._audit_thread = None
+        if thr is not None:
+            thr.quit()
+        self.statusBar().clearMessage()
+        if error:
+            self.statusBar().showMessage(f"YouTube availability check failed: {error}", 10000)
+            if self._audit_manual:
+                QMessageBox.warning(self, "YouTube", f"Availability check failed:\n{error}")
+            return
+        if self.pm.update_availability(result.availability):
+            self._on_playlist_selected(self._current_playlist_name() or "")
+        lost = [vid for vid, (_, now) in result.changes.items() if now in UNPLAYABLE]
+        back = [vid for vid, (before, now) in result.changes.items() if before in UNPLAYABLE and now not in UNPLAYABLE]
+        if not lost and not back:
+            if self._audit_manual:
+                QMessageBox.information(
+                    self, "YouTube", f"Checked {result.checked} videos; nothing changed since the last check."
+                )
+            return
+        # Only the listed ones need a title; first hit per id, then stop
+        wanted = set(lost[:20])
+        titles = {}
+        for name, it in self.pm.iter_items():
+            if not wanted:
+                break
+            if it.provider == SourceProvider.youtube and it.source_id in wanted:
+                wanted.discard(it.source_id)
+                titles[it.source_id] = (f"{it.artist} - {it.title}" if it.artist else it.title, name)
+        lines = [
+            f"{titles[vid][0]} ({LABELS[result.changes[vid][1]]}, in '{titles[vid][1]}')" for vid in lost[:20] if vid in titles
+        ]
+        if len(lost) > 20:
+            lines.append(f"... and {len(lost) - 20} more")
+        text = f"{len(lost)} video(s) can no longer be played:\n" + "\n".join(lines) if lost else ""
+        if back:
+            text += ("\n\n" if text else "") + f"{len(back)} video(s) are available again."
+        QMessageBox.information(self, "YouTube Availability", text)
+
     def _open_env_dialog(self) -> None:
         dlg = QDialog(self)
         dlg.setWindowTitle("API Keys (.env)")
@@ -462,8 +961,11 @@ class MainWindow(QMainWindow):
             return
         menu = QMenu(self.playlists)
         act_rename = menu.addAction("Rename...")
+        act_export = menu.addAction("Export...")
         chosen = menu.exec_(self.playlists.mapToGlobal(pos))
-        if chosen == act_rename:
+        if chosen == act_export:
+            self._export_playlist(item.text())
+        elif chosen == act_rename:
             old = item.text()
             new, ok = QInputDialog.getText(self, "Rename Playlist", "New name", QLineEdit.Normal, old)
             if ok and new.strip() and new.strip() != old:
@@ -495,7 +997,11 @@ class MainWindow(QMainWindow):
         url_inp = QLineEdit()
         url_inp.setPlaceholderText("Paste YouTube or SoundCloud playlist URL...")
         lay.addWidget(QLabel("Playlist URL"))
-        lay.addWidget(url_inp)
+        url_row = QHBoxLayout()
+        url_row.addWidget(url_inp)
+        btn_file = QPushButton("From File...")
+        url_row.addWidget(btn_file)
+        lay.addLayout(url_row)
         target_box = QComboBox()
         target_box.addItem("<Create New>")
         for n in self.pm.names:
@@ -525,12 +1031,42 @@ class MainWindow(QMainWindow):
             self._import_buttons = buttons
             self._import_status_lbl = status_lbl
             self._import_target_box = target_box
-            # Cleanup and connect finished signal to a MainWindow method
+            # Target playlist is settled on the first chunk; chunks arriving
+            # before that wait in _import_pending
+            self._import_target = None
+            self._import_pending = []
+            self._import_added = 0
+            self._import_resolving = False
+            self._import_error = None  # set once the worker has finished
+            self._import_warning = None
+            # Cleanup and connect signals to MainWindow methods
             self._import_thread.finished.connect(self._import_thread.deleteLater)
+            self._import_worker.batch.connect(self._on_import_batch)
+            self._import_worker.status.connect(self._on_import_status)
             self._import_worker.finished.connect(self._import_worker.deleteLater)
             self._import_worker.finished.connect(self._on_import_finished)
             self._import_thread.start()
 
+        def do_import_file() -> None:
+            path, _ = QFileDialog.getOpenFileName(self, "Import Playlist File", "", FILE_FILTER)
+            if not path:
+                return
+            target = target_box.currentText()
+            if target == "<Create New>":
+                default_name = os.path.splitext(os.path.basename(path))[0]
+                target, ok = QInputDialog.getText(self, "New Playlist Name", "Name", QLineEdit.Normal, default_name)
+                target = target.strip()
+                if not ok or not target:
+                    return
+                if target in self.pm.names:
+                    QMessageBox.warning(self, "Exists", f"Playlist '{target}' already exists.")
+                    return
+                self.pm.create(target)
+                self.playlists.addItem(target)
+            dlg.accept()
+            self._import_playlist_file(path, target)
+
+        btn_file.clicked.connect(do_import_file)
         buttons.accepted.connect(do_import)
         buttons.rejected.connect(dlg.reject)
         # Non-modal to keep main UI interactive
@@ -538,9 +1074,69 @@ class MainWindow(QMainWindow):
         dlg.setModal(False)
         dlg.show()
 
+    def _import_playlist_file(self, path: str, target: str) -> None:
+        if getattr(self, "_file_import_thread", None) is not None:
+            QMessageBox.information(self, "Import", "Another playlist file is still being imported.")
+            return
+        self._file_import_target = target
+        self._file_import_counts = [0, 0]  # added, missing
+        self.statusBar().showMessage(f"Importing {os.path.basename(path)}...")
+        self._file_import_thread = QThread()
+        self._file_import_worker = PlaylistFileWorker(path, self.library)
+        self._file_import_worker.moveToThread(self._file_import_thread)
+        self._file_import_thread.started.connect(self._file_import_worker.run)
+        self._file_import_thread.finished.connect(self._file_import_thread.deleteLater)
+        self._file_import_worker.batch.connect(self._on_playlist_file_batch)
+        self._file_import_worker.finished.connect(self._file_import_worker.deleteLater)
+        self._file_import_worker.finished.connect(self._on_playlist_file_imported)
+        self._file_import_thread.start()
+
+    def _on_playlist_file_batch(self, items, missing) -> None:  # noqa: ANN001
+        target = self._file_import_target
+        if self.pm.get(target) is None:
+            return  # deleted meanwhile
+        self._file_import_counts[0] += self.pm.add_many(target, items)
+        self._file_import_counts[1] += missing
+        self.statusBar().showMessage(f"Importing into '{target}': {self._file_import_counts[0]} items...")
+
+    def _on_playlist_file_imported(self, error) -> None:  # noqa: ANN001
+        thr = self._file_import_thread
+        self._file_import_thread = None
+        if thr is not None:
+            thr.quit()
+        self.statusBar().clearMessage()
+        target = self._file_import_target
+        added, missing = self._file_import_counts
+        if self._current_playlist_name() == target:
+            self._on_playlist_selected(target)
+        if error:
+            QMessageBox.warning(self, "Import Failed", f"{error}\n({added} items were imported before the error.)")
+            return
+        msg = f"Imported {added} items into '{target}'."
+        if missing:
+            msg += f"\n{missing} local file(s) were not found; they are kept in the playlist."
+        QMessageBox.information(self, "Import", msg)
+        self._probe_durations(target)
+
+    def _export_playlist(self, name: str) -> None:
+        path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Export Playlist",
+            f"{name}.m3u8",
+            "M3U8 (*.m3u8);;M3U (*.m3u);;PLS (*.pls);;XSPF (*.xspf)",
+        )
+        if not path:
+            return
+        try:
+            n = export_file(self.pm, name, path)
+        except Exception as e:
+            QMessageBox.warning(self, "Export Failed", str(e))
+            return
+        QMessageBox.information(self, "Export", f"Wrote {n} entries to {path}.")
+
     def _fetch_playlist_url(self, url: str):  # noqa: ANN001
+        """Yield ``(items, remote_title, warning)`` chunks of the playlist at ``url``."""
         from urllib.parse import urlparse, parse_qs
-        import requests
         api_key = get_youtube_api_key()
         sc_client_id = get_soundcloud_client_id()
         u = urlparse(url)
@@ -553,43 +1149,15 @@ class MainWindow(QMainWindow):
                 raise RuntimeError("Not a YouTube playlist URL (missing list parameter).")
             if not api_key:
                 raise RuntimeError("YouTube API key not configured.")
-            yt_api = "https://www.googleapis.com/youtube/v3/playlistItems"
-            params = {
-                "part": "snippet",
-                "playlistId": playlist_id,
-                "maxResults": 50,
-                "key": api_key,
-            }
-            items = []
-            remote_title = None
-            while True:
-                r = requests.get(yt_api, params=params, timeout=15)
-                if r.status_code != 200:
-                    if r.status_code in (401, 403):
-                        raise RuntimeError("YouTube playlist is private or inaccessible (HTTP 403/401).")
-                    raise RuntimeError(f"YouTube API error {r.status_code}: {r.text[:200]}")
-                data = r.json()
-                if remote_title is None:
-                    remote_title = data.get("items", [{}])[0].get("snippet", {}).get("channelTitle") or "YouTube Playlist"
-                for it in data.get("items", []):
-                    snip = it.get("snippet", {})
-                    vid = snip.get("resourceId", {}).get("videoId")
-                    title = snip.get("title") or "(untitled)"
-                    channel = snip.get("videoOwnerChannelTitle") or snip.get("channelTitle") or ""
-                    thumb = snip.get("thumbnails", {}).get("default", {}).get("url")
-                    if vid:
-                        items.append(OnlineMediaFile(title=title, artist=channel, duration=0, file_path="", provider=SourceProvider.youtube, url=f"https://www.youtube.com/watch?v={vid}", source_id=vid, thumbnail_url=thumb))
-                token = data.get("nextPageToken")
-                if not token:
-                    break
-                params["pageToken"] = token
-            return items, remote_title
+            for page in youtube_playlist(api_key, playlist_id):
+                yield page.items, page.title, page.warning
+            return
         # Detect SoundCloud playlist (sets)
         if "soundcloud" in host:
             if not sc_client_id:
                 raise RuntimeError("SoundCloud client id not configured.")
-            resolve = "https://api.soundcloud.com/resolve"
-            rv = requests.get(resolve, params={"url": url, "client_id": sc_client_id}, timeout=15)
+            resolve = http.soundcloud_url("resolve")
+            rv = http.get(resolve, params={"url": url, "client_id": sc_client_id})
             if rv.status_code != 200:
                 if rv.status_code in (401, 403):
                     raise RuntimeError("SoundCloud playlist is private or inaccessible (HTTP 403/401).")
@@ -608,10 +1176,84 @@ class MainWindow(QMainWindow):
                 permalink = track.get("permalink_url") or ""
                 thumb = (track.get("artwork_url") or "").replace("large", "t500x500") if track.get("artwork_url") else None
                 items.append(OnlineMediaFile(title=title, artist=artist, duration=duration, file_path="", provider=SourceProvider.soundcloud, url=permalink, source_id=str(tid) if tid else None, thumbnail_url=thumb))
-            return items, remote_title
+            yield items, remote_title, None
+            return
         raise RuntimeError("Unrecognized or unsupported playlist URL.")
 
-    def _on_import_finished(self, items, remote_title, error) -> None:  # noqa: ANN001
+    def _on_import_batch(self, items, remote_title) -> None:  # noqa: ANN001
+        if self._import_target is None:
+            self._import_pending.extend(items)
+            if self._import_resolving or not self._import_pending:
+                return
+            # The name dialog runs a nested event loop; further chunks (and
+            # the finished signal) queue up meanwhile
+            self._import_resolving = True
+            target = self._resolve_import_target(remote_title)
+            self._import_resolving = False
+            if target is None:
+                self._import_worker.cancel.set()
+                self._import_pending = []
+                self._reset_import_dialog()
+                return
+            self._import_target = target
+            items, self._import_pending = self._import_pending, []
+            if self._import_error is not None:
+                self._add_imported(items)
+                self._complete_import()
+                return
+        self._add_imported(items)
+
+    def _on_import_status(self, warning: str) -> None:
+        self._import_warning = warning
+        lbl = getattr(self, "_import_status_lbl", None)
+        if lbl is not None:
+            lbl.setText(f"Some track details could not be loaded: {warning}")
+
+    def _resolve_import_target(self, remote_title: str) -> Optional[str]:
+        target_box = getattr(self, "_import_target_box", None)
+        target = target_box.currentText() if target_box is not None else "<Create New>"
+        if target != "<Create New>":
+            return target if self.pm.get(target) is not None else None
+        default_name = remote_title or "Imported Playlist"
+        new_name, ok = QInputDialog.getText(self, "New Playlist Name", "Name", QLineEdit.Normal, default_name)
+        if not ok or not new_name.strip():
+            return None
+        new_name = new_name.strip()
+        if new_name in self.pm.names:
+            QMessageBox.warning(self, "Exists", f"Playlist '{new_name}' already exists.")
+            return None
+        self.pm.create(new_name)
+        self.playlists.addItem(new_name)
+        return new_name
+
+    def _add_imported(self, items) -> None:  # noqa: ANN001
+        target = self._import_target
+        if not items or self.pm.get(target) is None:
+            return
+        self.pm.add_many(target, items)
+        self._import_added += len(items)
+        if self._current_playlist_name() == target:
+            for it in items:
+                itemw = QListWidgetItem(it.title)
+                itemw.setData(Qt.UserRole, item_key(it))
+                self.playlist_items.addItem(itemw)
+            self._queue_items.extend(items)
+            self._update_playlist_info()
+        status_lbl = getattr(self, "_import_status_lbl", None)
+        try:
+            if status_lbl is not None:
+                status_lbl.setText(f"Importing... {self._import_added} items so far.")
+        except Exception:
+            pass
+
+    def _reset_import_dialog(self) -> None:
+        try:
+            self._import_buttons.setEnabled(True)
+            self._import_status_lbl.setText("")
+        except Exception:
+            pass
+
+    def _on_import_finished(self, error) -> None:  # noqa: ANN001
         # Ensure worker thread is asked to quit; do not wait here
         thr = getattr(self, "_import_thread", None)
         if thr is not None and thr.isRunning():
@@ -619,55 +1261,35 @@ class MainWindow(QMainWindow):
                 thr.quit()
             except Exception:
                 pass
+        self._import_error = error
+        if self._import_resolving:
+            return  # completed once the target is chosen
+        if self._import_worker.cancel.is_set():
+            return  # the user dismissed the name dialog
+        self._complete_import()
+
+    def _complete_import(self) -> None:
         dlg = getattr(self, "_import_dlg", None)
-        buttons = getattr(self, "_import_buttons", None)
-        status_lbl = getattr(self, "_import_status_lbl", None)
-        target_box = getattr(self, "_import_target_box", None)
-        if not (dlg and buttons and status_lbl and target_box):
+        if not (dlg and getattr(self, "_import_buttons", None) and getattr(self, "_import_status_lbl", None)):
             return
+        error = self._import_error
+        target = self._import_target
         if error:
+            if self._import_added:
+                error += f"\n({self._import_added} items were imported into '{target}' before the error.)"
             QMessageBox.warning(self, "Import Failed", error)
-            try:
-                buttons.setEnabled(True)
-                status_lbl.setText("")
-            except Exception:
-                pass
+            self._reset_import_dialog()
             return
-        if not items:
+        if target is None:
             QMessageBox.information(self, "Empty", "No items found in playlist.")
-            try:
-                buttons.setEnabled(True)
-                status_lbl.setText("")
-            except Exception:
-                pass
+            self._reset_import_dialog()
             return
-        target = target_box.currentText()
-        if target == "<Create New>":
-            default_name = remote_title or "Imported Playlist"
-            new_name, ok = QInputDialog.getText(self, "New Playlist Name", "Name", QLineEdit.Normal, default_name)
-            if not ok or not new_name.strip():
-                buttons.setEnabled(True)
-                status_lbl.setText("")
-                return
-            new_name = new_name.strip()
-            if new_name in self.pm.names:
-                QMessageBox.warning(self, "Exists", f"Playlist '{new_name}' already exists.")
-                buttons.setEnabled(True)
-                status_lbl.setText("")
-                return
-            self.pm.create(new_name)
-            target = new_name
-            self.playlists.addItem(new_name)
-        for it in items:
-            self.pm.add(target, it)
-        if self._current_playlist_name() == target:
-            for it in items:
-                itemw = QListWidgetItem(it.title)
-                itemw.setData(Qt.UserRole, self._item_key(it))
-                self.playlist_items.addItem(itemw)
-            self._queue_items.extend(items)
-        QMessageBox.information(self, "Imported", f"Imported {len(items)} items into '{target}'.")
-        status_lbl.setText("Import complete.")
+        self._probe_durations(target)
+        msg = f"Imported {self._import_added} items into '{target}'."
+        if self._import_warning:
+            msg += f"\nDurations and availability of some items could not be looked up:\n{self._import_warning}"
+        QMessageBox.information(self, "Imported", msg)
+        self._import_status_lbl.setText("Import complete.")
         try:
             dlg.accept()
         except Exception:
@@ -677,9 +1299,13 @@ class MainWindow(QMainWindow):
         source = self.source.currentText()
         query = self.query.text().strip()
         self.results.clear()
+        if self._search_cancel is not None:
+            self._search_cancel.set()
+        self._search_generation += 1
         if source == "Local":
-            items = search_local(self.cfg.music_root, query)
-        elif source == "YouTube":
+            self._start_local_search(query)
+            return
+        if source == "YouTube":
             api_key = get_youtube_api_key()
             if not api_key:
                 QMessageBox.information(self, "YouTube API Key", "Create a .env file and set YOUTUBE_API_KEY=... to enable YouTube search.")
@@ -706,6 +1332,42 @@ class MainWindow(QMainWindow):
         # stash found items for add/play
         self._found_items = items  # type: ignore[attr-defined]
 
+    def _start_local_search(self, query: str) -> None:
+        self._search_cancel = threading.Event()
+        self._found_items = []  # type: ignore[attr-defined]
+        thread = QThread()
+        worker = SearchWorker(
+            self._search_generation,
+            self.cfg.music_root,
+            query,
+            self.library,
+            self._search_cancel,
+            self.cfg.scan_workers,
+        )
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.batch.connect(self._on_search_batch)
+        worker.finished.connect(thread.quit)
+        worker.finished.connect(self._on_search_finished)
+        worker.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        # Keep references until the thread is done
+        self._search_threads.append((thread, worker))
+        thread.finished.connect(lambda: self._search_threads.remove((thread, worker)))
+        thread.start()
+
+    def _on_search_finished(self, generation: int, error: str) -> None:
+        if error and generation == self._search_generation:
+            self.statusBar().showMessage(f"Local search failed: {error}", 5000)
+        # A first search may just have built the index; start watching it
+        self._ensure_library_watcher()
+
+    def _on_search_batch(self, generation: int, items) -> None:  # noqa: ANN001
+        if generation != self._search_generation:
+            return  # results from a cancelled search
+        self._append_results(items)
+        self._found_items.extend(items)  # type: ignore[attr-defined]
+
     def _add_selected_to_playlist(self) -> None:
         name = self._current_playlist_name()
         if not name:
@@ -721,6 +1383,7 @@ class MainWindow(QMainWindow):
         if cur == name:
             self.playlist_items.addItem(QListWidgetItem(item.title))
             self._queue_items.append(item)
+            self._update_playlist_info()
         QMessageBox.information(self, "Added", f"Added '{item.title}' to '{name}'.")
 
     def _toggle_pause(self) -> None:
@@ -816,9 +1479,10 @@ class MainWindow(QMainWindow):
             pass
 
     def _populate_results(self, items) -> None:  # noqa: ANN001
-        from PySide6.QtGui import QPixmap
-        import requests as _req
         self.results.clear()
+        self._append_results(items)
+
+    def _append_results(self, items) -> None:  # noqa: ANN001
         for it in items:
             w = QWidget()
             lay = QHBoxLayout(w)
@@ -863,15 +1527,6 @@ class MainWindow(QMainWindow):
         except Exception:
             pass
 
-    def _item_key(self, it) -> str:  # noqa: ANN001
-        prov = getattr(it, "provider", None)
-        prov_val = prov.value if hasattr(prov, "value") else str(prov)
-        if prov_val == "local":
-            return f"{prov_val}:{getattr(it, 'file_path', '')}"
-        # online
-        sid = getattr(it, "source_id", None)
-        url = getattr(it, "url", None)
-        return f"{prov_val}:{sid or url or ''}"
     def _play_next(self) -> None:
         if not self._queue_items:
             return
@@ -963,31 +1618,26 @@ class MainWindow(QMainWindow):
         rows = sorted([self.playlist_items.row(item) for item in selected_items], reverse=True)
         for row in rows:
             self.playlist_items.takeItem(row)
-            self.pm.remove(name, row)
             if 0 <= row < len(self._queue_items):
                 del self._queue_items[row]
+        self.pm.remove_many(name, rows)
         # Adjust queue index if needed
         if self._queue_index >= len(self._queue_items):
             self._queue_index = len(self._queue_items) - 1
+        self._update_playlist_info()
 
     def _save_playlist_order(self) -> None:
         name = self._current_playlist_name()
         if not name:
             return
-        # Read order from list widget and rebuild items accordingly
+        # Read order from list widget; the manager maps keys (duplicates
+        # included) back to the items they came from
         keys = [self.playlist_items.item(i).data(Qt.UserRole) for i in range(self.playlist_items.count())]
-        # Stable match by key order against current queue
-        keymap = {self._item_key(it): it for it in self._queue_items}
-        new_items = [keymap[k] for k in keys if k in keymap]
-        # Persist by replacing the playlist contents
         try:
-            from MusicPlayer.playlist.manager import PlaylistManager
-            # Using existing manager to persist
             p = self.pm.get(name)
             if p:
-                p.media_files = new_items
-                self.pm._persist()  # type: ignore[attr-defined]
-                self._queue_items = new_items
+                self.pm.reorder(name, keys)
+                self._queue_items = p.media_files[:]
                 QMessageBox.information(self, "Saved", "Playlist order saved.")
         except Exception:
             QMessageBox.warning(self, "Error", "Failed to save order.")
@@ -1043,12 +1693,39 @@ class MainWindow(QMainWindow):
             # Also remove from queue and playlist manager
             name = self._current_playlist_name()
             if name:
+                self.pm.remove_many(name, rows)
                 for row in reversed(rows):
-                    self.pm.remove(name, row)
                     if 0 <= row < len(self._queue_items):
                         del self._queue_items[row]
-                        
+                self._update_playlist_info()
+
     def _open_edit_playlist_window(self):
         from MusicPlayer.gui.playlist_edit_window import PlaylistEditWindow
-        dlg = PlaylistEditWindow(self)
-        dlg.exec()
\ No newline at end of file
+        dlg = PlaylistEditWindow(self, pm=self.pm)
+        # The editor holds on to playlist objects a reload would replace
+        self._sync_timer.stop()
+        dlg.exec()
+        self._sync_timer.start()
+        self.pm.sync()
+        # The editor works on the same manager; show its changes here
+        self._on_playlist_selected(self._current_playlist_name() or "")
+
+    def closeEvent(self, event) -> None:  # noqa: ANN001, N802
+        if self._search_cancel is not None:
+            self._search_cancel.set()
+        if self._watcher is not None:
+            self._watcher.stop()
+        if self._probe_thread is not None:
+            self._probe_thread.quit()
+            self._probe_thread.wait(2000)
+        if self._file_import_thread is not None:
+            self._file_import_thread.quit()
+            self._file_import_thread.wait(2000)
+        if self._audit_thread is not None:
+            self._audit_thread.quit()
+            self._audit_thread.wait(2000)
+        self._audit_timer.stop()
+        self.audit.close()
+        self._sync_timer.stop()
+        self.pm.close()
+        super().closeEvent(event)
@@ -4,13 +4,13 @@ from PySide6.QtWidgets import (
 from PySide6.QtNetwork import QNetworkAccessManager, QNetworkRequest
 from PySide6.QtCore import QUrl
 from PySide6.QtCore import Qt
-from MusicPlayer.playlist.manager import PlaylistManager
+from MusicPlayer.playlist.manager import PlaylistManager, item_key
 
 class PlaylistEditWindow(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, pm=None):
         super().__init__(parent)
         self.setWindowTitle("Edit Playlists")
-        self.pm = PlaylistManager()
+        self.pm = pm or PlaylistManager()
         self.selected_playlist1 = None
         self.selected_playlist2 = None
         self._build_ui()
@@ -83,19 +83,10 @@ class PlaylistEditWindow(QDialog):
                 lay.addLayout(box)
                 itemw = QListWidgetItem(self.list1)
                 itemw.setSizeHint(w.sizeHint())
-                itemw.setData(Qt.UserRole, self._item_key(it))
+                itemw.setData(Qt.UserRole, item_key(it))
                 self.list1.addItem(itemw)
                 self.list1.setItemWidget(itemw, w)
 
-    def _item_key(self, it):
-        prov = getattr(it, "provider", None)
-        prov_val = prov.value if hasattr(prov, "value") else str(prov)
-        if prov_val == "local":
-            return f"{prov_val}:{getattr(it, 'file_path', '')}"
-        sid = getattr(it, "source_id", None)
-        url = getattr(it, "url", None)
-        return f"{prov_val}:{sid or url or ''}"
-
     def _load_thumb(self, url, label):
         try:
             from PySide6.QtNetwork import QNetworkRequest
@@ -147,7 +138,7 @@ class PlaylistEditWindow(QDialog):
                 lay.addLayout(box)
                 itemw = QListWidgetItem(self.list2)
                 itemw.setSizeHint(w.sizeHint())
-                itemw.setData(Qt.UserRole, self._item_key(it))
+                itemw.setData(Qt.UserRole, item_key(it))
                 self.list2.addItem(itemw)
                 self.list2.setItemWidget(itemw, w)
 
@@ -164,7 +155,7 @@ class PlaylistEditWindow(QDialog):
         if chosen == act_remove:
             for row in reversed(rows):
                 list_widget.takeItem(row)
-                self._remove_from_playlist(which, row)
+            self._remove_from_playlist(which, rows)
         elif chosen == act_move_up:
             for row in rows:
                 if row > 0:
@@ -176,11 +167,11 @@ class PlaylistEditWindow(QDialog):
                     item = list_widget.takeItem(row)
                     list_widget.insertItem(row + 1, item)
 
-    def _remove_from_playlist(self, which, row):
+    def _remove_from_playlist(self, which, rows):
         if which == 1 and self.selected_playlist1:
-            self.pm.remove(self.selected_playlist1, row)
+            self.pm.remove_many(self.selected_playlist1, rows)
         elif which == 2 and self.selected_playlist2:
-            self.pm.remove(self.selected_playlist2, row)
+            self.pm.remove_many(self.selected_playlist2, rows)
 
     def _copy_1to2(self):
         if not self.selected_playlist1 or not self.selected_playlist2:
@@ -189,16 +180,9 @@ class PlaylistEditWindow(QDialog):
         if not selected:
             return
         p1 = self.pm.get(self.selected_playlist1)
-        p2 = self.pm.get(self.selected_playlist2)
-        # Build set of keys for playlist 2
-        keys2 = set(self._item_key(it) for it in p2.media_files)
-        for item in selected:
-            idx = self.list1.row(item)
-            mf = p1.media_files[idx]
-            key = self._item_key(mf)
-            if key in keys2:
-                continue  # Skip duplicates
-            self.pm.add(self.selected_playlist2, mf)
+        picked = [p1.media_files[self.list1.row(item)] for item in selected]
+        # Items already in playlist 2 are skipped
+        if self.pm.add_many(self.selected_playlist2, picked, unique=True):
             self._load_playlist2(self.selected_playlist2)
 
     def _copy_2to1(self):
@@ -208,14 +192,7 @@ class PlaylistEditWindow(QDialog):
         if not selected:
             return
         p2 = self.pm.get(self.selected_playlist2)
-        p1 = self.pm.get(self.selected_playlist1)
-        # Build set of keys for playlist 1
-        keys1 = set(self._item_key(it) for it in p1.media_files)
-        for item in selected:
-            idx = self.list2.row(item)
-            mf = p2.media_files[idx]
-            key = self._item_key(mf)
-            if key in keys1:
-                continue  # Skip duplicates
-            self.pm.add(self.selected_playlist1, mf)
+        picked = [p2.media_files[self.list2.row(item)] for item in selected]
+        # Items already in playlist 1 are skipped
+        if self.pm.add_many(self.selected_playlist1, picked, unique=True):
             self._load_playlist1(self.selected_playlist1)
@@ -0,0 +1,14 @@
+__all__ = [
+    "DuplicateReport",
+    "LibraryIndex",
+    "LibraryWatcher",
+    "ScanDiff",
+    "TrackTags",
+    "TrigramIndex",
+    "compile_query",
+    "find_duplicates",
+    "probe_durations",
+    "read_tags",
+    "rescan",
+    "walk_media",
+]
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""Find byte-identical media files without hashing the whole library.
+
+Candidates are narrowed in three stages: files are bucketed by size (free,
+the index already knows it), same-size files are compared by a hash of a
+head/tail sample, and only files whose samples collide are hashed in full.
+Hashing runs in a process pool; most libraries end up fully hashing a tiny
+fraction of their files.
+"""
+
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+SAMPLE_BYTES = 64 * 1024
+_CHUNK = 1024 * 1024
+# Below this many files a process pool costs more to start than it saves
+_POOL_THRESHOLD = 32
+
+
+@dataclass
+class DuplicateReport:
+    groups: List[List[str]] = field(default_factory=list)  # canonical path first
+    files_considered: int = 0
+    sample_hashed: int = 0
+    full_hashed: int = 0
+    wasted_bytes: int = 0  # size of every non-canonical copy
+
+    def canonical_map(self) -> Dict[str, str]:
+        """Map every redundant copy to the path that should replace it."""
+        return {dup: group[0] for group in self.groups for dup in group[1:]}
+
+
+def _sample_digest(job: Tuple[str, int]) -> Tuple[str, Optional[str]]:
+    path, size = job
+    h = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, "rb") as f:
+            h.update(f.read(SAMPLE_BYTES))
+            if size > 2 * SAMPLE_BYTES:
+                f.seek(size - SAMPLE_BYTES)
+                h.update(f.read(SAMPLE_BYTES))
+            elif size > SAMPLE_BYTES:
+                h.update(f.read())
+    except OSError:
+        return path, None
+    return path, h.hexdigest()
+
+
+def _full_digest(job: Tuple[str, int]) -> Tuple[str, Optional[str]]:
+    path, _ = job
+    h = hashlib.blake2b(digest_size=32)
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(_CHUNK), b""):
+                h.update(chunk)
+    except OSError:
+        return path, None
+    return path, h.hexdigest()
+
+
+def _run(
+    fn: Callable[[Tuple[str, int]], Tuple[str, Optional[str]]],
+    jobs: List[Tuple[str, int]],
+    pool: Optional[ProcessPoolExecutor],
+) -> Iterator[Tuple[str, Optional[str]]]:
+    if pool is None or len(jobs) < _POOL_THRESHOLD:
+        return map(fn, jobs)
+    return pool.map(fn, jobs, chunksize=16)
+
+
+def _group_by(results: Iterable[Tuple[str, Optional[str]]], sizes: Dict[str, int]) -> List[List[str]]:
+    buckets: Dict[Tuple[int, str], List[str]] = {}
+    for path, digest in results:
+        if digest is not None:
+            buckets.setdefault((sizes[path], digest), []).append(path)
+    return [paths for paths in buckets.values() if len(paths) > 1]
+
+
+def find_duplicates(files: Iterable[Tuple[str, int]], workers: Optional[int] = None) -> DuplicateReport:
+    """Group identical files among ``(path, size)`` pairs.
+
+    Within each group the shortest path (then alphabetical) is treated as
+    the canonical copy. Empty files are ignored.
+    """
+    sizes: Dict[str, int] = {}
+    by_size: Dict[int, List[str]] = {}
+    for path, size in files:
+        if size <= 0 or path in sizes:
+            continue
+        sizes[path] = size
+        by_size.setdefault(size, []).append(path)
+    report = DuplicateReport(files_considered=len(sizes))
+
+    stage2 = [(p, size) for size, paths in by_size.items() if len(paths) > 1 for p in paths]
+    report.sample_hashed = len(stage2)
+    if not stage2:
+        return report
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers != 1 and len(stage2) >= _POOL_THRESHOLD else None
+    try:
+        confirmed: List[List[str]] = []
+        stage3: List[Tuple[str, int]] = []
+        for group in _group_by(_run(_sample_digest, stage2, pool), sizes):
+            if sizes[group[0]] <= 2 * SAMPLE_BYTES:
+                confirmed.append(group)  # the sample covered the whole file
+            else:
+                stage3.extend((p, sizes[p]) for p in group)
+        report.full_hashed = len(stage3)
+        confirmed.extend(_group_by(_run(_full_digest, stage3, pool), sizes))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    for group in confirmed:
+        group.sort(key=lambda p: (len(p), p))
+        report.groups.append(group)
+        report.wasted_bytes += sizes[group[0]] * (len(group) - 1)
+    report.groups.sort()
+    return report
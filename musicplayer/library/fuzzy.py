@@ -0,0 +1,154 @@
+"""In-memory trigram index for typo-tolerant, word-order-independent search.
+
+Every document (a track's title, artist, album and path tokens) is broken
+into lowercase words, each padded with a space on both sides and cut into
+trigrams. Queries are ranked by the share of their trigrams a document
+contains, so "floyd pink" and "pink floid" still find "Pink Floyd - Time".
+
+Postings are compact ``array('I')`` lists of internal slot numbers. Updates
+append a new slot and tombstone the old one; the index compacts itself when
+tombstones pile up.
+"""
+
+import heapq
+import re
+import unicodedata
+from array import array
+from collections import Counter
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Trigrams present in more than this share of documents are skipped when
+# gathering candidates (like stop words); they carry little signal and
+# would dominate query time on large libraries.
+_STOP_SHARE = 0.05
+_STOP_MIN_DF = 2000
+_COMPACT_SHARE = 0.25
+# Documents scored at most when a query has only frequent trigrams
+_MAX_COMMON_CANDIDATES = 5000
+
+
+def _normalize(text: str) -> str:
+    text = text.lower()
+    if text.isascii():
+        return text
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def trigrams(text: str) -> Set[str]:
+    grams: Set[str] = set()
+    add = grams.add
+    for word in _WORD_RE.findall(_normalize(text)):
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            add(padded[i:i + 3])
+    return grams
+
+
+class TrigramIndex:
+    def __init__(self) -> None:
+        self._postings: Dict[str, array] = {}
+        self._keys: List[Optional[str]] = []  # slot -> key (None when tombstoned)
+        self._sizes = array("I")  # slot -> number of distinct trigrams
+        self._slots: Dict[str, int] = {}  # key -> live slot
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._slots
+
+    def add(self, key: str, text: str) -> None:
+        """Index ``text`` under ``key``, replacing any previous entry."""
+        self.discard(key)
+        slot = len(self._keys)
+        grams = trigrams(text)
+        self._keys.append(key)
+        self._sizes.append(len(grams))
+        self._slots[key] = slot
+        postings = self._postings
+        for g in grams:
+            lst = postings.get(g)
+            if lst is None:
+                postings[g] = array("I", (slot,))
+            else:
+                lst.append(slot)
+
+    def add_many(self, docs: Iterable[Tuple[str, str]]) -> None:
+        for key, text in docs:
+            self.add(key, text)
+
+    def discard(self, key: str) -> None:
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return
+        self._keys[slot] = None
+        self._dead += 1
+        if self._dead > _COMPACT_SHARE * len(self._keys) and self._dead > 1000:
+            self._compact()
+
+    def _compact(self) -> None:
+        remap = {}
+        keys: List[Optional[str]] = []
+        sizes = array("I")
+        for old, key in enumerate(self._keys):
+            if key is not None:
+                remap[old] = len(keys)
+                keys.append(key)
+                sizes.append(self._sizes[old])
+        postings: Dict[str, array] = {}
+        for g, lst in self._postings.items():
+            kept = array("I", (remap[s] for s in lst if s in remap))
+            if kept:
+                postings[g] = kept
+        self._postings, self._keys, self._sizes = postings, keys, sizes
+        self._slots = {k: i for i, k in enumerate(keys)}
+        self._dead = 0
+
+    def search(self, query: str, limit: int = 50, min_score: float = 0.4) -> List[Tuple[str, float]]:
+        """Return up to ``limit`` ``(key, score)`` pairs, best first.
+
+        ``score`` is the fraction of the query's (informative) trigrams found
+        in the document; ties prefer documents with fewer trigrams overall.
+        """
+        query_grams = trigrams(query)
+        grams = [g for g in query_grams if g in self._postings]
+        total = len(query_grams)
+        if not grams:
+            return []
+        stop_df = max(_STOP_MIN_DF, int(_STOP_SHARE * len(self._keys)))
+        grams.sort(key=lambda g: len(self._postings[g]))
+        informative = [g for g in grams if len(self._postings[g]) <= stop_df]
+        counts: Counter = Counter()
+        if informative:
+            for g in informative:
+                counts.update(self._postings[g])
+        else:
+            # Only frequent trigrams (e.g. "the"): take documents holding the
+            # two rarest, up to a cap, instead of counting every posting
+            informative = grams[:2]
+            rarest = self._postings[grams[0]]
+            if len(grams) > 1:
+                other = set(self._postings[grams[1]])
+                common = (s for s in rarest if s in other)
+            else:
+                common = iter(rarest)
+            counts.update(dict.fromkeys(islice(common, _MAX_COMMON_CANDIDATES), len(informative)))
+        # Unknown trigrams (typos) still count against the score; skipped
+        # frequent ones do not.
+        denom = total - (len(grams) - len(informative))
+        need = max(1, int(min_score * denom + 0.999))
+        keys, sizes = self._keys, self._sizes
+        hits = heapq.nlargest(
+            limit,
+            (
+                (n / denom, n / (sizes[slot] or 1), keys[slot])
+                for slot, n in counts.items()
+                if n >= need and keys[slot] is not None
+            ),
+        )
+        return [(key, score) for score, _, key in hits]
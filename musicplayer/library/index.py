@@ -0,0 +1,462 @@
+"""Persistent local library index.
+
+Tracks found under ``music_root`` are stored in a SQLite database next to
+``playlists.json`` so that local searches are answered from an index instead
+of walking the whole tree on every query. When the bundled SQLite supports
+FTS5, title/artist/album/filename are full-text indexed; otherwise searches
+fall back to a ``LIKE`` scan of the same table.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from models import MediaFile, SourceProvider
+from .fuzzy import TrigramIndex
+from .query import compile_query
+from .scanner import ScanDiff, StatSignature, rescan
+from .tags import read_tags_many
+
+
+DEFAULT_LIBRARY_PATH = os.path.join(os.getcwd(), "library.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS tracks (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    dir TEXT NOT NULL,
+    name TEXT NOT NULL,
+    ext TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    artist TEXT NOT NULL DEFAULT '',
+    album TEXT NOT NULL DEFAULT '',
+    duration INTEGER NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL DEFAULT 0,
+    mtime REAL NOT NULL DEFAULT 0,
+    inode INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS tracks_dir ON tracks(dir);
+-- Back the range filters and sorts of structured queries (see query.py)
+CREATE INDEX IF NOT EXISTS tracks_ext ON tracks(ext);
+CREATE INDEX IF NOT EXISTS tracks_duration ON tracks(duration);
+CREATE INDEX IF NOT EXISTS tracks_size ON tracks(size);
+CREATE INDEX IF NOT EXISTS tracks_mtime ON tracks(mtime);
+-- File-name lookups when resolving imported playlists (see resolve())
+CREATE INDEX IF NOT EXISTS tracks_name ON tracks(name COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime REAL NOT NULL
+);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS tracks_fts USING fts5(
+    title, artist, album, name,
+    content='tracks', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS tracks_ai AFTER INSERT ON tracks BEGIN
+    INSERT INTO tracks_fts(rowid, title, artist, album, name)
+    VALUES (new.id, new.title, new.artist, new.album, new.name);
+END;
+CREATE TRIGGER IF NOT EXISTS tracks_ad AFTER DELETE ON tracks BEGIN
+    INSERT INTO tracks_fts(tracks_fts, rowid, title, artist, album, name)
+    VALUES ('delete', old.id, old.title, old.artist, old.album, old.name);
+END;
+CREATE TRIGGER IF NOT EXISTS tracks_au AFTER UPDATE ON tracks BEGIN
+    INSERT INTO tracks_fts(tracks_fts, rowid, title, artist, album, name)
+    VALUES ('delete', old.id, old.title, old.artist, old.album, old.name);
+    INSERT INTO tracks_fts(rowid, title, artist, album, name)
+    VALUES (new.id, new.title, new.artist, new.album, new.name);
+END;
+"""
+
+_TRACK_COLUMNS = "tracks.path, tracks.title, tracks.artist, tracks.duration"
+
+
+def _norm_root(root: str) -> str:
+    return os.path.normcase(os.path.abspath(root)) if root else ""
+
+
+def _fuzzy_text(path: str, title: str, artist: str, album: str) -> str:
+    # Folder names usually carry artist/album for untagged files
+    parts = os.path.normpath(os.path.splitext(path)[0]).split(os.sep)[-3:]
+    return " ".join([title, artist, album] + parts)
+
+
+def _path_parts(path: str) -> List[str]:
+    # Either separator, so playlists written on another OS still split
+    return [part for part in re.split(r"[\\/]", path.lower()) if part]
+
+
+def _common_tail(a: List[str], b: List[str]) -> int:
+    n = 0
+    while n < len(a) and n < len(b) and a[-1 - n] == b[-1 - n]:
+        n += 1
+    return n
+
+
+def _row_to_mediafile(row: Tuple[str, str, str, int]) -> MediaFile:
+    path, title, artist, duration = row
+    return MediaFile(
+        title=title or os.path.splitext(os.path.basename(path))[0],
+        artist=artist or "",
+        duration=int(duration or 0),
+        file_path=path,
+        provider=SourceProvider.local,
+    )
+
+
+class LibraryIndex:
+    def __init__(self, path: str = DEFAULT_LIBRARY_PATH, scan_workers: int = 1, tag_workers: Optional[int] = None):
+        self.path = path
+        # Worker threads used when (re)scanning; >1 helps on network mounts
+        self.scan_workers = scan_workers
+        # Processes used to read embedded tags (None = one per CPU)
+        self.tag_workers = tag_workers
+        # Trigram index for ranked search; built on first use (outside
+        # ``_lock``), then kept in sync by re-reading paths touched since the
+        # last ranked query
+        self._fuzzy: Optional[TrigramIndex] = None
+        self._fuzzy_dirty: Set[str] = set()
+        self._fuzzy_building = False
+        self._fuzzy_build_lock = threading.Lock()
+        self._lock = threading.RLock()
+        # Held for a whole refresh, so two scans never run (and clear each
+        # other's work) at once
+        self._refresh_lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        try:
+            self._conn.executescript(_FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5; searches use LIKE instead
+            self.has_fts = False
+        self._conn.commit()
+
+    # --- metadata ---
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: Optional[str]) -> None:
+        self._conn.execute(
+            "INSERT INTO meta(key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    @property
+    def root(self) -> Optional[str]:
+        with self._lock:
+            return self._get_meta("root")
+
+    def is_built_for(self, root: str) -> bool:
+        """True when the index has been populated from ``root`` at least once."""
+        with self._lock:
+            return bool(root) and self._get_meta("root") == _norm_root(root)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+
+    # --- population ---
+    def signatures(self, dirpath: Optional[str] = None) -> Dict[str, StatSignature]:
+        """Stored stat signatures, for the whole index or a single directory."""
+        with self._lock:
+            if dirpath is None:
+                rows = self._conn.execute("SELECT path, size, mtime, inode FROM tracks").fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT path, size, mtime, inode FROM tracks WHERE dir = ?", (dirpath,)
+                ).fetchall()
+        return {path: (size, mtime, inode) for path, size, mtime, inode in rows}
+
+    def dirs(self) -> Dict[str, Tuple[Optional[str], float]]:
+        """Known directories as ``path -> (parent, mtime)``."""
+        with self._lock:
+            rows = self._conn.execute("SELECT path, parent, mtime FROM dirs").fetchall()
+        return {path: (parent, mtime) for path, parent, mtime in rows}
+
+    def upsert_many(self, rows: Iterable[Tuple[str, int, float, int]]) -> int:
+        """Insert or refresh tracks given ``(path, size, mtime, inode)`` tuples."""
+        wire = []
+        for path, size, mtime, inode in rows:
+            dirpath, name = os.path.split(path)
+            stem, ext = os.path.splitext(name)
+            wire.append((path, dirpath, name, ext.lower(), stem, size, mtime, inode))
+        if not wire:
+            return 0
+        with self._lock, self._conn:
+            self._touch(w[0] for w in wire)
+            self._conn.executemany(
+                "INSERT INTO tracks(path, dir, name, ext, title, size, mtime, inode) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET "
+                "size = excluded.size, mtime = excluded.mtime, inode = excluded.inode",
+                wire,
+            )
+        return len(wire)
+
+    def _touch(self, paths: Iterable[str]) -> None:
+        if self._fuzzy is not None or self._fuzzy_building:
+            self._fuzzy_dirty.update(paths)
+
+    def set_tags(self, rows: Iterable[Tuple[str, str, str, str, int]]) -> int:
+        """Apply ``(path, title, artist, album, duration)`` rows; empty values keep the current ones."""
+        wire = list(rows)
+        if not wire:
+            return 0
+        with self._lock, self._conn:
+            self._touch(w[0] for w in wire)
+            self._conn.executemany(
+                "UPDATE tracks SET "
+                "title = CASE WHEN ?2 != '' THEN ?2 ELSE title END, "
+                "artist = CASE WHEN ?3 != '' THEN ?3 ELSE artist END, "
+                "album = CASE WHEN ?4 != '' THEN ?4 ELSE album END, "
+                "duration = CASE WHEN ?5 > 0 THEN ?5 ELSE duration END "
+                "WHERE path = ?1",
+                wire,
+            )
+        return len(wire)
+
+    def update_tags(self, paths: Iterable[str], batch_size: int = 500) -> int:
+        """Read embedded tags for ``paths`` (in a process pool) and store them."""
+        batch: List[Tuple[str, str, str, str, int]] = []
+        done = 0
+        for row in read_tags_many(paths, self.tag_workers):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                done += self.set_tags(batch)
+                batch = []
+        return done + self.set_tags(batch)
+
+    def remove_paths(self, paths: Iterable[str]) -> int:
+        wire = [(p,) for p in paths]
+        if not wire:
+            return 0
+        with self._lock, self._conn:
+            self._touch(w[0] for w in wire)
+            self._conn.executemany("DELETE FROM tracks WHERE path = ?", wire)
+        return len(wire)
+
+    def set_dirs(self, rows: Iterable[Tuple[str, Optional[str], float]]) -> None:
+        """Record ``(path, parent, mtime)`` for directories that were listed."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO dirs(path, parent, mtime) VALUES (?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET parent = excluded.parent, mtime = excluded.mtime",
+                rows,
+            )
+
+    def remove_dirs(self, paths: Iterable[str]) -> None:
+        wire = [(p,) for p in paths]
+        with self._lock, self._conn:
+            if self._fuzzy is not None or self._fuzzy_building:
+                for w in wire:
+                    self._touch(r[0] for r in self._conn.execute("SELECT path FROM tracks WHERE dir = ?", w))
+            self._conn.executemany("DELETE FROM tracks WHERE dir = ?", wire)
+            self._conn.executemany("DELETE FROM dirs WHERE path = ?", wire)
+
+    def remove_tree(self, dirpath: str) -> List[str]:
+        """Forget ``dirpath`` and everything below it; returns the removed track paths."""
+        prefix = dirpath.rstrip(os.sep) + os.sep
+        args = (len(prefix), prefix)
+        with self._lock:
+            dirs = [dirpath] + [
+                r[0] for r in self._conn.execute("SELECT path FROM dirs WHERE substr(path, 1, ?) = ?", args)
+            ]
+            removed = [
+                r[0] for r in self._conn.execute("SELECT path FROM tracks WHERE substr(path, 1, ?) = ?", args)
+            ]
+            self.remove_paths(removed)
+            self.remove_dirs(dirs)
+        return removed
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._fuzzy, self._fuzzy_building, self._fuzzy_dirty = None, False, set()
+            self._conn.execute("DELETE FROM tracks")
+            self._conn.execute("DELETE FROM dirs")
+            self._set_meta("root", None)
+
+    def refresh(self, root: str, deep: bool = False, workers: Optional[int] = None) -> ScanDiff:
+        """Bring the index in line with ``root`` and return what changed.
+
+        Directories whose mtime is unchanged since the last scan are not
+        re-listed; see ``scanner.rescan`` for details.
+        """
+        with self._refresh_lock:
+            if not self.is_built_for(root):
+                self.clear()
+            diff = rescan(self, root, deep=deep, workers=workers or self.scan_workers)
+            self.update_tags(diff.added + diff.changed)
+            with self._lock, self._conn:
+                self._set_meta("root", _norm_root(root))
+            return diff
+
+    def build(self, root: str) -> bool:
+        """Build the index for ``root`` unless it is built or a scan is running.
+
+        Unlike ``refresh`` this never waits for another thread's scan, so
+        callers that only need the index eventually (e.g. each search) don't
+        pile up. Returns True if this call built it.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            if self.is_built_for(root):
+                return False
+            self.refresh(root)
+            return True
+        finally:
+            self._refresh_lock.release()
+
+    # --- queries ---
+    def _search_sql(self, query: str) -> Tuple[str, Tuple]:
+        """SQL for ``query``, which may use the filters described in ``query.py``."""
+        cq = compile_query((query or "").strip(), self.has_fts)
+        sql = f"SELECT {_TRACK_COLUMNS} FROM tracks"
+        where, params = list(cq.where), list(cq.params)
+        if cq.match:
+            sql += " JOIN tracks_fts ON tracks_fts.rowid = tracks.id"
+            where.insert(0, "tracks_fts MATCH ?")
+            params.insert(0, cq.match)
+        if cq.words:
+            pattern = "%" + " ".join(cq.words).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            where.append("tracks.name LIKE ? ESCAPE '\\'")
+            params.append(pattern)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        order = cq.order or (["rank"] if cq.match else ["tracks.dir", "tracks.name"])
+        if where:
+            # Keep the planner on the filter's index (then sort the matches)
+            # rather than walking an ORDER BY index and filtering every row
+            order = ["+" + o if o.startswith("tracks.") else o for o in order]
+        return sql + " ORDER BY " + ", ".join(order), tuple(params)
+
+    def search(self, query: str = "", limit: Optional[int] = None) -> List[MediaFile]:
+        sql, params = self._search_sql(query)
+        if limit:
+            sql, params = sql + " LIMIT ?", params + (limit,)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [_row_to_mediafile(r) for r in rows]
+
+    def iter_search(self, query: str = "", batch_size: int = 200) -> Iterator[List[MediaFile]]:
+        """Like ``search`` but yields results in batches as rows are fetched."""
+        sql, params = self._search_sql(query)
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute(sql, params)
+        try:
+            while True:
+                with self._lock:
+                    rows = cur.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield [_row_to_mediafile(r) for r in rows]
+        finally:
+            cur.close()
+
+    def _rows_for(self, paths: List[str]) -> Dict[str, Tuple]:
+        out: Dict[str, Tuple] = {}
+        for i in range(0, len(paths), 500):
+            chunk = paths[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            for row in self._conn.execute(
+                f"SELECT path, title, artist, duration, album FROM tracks WHERE path IN ({marks})", chunk
+            ):
+                out[row[0]] = row
+        return out
+
+    def durations(self, paths: Iterable[str]) -> Dict[str, int]:
+        """Known durations (seconds) for indexed ``paths``; unknown ones are omitted."""
+        with self._lock:
+            rows = self._rows_for(list(paths))
+        return {path: row[3] for path, row in rows.items() if row[3] > 0}
+
+    def resolve(self, paths: Iterable[str]) -> Dict[str, MediaFile]:
+        """Indexed tracks for playlist entry ``paths``, keyed by the path as given.
+
+        Paths not in the index are matched by file name, preferring the
+        track whose folders match most of the entry's trailing folders (a
+        playlist written on another machine or before the library moved).
+        Paths with no match are left out.
+        """
+        paths = list(paths)
+        with self._lock:
+            rows = self._rows_for(paths)
+            missing = [path for path in paths if path not in rows]
+            names = list({_path_parts(path)[-1] for path in missing if _path_parts(path)})
+            by_name: Dict[str, List[Tuple]] = {}
+            for i in range(0, len(names), 500):
+                chunk = names[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                for row in self._conn.execute(
+                    f"SELECT path, title, artist, duration, name FROM tracks WHERE name COLLATE NOCASE IN ({marks})",
+                    chunk,
+                ):
+                    by_name.setdefault(row[4].lower(), []).append(row[:4])
+        out = {path: _row_to_mediafile(rows[path][:4]) for path in paths if path in rows}
+        for path in missing:
+            parts = _path_parts(path)
+            candidates = by_name.get(parts[-1]) if parts else None
+            if candidates:
+                best = max(candidates, key=lambda row: _common_tail(parts, _path_parts(row[0])))
+                out[path] = _row_to_mediafile(best)
+        return out
+
+    def warm_fuzzy(self) -> None:
+        """Build the trigram index if it isn't built yet.
+
+        Only reading the rows holds ``_lock``; the index is built without it,
+        so scans and plain searches carry on meanwhile, and edits made during
+        the build are applied by the next ``fuzzy_search``. Call it from a
+        worker after a scan so the first ranked query doesn't wait for it.
+        """
+        with self._fuzzy_build_lock:
+            with self._lock:
+                if self._fuzzy is not None:
+                    return
+                self._fuzzy_building, self._fuzzy_dirty = True, set()
+                rows = self._conn.execute("SELECT path, title, artist, album FROM tracks").fetchall()
+            fz = TrigramIndex()
+            fz.add_many((path, _fuzzy_text(path, title, artist, album)) for path, title, artist, album in rows)
+            with self._lock:
+                if self._fuzzy_building:  # not cleared meanwhile
+                    self._fuzzy = fz
+                self._fuzzy_building = False
+
+    def fuzzy_search(self, query: str, limit: int = 50) -> List[MediaFile]:
+        """Typo-tolerant search ranked by trigram similarity, best match first."""
+        self.warm_fuzzy()
+        with self._lock:
+            if self._fuzzy is None:
+                return []  # cleared while it was being built
+            if self._fuzzy_dirty:
+                dirty, self._fuzzy_dirty = list(self._fuzzy_dirty), set()
+                rows = self._rows_for(dirty)
+                for path in dirty:
+                    row = rows.get(path)
+                    if row is None:
+                        self._fuzzy.discard(path)
+                    else:
+                        self._fuzzy.add(path, _fuzzy_text(path, row[1], row[2], row[4]))
+            hits = self._fuzzy.search(query, limit=limit)
+            rows = self._rows_for([path for path, _ in hits])
+        return [_row_to_mediafile(rows[path][:4]) for path, _ in hits if path in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,60 @@
+"""Bulk duration probing for local tracks.
+
+Durations are resolved cheapest-first: values already in the library index,
+then container headers (frame counts, STREAMINFO, mvhd, ...) read in a
+process pool by ``tags.read_tags_many``, and finally an optional fallback
+such as ``LocalVLCPlayer.parse_length_ms`` for files the header reader
+cannot handle. Results are yielded in batches so callers can persist them
+without one write per file.
+"""
+
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, Optional
+
+from .tags import read_tags_many
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .index import LibraryIndex
+
+
+def probe_durations(
+    paths: Iterable[str],
+    index: Optional["LibraryIndex"] = None,
+    fallback: Optional[Callable[[str], int]] = None,
+    workers: Optional[int] = None,
+    batch_size: int = 200,
+) -> Iterator[Dict[str, int]]:
+    """Yield ``{path: seconds}`` batches for every path whose length could be found.
+
+    ``fallback(path)`` should return milliseconds (0 when unknown). Newly
+    probed durations are written back to ``index`` batch by batch.
+    """
+    pending = list(dict.fromkeys(p for p in paths if p))
+    batch: Dict[str, int] = {}
+
+    def flush() -> Dict[str, int]:
+        nonlocal batch
+        out, batch = batch, {}
+        if index is not None:
+            index.set_tags((p, "", "", "", d) for p, d in out.items())
+        return out
+
+    known = index.durations(pending) if index is not None else {}
+    if known:
+        yield known
+    unresolved = []
+    for path, _, _, _, duration in read_tags_many([p for p in pending if p not in known], workers):
+        if duration > 0:
+            batch[path] = duration
+            if len(batch) >= batch_size:
+                yield flush()
+        else:
+            unresolved.append(path)
+    if fallback is not None:
+        for path in unresolved:
+            ms = fallback(path)
+            if ms > 0:
+                batch[path] = int(round(ms / 1000))
+                if len(batch) >= batch_size:
+                    yield flush()
+    if batch:
+        yield flush()
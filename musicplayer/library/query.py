@@ -0,0 +1,183 @@
+"""Structured queries for the library index.
+
+A query is a list of whitespace-separated terms::
+
+    pink floyd artist:radiohead album:"ok computer" ext:flac
+    duration>300 duration:3:00..5:00 size<20mb mtime>2024-01-01 mtime>7d
+    dir:/music/Rock sort:-mtime sort:artist
+
+Bare words are full-text matched as before. ``title``/``artist``/``album``
+filters become FTS5 column filters (``LIKE`` without FTS5); ``ext``,
+``duration``, ``size``, ``mtime`` and absolute ``dir`` prefixes become range
+conditions on indexed columns, so SQLite answers them with index lookups
+instead of filtering every row. Terms that do not parse (unknown field,
+bad number) are treated as plain words.
+"""
+
+import datetime
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_TERM_RE = re.compile(r'[^\s"]*"[^"]*"?|\S+')
+_FILTER_RE = re.compile(r"^([a-z]+)(>=|<=|:|>|<|=)(.*)$", re.IGNORECASE)
+
+_TEXT_FIELDS = {"title": "title", "artist": "artist", "album": "album", "name": "name", "file": "name"}
+_NUMERIC_FIELDS = {"duration", "length", "size", "mtime", "modified"}
+_SORT_FIELDS = {
+    "title": "tracks.title COLLATE NOCASE",
+    "artist": "tracks.artist COLLATE NOCASE",
+    "album": "tracks.album COLLATE NOCASE",
+    "name": "tracks.name COLLATE NOCASE",
+    "path": "tracks.path",
+    "duration": "tracks.duration",
+    "length": "tracks.duration",
+    "size": "tracks.size",
+    "mtime": "tracks.mtime",
+    "modified": "tracks.mtime",
+}
+_COMPARE_OPS = {">": ">", ">=": ">=", "<": "<", "<=": "<="}
+
+_SIZE_UNITS = {"": 1, "b": 1, "k": 1024, "kb": 1024, "m": 1024 ** 2, "mb": 1024 ** 2, "g": 1024 ** 3, "gb": 1024 ** 3}
+_AGE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400, "y": 365 * 86400}
+_NUMBER_RE = re.compile(r"^(\d+(?:\.\d+)?)([a-z]*)$")
+
+
+@dataclass
+class CompiledQuery:
+    match: str = ""  # FTS5 MATCH expression, empty when there is none
+    where: List[str] = field(default_factory=list)
+    params: List[Any] = field(default_factory=list)
+    order: List[str] = field(default_factory=list)
+    words: List[str] = field(default_factory=list)  # bare words FTS could not take; matched with LIKE
+
+
+def fts_query(query: str) -> str:
+    # Every word must match as a prefix, in any column and any order
+    return " ".join(f'"{tok}"*' for tok in _TOKEN_RE.findall(query.lower()))
+
+
+def is_structured(query: str) -> bool:
+    """True when ``query`` contains at least one recognised filter or sort term."""
+    return any(_filter_parts(term) is not None for term in _TERM_RE.findall(query or ""))
+
+
+def _filter_parts(term: str) -> Optional[Tuple[str, str, str]]:
+    m = _FILTER_RE.match(term)
+    if not m:
+        return None
+    name, op, value = m.group(1).lower(), m.group(2), m.group(3).strip('"')
+    if not value:
+        return None
+    if name in _TEXT_FIELDS or name in ("ext", "dir", "path"):
+        return (name, op, value) if op in (":", "=") else None
+    if name == "sort":
+        return (name, op, value) if op == ":" and value.lstrip("+-").lower() in _SORT_FIELDS else None
+    if name in _NUMERIC_FIELDS:
+        return name, op, value
+    return None
+
+
+def _parse_duration(value: str) -> float:
+    if ":" in value:
+        secs = 0.0
+        for part in value.split(":"):
+            secs = secs * 60 + float(part)
+        return secs
+    m = _NUMBER_RE.match(value.lower())
+    if not m or m.group(2) not in ("", "s", "m", "h"):
+        raise ValueError(value)
+    return float(m.group(1)) * _AGE_UNITS.get(m.group(2), 1)
+
+
+def _parse_size(value: str) -> float:
+    m = _NUMBER_RE.match(value.lower())
+    if not m or m.group(2) not in _SIZE_UNITS:
+        raise ValueError(value)
+    return float(m.group(1)) * _SIZE_UNITS[m.group(2)]
+
+
+def _parse_time(value: str) -> float:
+    # "7d" / "12h" mean that long ago; otherwise an ISO date or datetime
+    m = _NUMBER_RE.match(value.lower())
+    if m and m.group(2) in _AGE_UNITS:
+        return time.time() - float(m.group(1)) * _AGE_UNITS[m.group(2)]
+    return datetime.datetime.fromisoformat(value).timestamp()
+
+
+_NUMERIC = {
+    "duration": ("tracks.duration", _parse_duration),
+    "length": ("tracks.duration", _parse_duration),
+    "size": ("tracks.size", _parse_size),
+    "mtime": ("tracks.mtime", _parse_time),
+    "modified": ("tracks.mtime", _parse_time),
+}
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _prefix_range(prefix: str) -> Tuple[str, str]:
+    # [prefix, prefix-with-last-char-bumped) selects every string with that prefix
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def compile_query(query: str, has_fts: bool = True) -> CompiledQuery:
+    """Translate ``query`` into SQL fragments over ``tracks`` (and ``tracks_fts``)."""
+    out = CompiledQuery()
+    match_parts: List[str] = []
+    for term in _TERM_RE.findall(query or ""):
+        parts = _filter_parts(term)
+        if parts is None:
+            out.words.append(term.strip('"'))
+            continue
+        name, op, value = parts
+        if name == "sort":
+            desc = value.startswith("-")
+            out.order.append(_SORT_FIELDS[value.lstrip("+-").lower()] + (" DESC" if desc else ""))
+        elif name in _TEXT_FIELDS:
+            column = _TEXT_FIELDS[name]
+            if has_fts and fts_query(value):
+                match_parts.append(f"{column} : ({fts_query(value)})")
+            else:
+                out.where.append(f"tracks.{column} LIKE ? ESCAPE '\\'")
+                out.params.append(f"%{_escape_like(value)}%")
+        elif name == "ext":
+            exts = [e.lower() if e.startswith(".") else "." + e.lower() for e in value.split(",") if e]
+            out.where.append(f"tracks.ext IN ({','.join('?' * len(exts))})")
+            out.params.extend(exts)
+        elif name in ("dir", "path"):
+            if os.path.isabs(value):
+                prefix = value.rstrip("/\\") + os.sep
+                out.where.append("tracks.path >= ? AND tracks.path < ?")
+                out.params.extend(_prefix_range(prefix))
+            else:
+                out.where.append("tracks.dir LIKE ? ESCAPE '\\'")
+                out.params.append(f"%{_escape_like(value)}%")
+        else:
+            column, parse = _NUMERIC[name]
+            try:
+                if op in (":", "=") and ".." in value:
+                    lo, hi = value.split("..", 1)
+                    conds = ([(">=", parse(lo))] if lo else []) + ([("<=", parse(hi))] if hi else [])
+                elif op in (":", "="):
+                    conds = [("=", parse(value))]
+                else:
+                    conds = [(_COMPARE_OPS[op], parse(value))]
+            except ValueError:
+                out.words.append(term)
+                continue
+            for cmp, bound in conds:
+                out.where.append(f"{column} {cmp} ?")
+                out.params.append(bound)
+    if has_fts:
+        words = fts_query(" ".join(out.words))
+        if words:
+            match_parts.insert(0, " AND ".join(words.split(" ")))
+            out.words = []
+    out.match = " AND ".join(match_parts)
+    return out
@@ -0,0 +1,193 @@
+"""Incremental rescans of the local music tree.
+
+A rescan stats every known directory but only re-lists the ones whose mtime
+changed since the last scan (a directory's mtime changes whenever an entry is
+added, removed or renamed in it). Files in re-listed directories are compared
+by ``(size, mtime, inode)`` against the index, and the result is reported as a
+``ScanDiff`` that callers can use to update the UI or playlists.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Deque, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from ..search.local import SUPPORTED_EXTS
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .index import LibraryIndex
+
+# (size, mtime, inode), matching LibraryIndex signatures
+StatSignature = Tuple[int, float, int]
+R = TypeVar("R")
+
+
+@dataclass
+class ScanDiff:
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    dirs_checked: int = 0  # directories stat'ed
+    dirs_listed: int = 0  # directories actually re-read
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.added)} added, {len(self.removed)} removed, {len(self.changed)} changed "
+            f"({self.dirs_listed} of {self.dirs_checked} folders re-read)"
+        )
+
+
+def _list_dir(path: str) -> Tuple[List[Tuple[str, float]], Dict[str, StatSignature]]:
+    """Return ([(subdir, mtime)], {file_path: (size, mtime, inode)}) for supported media files.
+
+    Stat results come from the ``DirEntry`` objects, which on Windows carry
+    them from the directory listing itself and elsewhere avoid a second lookup.
+    """
+    subdirs: List[Tuple[str, float]] = []
+    files: Dict[str, StatSignature] = {}
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append((entry.path, entry.stat(follow_symlinks=False).st_mtime))
+                    continue
+                if os.path.splitext(entry.name)[1].lower() not in SUPPORTED_EXTS:
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            files[entry.path] = (st.st_size, st.st_mtime, st.st_ino)
+    return subdirs, files
+
+
+def _walk(root_args: tuple, visit: Callable[..., Tuple[Optional[R], list]], workers: int) -> Iterator[R]:
+    """Drive ``visit`` over a directory tree, yielding results as they complete.
+
+    ``visit(*args)`` returns ``(result, children)`` where each child is the
+    argument tuple for a further visit. With ``workers > 1`` sibling
+    directories are visited concurrently, keeping at most ``2 * workers``
+    visits in flight so that memory stays bounded on very wide trees.
+    """
+    if workers <= 1:
+        stack = [root_args]
+        while stack:
+            result, children = visit(*stack.pop())
+            stack.extend(children)
+            if result is not None:
+                yield result
+        return
+    pending: Deque[tuple] = deque([root_args])
+    inflight: Dict[Future, None] = {}
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="library-scan")
+    try:
+        while pending or inflight:
+            while pending and len(inflight) < workers * 2:
+                inflight[pool.submit(visit, *pending.pop())] = None
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                del inflight[fut]
+                result, children = fut.result()
+                pending.extend(children)
+                if result is not None:
+                    yield result
+    finally:
+        # Also runs when the consumer stops iterating early
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def walk_media(root: str, workers: int = 1) -> Iterator[Tuple[str, Dict[str, StatSignature]]]:
+    """Yield ``(dirpath, {file_path: signature})`` for every directory under ``root``.
+
+    Directories are yielded as soon as they have been listed, so callers can
+    start consuming results before the walk finishes.
+    """
+
+    def visit(path: str) -> Tuple[Optional[Tuple[str, Dict[str, StatSignature]]], list]:
+        try:
+            subdirs, files = _list_dir(path)
+        except OSError:
+            return None, []
+        return (path, files), [(child,) for child, _ in subdirs]
+
+    return _walk((root,), visit, workers)
+
+
+@dataclass
+class _Visit:
+    path: str
+    parent: Optional[str]
+    mtime: float
+    files: Optional[Dict[str, StatSignature]]  # None when the listing was skipped
+
+
+def rescan(index: "LibraryIndex", root: str, deep: bool = False, workers: int = 1) -> ScanDiff:
+    """Update ``index`` from ``root`` and return the added/removed/changed files.
+
+    Directories with an unchanged mtime are not listed again; their known
+    subdirectories are still visited because a change deep in the tree does
+    not touch the parent's mtime. In-place edits of existing files do not
+    change the directory mtime either, so pass ``deep=True`` to re-list and
+    re-stat everything when those need to be picked up. ``workers > 1``
+    visits sibling directories concurrently, which mostly helps on network
+    mounts where each listing is a round trip.
+    """
+    diff = ScanDiff()
+    known_dirs = index.dirs()
+    children: Dict[Optional[str], List[str]] = {}
+    for path, (parent, _) in known_dirs.items():
+        children.setdefault(parent, []).append(path)
+
+    def known_children(path: str) -> list:
+        return [(child, None, path) for child in children.get(path, ())]
+
+    def visit(path: str, mtime: Optional[float], parent: Optional[str]) -> Tuple[Optional[_Visit], list]:
+        if mtime is None:
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                return None, []
+        known = known_dirs.get(path)
+        if not deep and known is not None and known[1] == mtime:
+            return _Visit(path, parent, mtime, None), known_children(path)
+        try:
+            subdirs, files = _list_dir(path)
+        except OSError:
+            # Transient failures (e.g. a dropped network share) keep what we knew
+            return _Visit(path, parent, mtime, None), known_children(path)
+        return _Visit(path, parent, mtime, files), [(child, m, path) for child, m in subdirs]
+
+    seen_dirs = set()
+    dir_rows: List[Tuple[str, Optional[str], float]] = []
+    upserts: List[Tuple[str, int, float, int]] = []
+    for v in _walk((root, None, None), visit, workers):
+        seen_dirs.add(v.path)
+        diff.dirs_checked += 1
+        if v.files is None:
+            continue
+        diff.dirs_listed += 1
+        dir_rows.append((v.path, v.parent, v.mtime))
+        old = index.signatures(v.path)
+        for fpath, sig in v.files.items():
+            prev = old.pop(fpath, None)
+            if prev is None:
+                diff.added.append(fpath)
+            elif tuple(prev) != sig:
+                diff.changed.append(fpath)
+            else:
+                continue
+            upserts.append((fpath, sig[0], sig[1], sig[2]))
+        diff.removed.extend(old.keys())
+
+    gone_dirs = [d for d in known_dirs if d not in seen_dirs]
+    for d in gone_dirs:
+        diff.removed.extend(index.signatures(d).keys())
+
+    index.upsert_many(upserts)
+    index.remove_paths(diff.removed)
+    index.remove_dirs(gone_dirs)
+    index.set_dirs(dir_rows)
+    return diff
@@ -0,0 +1,421 @@
+"""Minimal embedded-tag reader for local media files.
+
+Parses just enough of ID3v2/ID3v1 (MP3), FLAC, Ogg (Vorbis/Opus), MP4/M4A
+and RIFF/WAVE headers to recover title, artist, album and duration without
+decoding audio or depending on a tagging library. Only small, bounded reads
+are made: the head and tail of the file plus the few container headers
+needed to find metadata, so extraction cost is dominated by I/O latency.
+"""
+
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+HEAD_BYTES = 16 * 1024
+TAIL_BYTES = 16 * 1024
+# Upper bound for any single metadata block/atom we are willing to read
+MAX_BLOCK_BYTES = 256 * 1024
+
+
+@dataclass
+class TrackTags:
+    title: str = ""
+    artist: str = ""
+    album: str = ""
+    duration: int = 0  # seconds
+
+    def merge(self, other: "TrackTags") -> "TrackTags":
+        """Fill empty fields from ``other`` (e.g. ID3v1 behind ID3v2)."""
+        return TrackTags(
+            title=self.title or other.title,
+            artist=self.artist or other.artist,
+            album=self.album or other.album,
+            duration=self.duration or other.duration,
+        )
+
+
+def _read_at(f: BinaryIO, offset: int, size: int) -> bytes:
+    f.seek(offset)
+    return f.read(max(0, min(size, MAX_BLOCK_BYTES)))
+
+
+def _clean(value: str) -> str:
+    return value.replace("\x00", " ").strip()
+
+
+# --- ID3 / MP3 ---
+_ID3_FRAMES = {
+    "TIT2": "title", "TT2": "title",
+    "TPE1": "artist", "TP1": "artist",
+    "TALB": "album", "TAL": "album",
+    "TLEN": "length", "TLE": "length",
+}
+
+
+def _syncsafe(b: bytes) -> int:
+    return (b[0] << 21) | (b[1] << 14) | (b[2] << 7) | b[3]
+
+
+def _decode_id3_text(data: bytes) -> str:
+    if not data:
+        return ""
+    enc, body = data[0], data[1:]
+    if enc == 1:
+        text = body.decode("utf-16", "replace")
+    elif enc == 2:
+        text = body.decode("utf-16-be", "replace")
+    elif enc == 3:
+        text = body.decode("utf-8", "replace")
+    else:
+        text = body.decode("latin-1", "replace")
+    # v2.4 separates multiple values with NULs; keep the first
+    return text.split("\x00", 1)[0].strip()
+
+
+def _parse_id3v2(buf: bytes) -> Tuple[Dict[str, str], int]:
+    """Return (frames, total tag size) for an ID3v2 tag at the start of ``buf``."""
+    if len(buf) < 10 or buf[:3] != b"ID3":
+        return {}, 0
+    major, flags = buf[3], buf[5]
+    total = 10 + _syncsafe(buf[6:10]) + (10 if flags & 0x10 else 0)
+    pos = 10
+    if flags & 0x40 and major >= 3:  # extended header
+        ext = buf[10:14]
+        if len(ext) == 4:
+            pos += _syncsafe(ext) if major == 4 else struct.unpack(">I", ext)[0] + 4
+    end = min(total, len(buf))
+    id_len, hdr_len = (3, 6) if major == 2 else (4, 10)
+    out: Dict[str, str] = {}
+    while pos + hdr_len <= end:
+        fid = buf[pos:pos + id_len]
+        if not fid.strip(b"\x00") or not fid.isalnum():
+            break  # padding
+        if major == 2:
+            size = int.from_bytes(buf[pos + 3:pos + 6], "big")
+        elif major == 4:
+            size = _syncsafe(buf[pos + 4:pos + 8])
+        else:
+            size = struct.unpack(">I", buf[pos + 4:pos + 8])[0]
+        body = buf[pos + hdr_len:pos + hdr_len + size]
+        key = _ID3_FRAMES.get(fid.decode("latin-1"))
+        if key and key not in out:
+            out[key] = _decode_id3_text(body)
+        pos += hdr_len + size
+    return out, total
+
+
+def _parse_id3v1(tail: bytes) -> TrackTags:
+    if len(tail) < 128 or tail[-128:-125] != b"TAG":
+        return TrackTags()
+    t = tail[-128:]
+
+    def field(a: int, b: int) -> str:
+        return _clean(t[a:b].split(b"\x00", 1)[0].decode("latin-1"))
+
+    return TrackTags(title=field(3, 33), artist=field(33, 63), album=field(63, 93))
+
+
+_MP3_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000], 25: [11025, 12000, 8000]}
+
+
+def _mp3_duration(buf: bytes, audio_bytes: int) -> int:
+    """Duration from the first MPEG frame: Xing/Info or VBRI frame count, else CBR estimate."""
+    i = 0
+    while True:
+        i = buf.find(b"\xff", i)
+        if i < 0 or i + 4 > len(buf):
+            return 0
+        b1, b2, b3 = buf[i + 1], buf[i + 2], buf[i + 3]
+        version_bits, layer_bits = (b1 >> 3) & 3, (b1 >> 1) & 3
+        br_idx, sr_idx = b2 >> 4, (b2 >> 2) & 3
+        if (b1 & 0xE0) == 0xE0 and version_bits != 1 and layer_bits != 0 and 0 < br_idx < 15 and sr_idx < 3:
+            break
+        i += 1
+    version = {3: 1, 2: 2, 0: 25}[version_bits]
+    layer = 4 - layer_bits
+    rate = _MP3_RATES[version][sr_idx]
+    mono = (b3 >> 6) == 3
+    if layer == 1:
+        samples = 384
+    elif layer == 2 or version == 1:
+        samples = 1152
+    else:
+        samples = 576
+    xing_off = i + 4 + ((17 if mono else 32) if version == 1 else (9 if mono else 17))
+    tag = buf[xing_off:xing_off + 4]
+    if tag in (b"Xing", b"Info") and len(buf) >= xing_off + 12:
+        if struct.unpack(">I", buf[xing_off + 4:xing_off + 8])[0] & 1:
+            frames = struct.unpack(">I", buf[xing_off + 8:xing_off + 12])[0]
+            return int(round(frames * samples / rate))
+    vbri = i + 4 + 32
+    if buf[vbri:vbri + 4] == b"VBRI" and len(buf) >= vbri + 18:
+        frames = struct.unpack(">I", buf[vbri + 14:vbri + 18])[0]
+        return int(round(frames * samples / rate))
+    bitrate = _MP3_BITRATES[(1 if version == 1 else 2, layer)][br_idx] * 1000
+    return int(round(max(0, audio_bytes - i) * 8 / bitrate)) if bitrate else 0
+
+
+def _read_mp3(f: BinaryIO, head: bytes, tail: bytes, size: int) -> TrackTags:
+    frames, tag_size = _parse_id3v2(head)
+    if tag_size > len(head) and tag_size - len(head) < MAX_BLOCK_BYTES:
+        # Large tag (usually cover art); text frames normally come first, but
+        # pick up the rest when it is still of reasonable size.
+        frames, tag_size = _parse_id3v2(head + _read_at(f, len(head), tag_size - len(head)))
+    tags = TrackTags(
+        title=frames.get("title", ""),
+        artist=frames.get("artist", ""),
+        album=frames.get("album", ""),
+    )
+    length = frames.get("length", "")
+    if length.isdigit():
+        tags.duration = int(length) // 1000
+    v1 = _parse_id3v1(tail)
+    if not tags.duration:
+        audio_end = size - (128 if tail[-128:-125] == b"TAG" else 0)
+        first = head[tag_size:] if tag_size < len(head) else _read_at(f, tag_size, 4096)
+        tags.duration = _mp3_duration(first, audio_end - tag_size)
+    return tags.merge(v1)
+
+
+# --- Vorbis comments (FLAC, Ogg) ---
+def _parse_vorbis_comment(data: bytes) -> TrackTags:
+    tags = TrackTags()
+    try:
+        pos = 4 + struct.unpack("<I", data[:4])[0]
+        count = struct.unpack("<I", data[pos:pos + 4])[0]
+        pos += 4
+        for _ in range(count):
+            n = struct.unpack("<I", data[pos:pos + 4])[0]
+            entry = data[pos + 4:pos + 4 + n].decode("utf-8", "replace")
+            pos += 4 + n
+            key, _, value = entry.partition("=")
+            key = key.upper()
+            if key == "TITLE" and not tags.title:
+                tags.title = value.strip()
+            elif key == "ARTIST" and not tags.artist:
+                tags.artist = value.strip()
+            elif key == "ALBUM" and not tags.album:
+                tags.album = value.strip()
+    except struct.error:
+        pass  # truncated comment block; keep what we have
+    return tags
+
+
+def _read_flac(f: BinaryIO, head: bytes, tail: bytes, size: int) -> TrackTags:
+    tags = TrackTags()
+    pos = 4
+    while pos + 4 <= size:
+        hdr = head[pos:pos + 4] if pos + 4 <= len(head) else _read_at(f, pos, 4)
+        if len(hdr) < 4:
+            break
+        last, btype = hdr[0] & 0x80, hdr[0] & 0x7F
+        length = int.from_bytes(hdr[1:4], "big")
+        if btype in (0, 4):
+            start = pos + 4
+            body = head[start:start + length] if start + length <= len(head) else _read_at(f, start, length)
+            if btype == 0 and len(body) >= 18:
+                rate = (body[10] << 12) | (body[11] << 4) | (body[12] >> 4)
+                total = ((body[13] & 0x0F) << 32) | int.from_bytes(body[14:18], "big")
+                if rate:
+                    tags.duration = int(round(total / rate))
+            elif btype == 4:
+                tags = _parse_vorbis_comment(body).merge(tags)
+        if last:
+            break
+        pos += 4 + length
+    return tags
+
+
+def _ogg_packets(buf: bytes, limit: int = 3) -> List[bytes]:
+    """Reassemble the first ``limit`` packets from the Ogg pages in ``buf``."""
+    packets: List[bytes] = []
+    current = b""
+    pos = 0
+    while len(packets) < limit and buf[pos:pos + 4] == b"OggS" and pos + 27 <= len(buf):
+        nsegs = buf[pos + 26]
+        table = buf[pos + 27:pos + 27 + nsegs]
+        data_pos = pos + 27 + nsegs
+        for lace in table:
+            current += buf[data_pos:data_pos + lace]
+            data_pos += lace
+            if lace < 255:
+                packets.append(current)
+                current = b""
+                if len(packets) >= limit:
+                    break
+        pos = pos + 27 + nsegs + sum(table)
+    return packets
+
+
+def _read_ogg(f: BinaryIO, head: bytes, tail: bytes, size: int) -> TrackTags:
+    packets = _ogg_packets(head)
+    if not packets:
+        return TrackTags()
+    ident = packets[0]
+    tags = TrackTags()
+    rate, preskip = 0, 0
+    if ident.startswith(b"\x01vorbis") and len(ident) >= 16:
+        rate = struct.unpack("<I", ident[12:16])[0]
+        if len(packets) > 1 and packets[1].startswith(b"\x03vorbis"):
+            tags = _parse_vorbis_comment(packets[1][7:])
+    elif ident.startswith(b"OpusHead") and len(ident) >= 12:
+        rate = 48000  # Opus granule positions are always 48 kHz
+        preskip = struct.unpack("<H", ident[10:12])[0]
+        if len(packets) > 1 and packets[1].startswith(b"OpusTags"):
+            tags = _parse_vorbis_comment(packets[1][8:])
+    last = tail.rfind(b"OggS")
+    if rate and last >= 0 and last + 14 <= len(tail):
+        granule = struct.unpack("<q", tail[last + 6:last + 14])[0]
+        if granule > 0:
+            tags.duration = int(round(max(0, granule - preskip) / rate))
+    return tags
+
+
+# --- MP4 / M4A ---
+_MP4_ITEMS = {b"\xa9nam": "title", b"\xa9ART": "artist", b"aART": "artist", b"\xa9alb": "album"}
+
+
+def _mp4_atoms(f: BinaryIO, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield (type, payload_offset, payload_size) for atoms in [start, end)."""
+    pos = start
+    while pos + 8 <= end:
+        hdr = _read_at(f, pos, 16)
+        if len(hdr) < 8:
+            return
+        size, kind = struct.unpack(">I4s", hdr[:8])
+        header = 8
+        if size == 1 and len(hdr) >= 16:
+            size, header = struct.unpack(">Q", hdr[8:16])[0], 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield kind, pos + header, size - header
+        pos += size
+
+
+def _read_mp4(f: BinaryIO, head: bytes, tail: bytes, size: int) -> TrackTags:
+    tags = TrackTags()
+    moov = next(((o, n) for k, o, n in _mp4_atoms(f, 0, size) if k == b"moov"), None)
+    if not moov:
+        return tags
+    for kind, off, n in _mp4_atoms(f, moov[0], moov[0] + moov[1]):
+        if kind == b"mvhd":
+            body = _read_at(f, off, 32)
+            if body[:1] == b"\x01" and len(body) >= 32:
+                scale, dur = struct.unpack(">IQ", body[20:32])
+            elif len(body) >= 20:
+                scale, dur = struct.unpack(">II", body[12:20])
+            else:
+                continue
+            if scale:
+                tags.duration = int(round(dur / scale))
+        elif kind == b"udta":
+            for k2, o2, n2 in _mp4_atoms(f, off, off + n):
+                if k2 != b"meta":
+                    continue
+                # 'meta' is a full box: skip version/flags before its children
+                for k3, o3, n3 in _mp4_atoms(f, o2 + 4, o2 + n2):
+                    if k3 != b"ilst":
+                        continue
+                    for k4, o4, n4 in _mp4_atoms(f, o3, o3 + n3):
+                        key = _MP4_ITEMS.get(k4)
+                        if not key or getattr(tags, key):
+                            continue
+                        data = _read_at(f, o4, n4)
+                        if data[4:8] == b"data":
+                            setattr(tags, key, data[16:].decode("utf-8", "replace").strip())
+    return tags
+
+
+# --- RIFF / WAVE ---
+_WAV_INFO = {b"INAM": "title", b"IART": "artist", b"IPRD": "album"}
+
+
+def _read_wav(f: BinaryIO, head: bytes, tail: bytes, size: int) -> TrackTags:
+    tags = TrackTags()
+    byte_rate, data_size = 0, 0
+    pos = 12
+    while pos + 8 <= size:
+        hdr = _read_at(f, pos, 8)
+        if len(hdr) < 8:
+            break
+        kind, n = struct.unpack("<4sI", hdr)
+        if kind == b"fmt ":
+            fmt = _read_at(f, pos + 8, 16)
+            if len(fmt) >= 12:
+                byte_rate = struct.unpack("<I", fmt[8:12])[0]
+        elif kind == b"data":
+            data_size = min(n, size - pos - 8)
+        elif kind == b"LIST":
+            body = _read_at(f, pos + 8, n)
+            if body[:4] == b"INFO":
+                i = 4
+                while i + 8 <= len(body):
+                    sub, m = struct.unpack("<4sI", body[i:i + 8])
+                    key = _WAV_INFO.get(sub)
+                    if key:
+                        setattr(tags, key, _clean(body[i + 8:i + 8 + m].decode("latin-1")))
+                    i += 8 + m + (m & 1)
+        pos += 8 + n + (n & 1)
+    if byte_rate:
+        tags.duration = int(round(data_size / byte_rate))
+    return tags
+
+
+def read_tags(path: str) -> TrackTags:
+    """Read embedded tags from ``path``; returns empty ``TrackTags`` when unknown."""
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            head = f.read(HEAD_BYTES)
+            tail = head[-TAIL_BYTES:] if size <= HEAD_BYTES else _read_at(f, max(0, size - TAIL_BYTES), TAIL_BYTES)
+            if head[:4] == b"fLaC":
+                return _read_flac(f, head, tail, size)
+            if head[:4] == b"OggS":
+                return _read_ogg(f, head, tail, size)
+            if head[4:8] == b"ftyp":
+                return _read_mp4(f, head, tail, size)
+            if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+                return _read_wav(f, head, tail, size)
+            if head[:3] == b"ID3" or head[:1] == b"\xff" or path.lower().endswith(".mp3"):
+                return _read_mp3(f, head, tail, size)
+    except (OSError, ValueError, KeyError, IndexError, struct.error):
+        pass
+    return TrackTags()
+
+
+def _read_tags_tuple(path: str) -> Tuple[str, str, str, str, int]:
+    t = read_tags(path)
+    return path, t.title, t.artist, t.album, t.duration
+
+
+# Below this many files a process pool costs more to start than it saves
+_POOL_THRESHOLD = 64
+
+
+def read_tags_many(
+    paths: Iterable[str], workers: Optional[int] = None
+) -> Iterator[Tuple[str, str, str, str, int]]:
+    """Yield ``(path, title, artist, album, duration)`` for each path.
+
+    Large batches are spread over a process pool so header parsing does not
+    hold the GIL of the calling (GUI) process.
+    """
+    paths = list(paths)
+    if workers == 1 or len(paths) < _POOL_THRESHOLD:
+        for p in paths:
+            yield _read_tags_tuple(p)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(_read_tags_tuple, paths, chunksize=32)
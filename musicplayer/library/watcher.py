@@ -0,0 +1,345 @@
+"""Keep a ``LibraryIndex`` live by watching the music folder.
+
+On Linux the tree is watched with inotify through a small ctypes binding;
+events are coalesced for a short window and applied to the index in one
+batch, so new files become searchable within about a second without any
+periodic full scan. Elsewhere (or when inotify is unavailable or runs out
+of watches, or fails unexpectedly) the watcher falls back to polling: every ``poll_interval`` it
+stats the directories the index knows and runs the incremental ``rescan``
+only when one of their mtimes moved (or one disappeared).
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Set
+
+from ..search.local import SUPPORTED_EXTS
+from .scanner import ScanDiff, walk_media
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .index import LibraryIndex
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Thin ctypes wrapper over inotify_init1/add_watch/rm_watch."""
+
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add = libc.inotify_add_watch
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm = libc.inotify_rm_watch
+        self._rm.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str) -> int:
+        wd = self._add(self.fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        self._rm(self.fd, wd)
+
+    def read_events(self, timeout: float):  # noqa: ANN201
+        """Yield (wd, mask, cookie, name) for events available within ``timeout``."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        pos = 0
+        while pos + _EVENT_HEADER.size <= len(buf):
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(buf, pos)
+            pos += _EVENT_HEADER.size
+            name = os.fsdecode(buf[pos:pos + length].rstrip(b"\0"))
+            pos += length
+            yield wd, mask, cookie, name
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def inotify_available() -> bool:
+    return sys.platform.startswith("linux")
+
+
+class LibraryWatcher:
+    """Background thread that mirrors changes under ``root`` into ``index``.
+
+    ``on_change`` receives a ``ScanDiff`` per applied batch and is called on
+    the watcher thread.
+    """
+
+    def __init__(
+        self,
+        index: "LibraryIndex",
+        root: str,
+        on_change: Optional[Callable[[ScanDiff], None]] = None,
+        coalesce: float = 0.3,
+        max_delay: float = 1.0,
+        poll_interval: float = 10.0,
+        use_inotify: Optional[bool] = None,
+    ) -> None:
+        self.index = index
+        self.root = root
+        self.on_change = on_change
+        self.coalesce = coalesce  # quiet period that closes a batch
+        self.max_delay = max_delay  # upper bound on how long a batch may grow
+        self.poll_interval = poll_interval
+        self.use_inotify = inotify_available() if use_inotify is None else use_inotify
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._watches: Dict[int, str] = {}
+        self._dirs: Dict[str, int] = {}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="library-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 2.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        if self.use_inotify:
+            try:
+                self._run_inotify()
+                return
+            except OSError as e:
+                # e.g. ENOSPC when fs.inotify.max_user_watches is exhausted
+                logging.warning("inotify unavailable for %s (%s); polling instead", self.root, e)
+            except Exception:
+                logging.exception("Library watcher failed for %s; polling instead", self.root)
+            if self._stop.is_set():
+                return
+        self._run_polling()
+
+    # --- polling fallback ---
+    def _dirs_changed(self) -> bool:
+        known = self.index.dirs()
+        if not known:
+            return True  # nothing indexed yet
+        for path, (_, mtime) in known.items():
+            try:
+                if os.stat(path).st_mtime != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def _run_polling(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                if not self._dirs_changed():
+                    continue
+                diff = self.index.refresh(self.root)
+            except Exception:
+                logging.exception("Library poll failed")
+                continue
+            if diff:
+                self._emit(diff)
+
+    # --- inotify ---
+    def _watch_tree(self, ino: _Inotify, top: str) -> None:
+        for dirpath, _ in walk_media(top):
+            self._watch_dir(ino, dirpath)
+
+    def _watch_dir(self, ino: _Inotify, path: str) -> None:
+        if path in self._dirs:
+            return
+        try:
+            wd = ino.add_watch(path)
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                raise
+            return  # vanished or unreadable
+        self._watches[wd] = path
+        self._dirs[path] = wd
+
+    def _forget_dir(self, path: str) -> None:
+        prefix = path.rstrip(os.sep) + os.sep
+        for d in [d for d in self._dirs if d == path or d.startswith(prefix)]:
+            self._watches.pop(self._dirs.pop(d), None)
+
+    def _run_inotify(self) -> None:
+        ino = _Inotify()
+        try:
+            # Known directories come from the index, so no listing is needed
+            known = list(self.index.dirs()) or [self.root]
+            for d in known:
+                self._watch_dir(ino, d)
+            # Catch anything that changed before the watches were in place
+            diff = self.index.refresh(self.root)
+            for d in self.index.dirs():
+                self._watch_dir(ino, d)
+            if diff:
+                self._emit(diff)
+            files: Set[str] = set()
+            removed: Set[str] = set()
+            new_dirs: Set[str] = set()
+            gone_dirs: Set[str] = set()
+            first = last = 0.0
+            overflow = False
+            while not self._stop.is_set():
+                got = False
+                for wd, mask, _, name in ino.read_events(0.1):
+                    if mask & IN_Q_OVERFLOW:
+                        overflow = True
+                        got = True
+                        continue
+                    base = self._watches.get(wd)
+                    if base is None:
+                        continue
+                    if mask & IN_IGNORED:
+                        self._watches.pop(wd, None)
+                        self._dirs.pop(base, None)
+                        continue
+                    if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                        continue  # reported by the parent as DELETE/MOVED_FROM
+                    got = True
+                    path = os.path.join(base, name)
+                    if mask & IN_ISDIR:
+                        if mask & (IN_CREATE | IN_MOVED_TO):
+                            new_dirs.add(path)
+                            gone_dirs.discard(path)
+                        elif mask & (IN_DELETE | IN_MOVED_FROM):
+                            gone_dirs.add(path)
+                            new_dirs.discard(path)
+                        continue
+                    if os.path.splitext(name)[1].lower() not in SUPPORTED_EXTS:
+                        continue
+                    if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                        files.add(path)
+                        removed.discard(path)
+                    elif mask & (IN_DELETE | IN_MOVED_FROM):
+                        removed.add(path)
+                        files.discard(path)
+                now = time.monotonic()
+                if got:
+                    first = first or now
+                    last = now
+                if first and (now - last >= self.coalesce or now - first >= self.max_delay):
+                    failed = False
+                    try:
+                        if overflow:
+                            diff = self.index.refresh(self.root)
+                            for d in self.index.dirs():
+                                self._watch_dir(ino, d)
+                        else:
+                            diff = self._apply(ino, files, removed, new_dirs, gone_dirs)
+                    except OSError as e:
+                        if e.errno == errno.ENOSPC:
+                            raise  # out of watches; poll instead
+                        logging.exception("Applying library changes failed")
+                        diff, failed = None, True
+                    except Exception:
+                        # e.g. sqlite3.Error or a tag parse error
+                        logging.exception("Applying library changes failed")
+                        diff, failed = None, True
+                    files, removed, new_dirs, gone_dirs = set(), set(), set(), set()
+                    first = last = 0.0
+                    # A dropped batch is recovered by a full refresh on the next one
+                    overflow = failed
+                    if diff:
+                        self._emit(diff)
+        finally:
+            ino.close()
+            self._watches.clear()
+            self._dirs.clear()
+
+    def _apply(
+        self, ino: _Inotify, files: Set[str], removed: Set[str], new_dirs: Set[str], gone_dirs: Set[str]
+    ) -> ScanDiff:
+        """Apply one coalesced batch of events to the index."""
+        diff = ScanDiff()
+        for d in gone_dirs:
+            self._forget_dir(d)
+            diff.removed.extend(self.index.remove_tree(d))
+        # Files under a removed directory were reported with it
+        dropped = set(diff.removed)
+        touched_dirs = set()
+        for d in new_dirs:
+            self._watch_tree(ino, d)
+            for dirpath, found in walk_media(d):
+                touched_dirs.add(dirpath)
+                files.update(found)
+        upserts = []
+        known: Dict[str, Dict] = {}
+        for path in files:
+            try:
+                st = os.stat(path)
+            except OSError:
+                removed.add(path)
+                continue
+            dirpath = os.path.dirname(path)
+            touched_dirs.add(dirpath)
+            if dirpath not in known:
+                known[dirpath] = self.index.signatures(dirpath)
+            (diff.changed if path in known[dirpath] else diff.added).append(path)
+            upserts.append((path, st.st_size, st.st_mtime, st.st_ino))
+        gone = [p for p in removed if p not in dropped and not os.path.exists(p)]
+        diff.removed.extend(gone)
+        touched_dirs.update(os.path.dirname(p) for p in gone)
+        self.index.upsert_many(upserts)
+        self.index.remove_paths(gone)
+        self.index.update_tags(p for p, _, _, _ in upserts)
+        # Keep directory mtimes current so the next rescan stays cheap
+        dir_rows = []
+        for d in touched_dirs:
+            try:
+                mtime = os.stat(d).st_mtime
+            except OSError:
+                continue
+            parent = None if os.path.normcase(d) == os.path.normcase(self.root) else os.path.dirname(d)
+            dir_rows.append((d, parent, mtime))
+        self.index.set_dirs(dir_rows)
+        return diff
+
+    def _emit(self, diff: ScanDiff) -> None:
+        if self.on_change:
+            try:
+                self.on_change(diff)
+            except Exception:
+                logging.exception("Library change callback failed")
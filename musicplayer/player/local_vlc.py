@@ -1,3 +1,4 @@
+import time
 from typing import Callable, Optional
 
 try:
@@ -57,5 +58,24 @@ class LocalVLCPlayer:
     def get_length_ms(self) -> int:
         return int(self._player.get_length()) if self._player else 0
 
+    def parse_length_ms(self, file_path: str, timeout_ms: int = 3000) -> int:
+        """Length of a local file via libvlc's parser, without playing it (0 if unknown)."""
+        if not self._instance:
+            return 0
+        media = self._instance.media_new_path(file_path)
+        try:
+            if hasattr(media, "parse_with_options"):
+                media.parse_with_options(vlc.MediaParseFlag.local, timeout_ms)
+                deadline = time.monotonic() + timeout_ms / 1000.0
+                while not media.get_parsed_status() and time.monotonic() < deadline:
+                    time.sleep(0.01)
+            else:
+                media.parse()
+            return max(0, int(media.get_duration()))
+        except Exception:
+            return 0
+        finally:
+            media.release()
+
     def is_playing(self) -> bool:
         return bool(self._player and self._player.is_playing())
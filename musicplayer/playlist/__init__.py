@@ -1,4 +1,9 @@
 __all__ = [
     "PlaylistStorage",
     "PlaylistManager",
+    "SqlitePlaylistStorage",
+    "migrate_json",
+    "item_key",
+    "import_file",
+    "export_file",
 ]
\ No newline at end of file
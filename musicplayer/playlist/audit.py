@@ -0,0 +1,185 @@
+"""Availability audit of the YouTube items in all playlists.
+
+Every video ID found in the playlists is checked with batched ``videos.list``
+calls (50 IDs per request, one quota unit each, so a 20k-item library costs
+about 400 units). The result of each check is kept in ``audit.db`` next to
+``playlists.json``, which makes the audit incremental: a run only checks IDs
+that are new or whose last check is older than ``max_age``, and reports the
+IDs whose availability differs from what was recorded before. Results are
+recorded after every chunk of requests, so an interrupted run (quota, network)
+resumes where it stopped.
+
+Videos the API leaves out of its response were deleted or made private and
+are reported as ``'unavailable'``; the API does not say which of the two.
+"""
+
+import locale
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple
+
+from models import SourceProvider
+from ..search.youtube import VIDEOS_PER_REQUEST, fetch_video_details
+
+if TYPE_CHECKING:
+    from .manager import PlaylistManager
+
+
+DEFAULT_AUDIT_PATH = os.path.join(os.getcwd(), "audit.db")
+
+# Availability values meaning the video can no longer be played here
+UNPLAYABLE = frozenset({"unavailable", "private", "region_blocked"})
+
+LABELS = {
+    "unavailable": "removed or private",
+    "private": "private",
+    "region_blocked": "blocked in your region",
+    "not_embeddable": "embedding disabled",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    id TEXT PRIMARY KEY,
+    availability TEXT NOT NULL,
+    checked REAL NOT NULL
+);
+"""
+
+
+class AuditResult(NamedTuple):
+    checked: int
+    # video id -> (previous availability or None, availability now)
+    changes: Dict[str, Tuple[Optional[str], str]]
+    # recorded availability of every id in the playlists, checked now or
+    # earlier; what the playlist items should be flagged with
+    availability: Dict[str, str]
+    # ids due for a check that were left for a later run (request budget)
+    remaining: int
+
+
+def default_region() -> Optional[str]:
+    """Country code of the user's locale (e.g. ``'DE'`` for ``de_DE``), if any."""
+    try:
+        name = locale.getlocale()[0] or ""
+    except ValueError:
+        return None
+    country = name.replace("-", "_").partition("_")[2][:2]
+    return country.upper() if len(country) == 2 and country.isalpha() else None
+
+
+def youtube_ids(pm: "PlaylistManager") -> Dict[str, Optional[str]]:
+    """Video IDs of the YouTube items in all playlists, with their saved availability."""
+    ids: Dict[str, Optional[str]] = {}
+    for _, it in pm.iter_items():
+        if it.provider == SourceProvider.youtube and it.source_id:
+            ids.setdefault(it.source_id, it.availability)
+    return ids
+
+
+class AvailabilityAudit:
+    def __init__(
+        self,
+        path: str = DEFAULT_AUDIT_PATH,
+        max_age: float = 24 * 3600.0,
+        max_requests: int = 1000,
+        workers: int = 8,
+    ):
+        self.path = path
+        # Seconds before a checked ID is due again
+        self.max_age = max_age
+        # videos.list calls per run at most; keeps a run well inside the
+        # default daily quota of 10,000 units (a search costs 100)
+        self.max_requests = max_requests
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def recorded(self) -> Dict[str, Tuple[str, float]]:
+        """Last recorded ``id -> (availability, checked)``."""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, availability, checked FROM videos").fetchall()
+        return {vid: (availability, checked) for vid, availability, checked in rows}
+
+    def due(
+        self, ids: Dict[str, Optional[str]], now: Optional[float] = None, max_age: Optional[float] = None
+    ) -> List[str]:
+        """IDs to check: never checked ones first, then the longest unchecked."""
+        now = time.time() if now is None else now
+        max_age = self.max_age if max_age is None else max_age
+        known = self.recorded()
+        fresh = [vid for vid in ids if vid not in known]
+        stale = sorted(
+            (vid for vid in ids if vid in known and now - known[vid][1] >= max_age),
+            key=lambda vid: known[vid][1],
+        )
+        return fresh + stale
+
+    def record(self, results: Dict[str, str], now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO videos(id, availability, checked) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET availability = excluded.availability, checked = excluded.checked",
+                ((vid, a, now) for vid, a in results.items()),
+            )
+
+    def prune(self, ids: Dict[str, Optional[str]]) -> int:
+        """Forget IDs that are no longer in any playlist."""
+        with self._lock:
+            known = [row[0] for row in self._conn.execute("SELECT id FROM videos")]
+            gone = [(vid,) for vid in known if vid not in ids]
+            if gone:
+                with self._conn:
+                    self._conn.executemany("DELETE FROM videos WHERE id = ?", gone)
+        return len(gone)
+
+    def run(
+        self,
+        api_key: str,
+        ids: Dict[str, Optional[str]],
+        region: Optional[str] = None,
+        now: Optional[float] = None,
+        max_age: Optional[float] = None,
+    ) -> AuditResult:
+        """Check the due IDs among ``ids`` (see ``youtube_ids``) and diff them.
+
+        ``changes`` compares against the previous audit or, for IDs audited
+        for the first time, against the availability saved in the playlist.
+        Apply ``availability`` with ``PlaylistManager.update_availability``.
+        ``max_age`` overrides the instance's (0 checks every ID).
+        """
+        if not api_key:
+            return AuditResult(0, {}, {}, 0)
+        self.prune(ids)
+        known = self.recorded()
+        due = self.due(ids, now, max_age)
+        budget = self.max_requests * VIDEOS_PER_REQUEST
+        due, left = due[:budget], max(0, len(due) - budget)
+        checked = 0
+        changes: Dict[str, Tuple[Optional[str], str]] = {}
+        # A few rounds of requests per chunk; each chunk is recorded on its
+        # own so a failure (e.g. quota exceeded) keeps what was done
+        chunk = VIDEOS_PER_REQUEST * max(1, self.workers) * 4
+        for i in range(0, len(due), chunk):
+            details = fetch_video_details(
+                api_key, due[i:i + chunk], self.workers, parts="contentDetails,status", region=region
+            )
+            found = {vid: sys.intern(d["availability"]) for vid, d in details.items()}
+            self.record(found, now)
+            for vid, a in found.items():
+                before = known[vid][0] if vid in known else ids.get(vid)
+                if before != a:
+                    changes[vid] = (before, a)
+            checked += len(found)
+        availability = {vid: a for vid, (a, _) in self.recorded().items() if vid in ids}
+        return AuditResult(checked, changes, availability, left)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
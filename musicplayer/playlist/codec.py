@@ -0,0 +1,115 @@
+"""Fast conversion between playlist items and JSON-ready rows.
+
+An item is written as a JSON array of its fields in a fixed order (``ROW``
+for local items, ``ONLINE_ROW`` for online ones), so there are no per-item
+keys to write or look up. Rows are read and built with ``operator.attrgetter``
+and direct slot assignment instead of ``asdict`` and keyword construction.
+``url``/``thumbnail_url`` are stored from the raw private fields, so URLs
+that ``OnlineMediaFile`` derives from ``source_id`` are not spelled out: they
+are written as ``null`` and read back as derived. (A ``None`` URL therefore
+reads back as the derived one, which for items without a ``source_id`` is
+empty anyway.)
+
+Decoding allocates an object per field of every item, which is exactly the
+pattern that makes the cyclic GC rescan the whole heap over and over; the
+bulk functions pause it (``paused_gc``) for their duration.
+"""
+
+import gc
+import sys
+from contextlib import contextmanager
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+from models import _DERIVED, MediaFile, OnlineMediaFile, SourceProvider
+
+ROW = ("title", "artist", "duration", "file_path", "provider", "note")
+ONLINE_ROW = ROW + ("_url", "source_id", "streaming_quality", "_thumb", "availability")
+
+_get_row = attrgetter(*ROW)
+_get_online_row = attrgetter(*ONLINE_ROW)
+_PROVIDERS: Dict[str, SourceProvider] = {p.value: p for p in SourceProvider}
+_URL, _THUMB = ONLINE_ROW.index("_url"), ONLINE_ROW.index("_thumb")
+_new = object.__new__
+_intern = sys.intern
+
+
+@contextmanager
+def paused_gc() -> Iterator[None]:
+    """Suspend cyclic garbage collection; nests, and restores the prior state."""
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def _online_row(item: OnlineMediaFile) -> Sequence[Any]:
+    row = _get_online_row(item)
+    if row[_URL] is _DERIVED or row[_THUMB] is _DERIVED:
+        row = list(row)
+        if row[_URL] is _DERIVED:
+            row[_URL] = None
+        if row[_THUMB] is _DERIVED:
+            row[_THUMB] = None
+    return row
+
+
+def encode(item: Union[MediaFile, OnlineMediaFile]) -> Sequence[Any]:
+    # SourceProvider is a str enum, so json writes it as its value
+    return _online_row(item) if isinstance(item, OnlineMediaFile) else _get_row(item)
+
+
+def encode_many(items: Sequence[MediaFile]) -> List[Sequence[Any]]:
+    online, get_row, online_row = OnlineMediaFile, _get_row, _online_row
+    with paused_gc():
+        return [online_row(it) if isinstance(it, online) else get_row(it) for it in items]
+
+
+def decode_many(
+    rows: Sequence[Any], legacy: Optional[Callable[[Dict[str, Any]], MediaFile]] = None
+) -> List[MediaFile]:
+    """Build items from rows written by ``encode``.
+
+    Older files store one dict per item; those are handed to ``legacy``.
+    """
+    with paused_gc():
+        return _decode_rows(rows, legacy)
+
+
+def _decode_rows(rows: Sequence[Any], legacy: Optional[Callable[[Dict[str, Any]], MediaFile]]) -> List[MediaFile]:
+    out: List[MediaFile] = []
+    append = out.append
+    providers, intern, new, derived = _PROVIDERS, _intern, _new, _DERIVED
+    media, online = MediaFile, OnlineMediaFile
+    for row in rows:
+        if isinstance(row, dict):
+            if legacy is None:
+                raise TypeError("dict item without a legacy decoder")
+            append(legacy(row))
+            continue
+        if len(row) == 6:
+            it = new(media)
+            it.title, artist, it.duration, it.file_path, provider, it.note = row
+        else:
+            it = new(online)
+            # Rows written before ``availability`` existed have one field fewer
+            (
+                it.title, artist, it.duration, it.file_path, provider, it.note,
+                url, it.source_id, quality, thumb, *rest,
+            ) = row
+            # null is "derived"; files written before that held the marker itself
+            it._url = derived if url is None or url == derived else url
+            it._thumb = derived if thumb is None or thumb == derived else thumb
+            it.streaming_quality = intern(quality) if quality else quality
+            it.availability = intern(rest[0]) if rest and rest[0] else None
+        it.artist = intern(artist) if artist else artist
+        it.provider = providers[provider]
+        append(it)
+    return out
+
+
+def decode(row: Any, legacy: Optional[Callable[[Dict[str, Any]], MediaFile]] = None) -> MediaFile:
+    return _decode_rows((row,), legacy)[0]
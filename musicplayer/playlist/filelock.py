@@ -0,0 +1,77 @@
+"""Advisory inter-process lock on a side file.
+
+Uses ``fcntl.flock`` on POSIX and ``msvcrt.locking`` on Windows. The lock is
+re-entrant within a process (threads are serialised by an ``RLock``), so
+storage methods can take it without caring whether a caller already holds it.
+"""
+
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+    import msvcrt
+
+
+class FileLock:
+    def __init__(self, path: str, poll: float = 0.05) -> None:
+        self.path = path
+        self.poll = poll
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd = -1
+
+    def acquire(self) -> None:
+        self._lock.acquire()
+        if self._depth == 0:
+            try:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                self._lock_fd(self._fd)
+            except BaseException:
+                if self._fd >= 0:
+                    os.close(self._fd)
+                    self._fd = -1
+                self._lock.release()
+                raise
+        self._depth += 1
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                self._unlock_fd(self._fd)
+            finally:
+                os.close(self._fd)
+                self._fd = -1
+        self._lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:  # noqa: ANN002
+        self.release()
+
+    def _lock_fd(self, fd: int) -> None:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            return
+        # msvcrt locks a byte range and its blocking mode gives up after ~10s,
+        # so poll with the non-blocking one instead
+        while True:
+            try:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                time.sleep(self.poll)
+
+    def _unlock_fd(self, fd: int) -> None:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,347 @@
+"""Streaming import and export of M3U/M3U8, PLS and XSPF playlist files.
+
+Readers yield ``Entry`` tuples as they go (line by line, or element by
+element for XSPF, clearing each parsed element) and never hold the whole
+file. ``resolve_entries`` turns entries into items in fixed-size batches,
+looking local paths up in the library index. Writers walk a playlist's items
+and write each entry as they reach it. Memory use therefore stays flat
+however long the playlist is, apart from the playlist itself.
+"""
+
+import os
+import pathlib
+import re
+import urllib.parse
+import urllib.request
+import xml.etree.ElementTree as ET
+from typing import IO, TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from models import MediaFile, OnlineMediaFile, SourceProvider
+from ..search.youtube import _extract_video_id
+
+if TYPE_CHECKING:
+    from ..library.index import LibraryIndex
+    from .manager import PlaylistManager
+
+
+FORMATS = {".m3u": "m3u", ".m3u8": "m3u", ".pls": "pls", ".xspf": "xspf"}
+FILE_FILTER = "Playlists (*.m3u *.m3u8 *.pls *.xspf)"
+
+_XSPF_NS = "{http://xspf.org/ns/0/}"
+_PLS_KEY_RE = re.compile(r"^(file|title|length)(\d+)$", re.IGNORECASE)
+_URL_RE = re.compile(r"^[a-z][a-z0-9+.-]+:", re.IGNORECASE)
+
+
+class Entry(NamedTuple):
+    location: str  # path or URL exactly as the file gives it
+    title: Optional[str] = None
+    duration: Optional[int] = None  # seconds
+    artist: Optional[str] = None
+
+
+class ImportResult(NamedTuple):
+    added: int
+    missing: int  # local entries not found on disk or in the library
+
+
+def format_of(path: str) -> str:
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Unsupported playlist format: {path}")
+    return fmt
+
+
+def _open_text(path: str, mode: str) -> IO[str]:
+    # .m3u has no declared encoding; undecodable bytes shouldn't abort a long import
+    return open(path, mode, encoding="utf-8-sig" if "r" in mode else "utf-8", errors="replace", newline="")
+
+
+def _seconds(value: str, scale: float = 1.0) -> Optional[int]:
+    try:
+        secs = float(value) / scale
+    except ValueError:
+        return None
+    return int(round(secs)) if secs > 0 else None
+
+
+# --- readers ---
+def iter_m3u(f: IO[str]) -> Iterator[Entry]:
+    title = duration = None
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#"):
+            if line[:8].upper() == "#EXTINF:":
+                info, _, title = line[8:].partition(",")
+                duration = _seconds(info.split()[0]) if info.split() else None
+                title = title.strip() or None
+            continue
+        yield Entry(line, title, duration)
+        title = duration = None
+
+
+def iter_pls(f: IO[str]) -> Iterator[Entry]:
+    # FileN/TitleN/LengthN lines are normally grouped by N; an entry is
+    # emitted as soon as a line for another N starts
+    current: Optional[str] = None
+    fields: Dict[str, str] = {}
+    for line in f:
+        key, sep, value = line.strip().partition("=")
+        m = _PLS_KEY_RE.match(key.strip()) if sep else None
+        if not m:
+            continue
+        num = m.group(2)
+        if num != current:
+            if fields.get("file"):
+                yield Entry(fields["file"], fields.get("title"), _seconds(fields.get("length", "")))
+            current, fields = num, {}
+        fields[m.group(1).lower()] = value.strip()
+    if fields.get("file"):
+        yield Entry(fields["file"], fields.get("title"), _seconds(fields.get("length", "")))
+
+
+def iter_xspf(f: IO[bytes]) -> Iterator[Entry]:
+    parents: List[ET.Element] = []
+    for event, elem in ET.iterparse(f, events=("start", "end")):
+        if event == "start":
+            parents.append(elem)
+            continue
+        parents.pop()
+        if elem.tag.replace(_XSPF_NS, "") != "track":
+            continue
+        values = {child.tag.replace(_XSPF_NS, ""): (child.text or "").strip() for child in elem}
+        location = values.get("location")
+        if location:
+            if not _URL_RE.match(location):
+                location = urllib.parse.unquote(location)  # a relative URI
+            yield Entry(
+                location,
+                values.get("title") or None,
+                _seconds(values.get("duration", ""), 1000.0),
+                values.get("creator") or None,
+            )
+        # Drop finished tracks so the tree never holds more than one
+        if parents:
+            parents[-1].remove(elem)
+
+
+def iter_entries(path: str) -> Iterator[Entry]:
+    """Stream the entries of the playlist file at ``path``."""
+    fmt = format_of(path)
+    if fmt == "xspf":
+        with open(path, "rb") as fb:
+            yield from iter_xspf(fb)
+        return
+    with _open_text(path, "r") as f:
+        yield from (iter_m3u(f) if fmt == "m3u" else iter_pls(f))
+
+
+# --- resolution ---
+def _path_from_uri(uri: str, url2pathname: Callable[[str], str] = urllib.request.url2pathname) -> str:
+    parsed = urllib.parse.urlparse(uri)
+    path = parsed.path
+    if parsed.netloc and parsed.netloc.lower() != "localhost":
+        path = "//" + parsed.netloc + path  # UNC share (file://server/share/...)
+    return url2pathname(path)
+
+
+def _local_path(location: str, base_dir: str) -> Optional[str]:
+    if location.lower().startswith("file:"):
+        return _path_from_uri(location)
+    if _URL_RE.match(location) and not re.match(r"^[a-z]:[\\/]", location, re.IGNORECASE):
+        return None  # some other URL (but not a Windows drive path)
+    return os.path.normpath(os.path.join(base_dir, location))
+
+
+def _online_item(entry: Entry) -> Optional[OnlineMediaFile]:
+    url = entry.location
+    vid = _extract_video_id(url)
+    if vid:
+        provider, source_id = SourceProvider.youtube, vid
+    elif "soundcloud.com" in urllib.parse.urlparse(url).netloc.lower():
+        provider, source_id = SourceProvider.soundcloud, None
+    else:
+        return None
+    return OnlineMediaFile(
+        title=entry.title or url,
+        artist=entry.artist or "",
+        duration=entry.duration or 0,
+        file_path="",
+        provider=provider,
+        url=url,
+        source_id=source_id,
+    )
+
+
+def _split_title(title: Optional[str]) -> Tuple[str, Optional[str]]:
+    # EXTINF titles are conventionally "Artist - Title"
+    if title and " - " in title:
+        artist, _, rest = title.partition(" - ")
+        return artist.strip(), rest.strip()
+    return "", title
+
+
+def resolve_entries(
+    entries: Iterable[Entry],
+    base_dir: str,
+    index: Optional["LibraryIndex"] = None,
+    batch_size: int = 1000,
+) -> Iterator[Tuple[List[MediaFile], int]]:
+    """Turn entries into items, ``batch_size`` at a time.
+
+    Yields ``(items, missing)`` per batch. Local entries are looked up in
+    ``index`` (which also finds files that moved, by name). Entries it does
+    not know become plain local items; if their file does not exist either
+    they are counted as missing, but still kept so a later rescan or remount
+    can bring them back. URLs other than YouTube/SoundCloud are skipped.
+    """
+    batch: List[Tuple[Entry, Optional[str]]] = []
+
+    def flush() -> Tuple[List[MediaFile], int]:
+        known = index.resolve(p for _, p in batch if p) if index is not None else {}
+        items: List[MediaFile] = []
+        missing = 0
+        for entry, path in batch:
+            if path is None:
+                item = _online_item(entry)
+                if item is not None:
+                    items.append(item)
+                continue
+            item = known.get(path)
+            if item is None:
+                if not os.path.exists(path):
+                    missing += 1
+                artist, title = _split_title(entry.title)
+                item = MediaFile(
+                    title=title or os.path.splitext(os.path.basename(path))[0],
+                    artist=entry.artist or artist,
+                    duration=entry.duration or 0,
+                    file_path=path,
+                )
+            items.append(item)
+        batch.clear()
+        return items, missing
+
+    for entry in entries:
+        batch.append((entry, _local_path(entry.location, base_dir)))
+        if len(batch) >= batch_size:
+            yield flush()
+    if batch:
+        yield flush()
+
+
+def import_file(
+    pm: "PlaylistManager",
+    playlist: str,
+    path: str,
+    index: Optional["LibraryIndex"] = None,
+    batch_size: int = 1000,
+) -> ImportResult:
+    """Append the entries of the playlist file at ``path`` to ``playlist``.
+
+    Creates the playlist if needed and persists once at the end.
+    """
+    if pm.get(playlist) is None:
+        pm.create(playlist)
+    added = missing = 0
+    base_dir = os.path.dirname(os.path.abspath(path))
+    with pm.batch():
+        for items, lost in resolve_entries(iter_entries(path), base_dir, index, batch_size):
+            added += pm.add_many(playlist, items)
+            missing += lost
+    return ImportResult(added, missing)
+
+
+# --- writers ---
+def _location(item: MediaFile, base_dir: Optional[str]) -> Optional[str]:
+    if item.provider != SourceProvider.local:
+        return getattr(item, "url", None) or None
+    if not item.file_path:
+        return None
+    if base_dir:
+        try:
+            return os.path.relpath(item.file_path, base_dir)
+        except ValueError:  # another drive on Windows
+            pass
+    return item.file_path
+
+
+def _display(item: MediaFile) -> str:
+    return f"{item.artist} - {item.title}" if item.artist else item.title
+
+
+def _clean(text: str) -> str:
+    # Line-based formats can't carry line breaks inside a value
+    return " ".join(str(text).splitlines())
+
+
+def write_m3u(f: IO[str], items: Iterable[MediaFile], base_dir: Optional[str] = None) -> int:
+    f.write("#EXTM3U\n")
+    n = 0
+    for item in items:
+        loc = _location(item, base_dir)
+        if loc is None:
+            continue
+        f.write(f"#EXTINF:{item.duration or -1},{_clean(_display(item))}\n{loc}\n")
+        n += 1
+    return n
+
+
+def write_pls(f: IO[str], items: Iterable[MediaFile], base_dir: Optional[str] = None) -> int:
+    f.write("[playlist]\n")
+    n = 0
+    for item in items:
+        loc = _location(item, base_dir)
+        if loc is None:
+            continue
+        n += 1
+        f.write(f"File{n}={loc}\nTitle{n}={_clean(_display(item))}\nLength{n}={item.duration or -1}\n")
+    # Readers accept the count after the entries, which keeps this one pass
+    f.write(f"NumberOfEntries={n}\nVersion=2\n")
+    return n
+
+
+def write_xspf(f: IO[str], items: Iterable[MediaFile], base_dir: Optional[str] = None) -> int:
+    f.write('<?xml version="1.0" encoding="UTF-8"?>\n<playlist version="1" xmlns="http://xspf.org/ns/0/">\n<trackList>\n')
+    n = 0
+    for item in items:
+        loc = _location(item, base_dir)
+        if loc is None:
+            continue
+        if item.provider == SourceProvider.local and not os.path.isabs(loc):
+            loc = urllib.parse.quote(loc.replace(os.sep, "/"))
+        elif item.provider == SourceProvider.local:
+            loc = pathlib.Path(loc).as_uri()
+        parts = [f"<location>{escape(loc)}</location>", f"<title>{escape(item.title)}</title>"]
+        if item.artist:
+            parts.append(f"<creator>{escape(item.artist)}</creator>")
+        if item.duration:
+            parts.append(f"<duration>{int(item.duration) * 1000}</duration>")
+        f.write("<track>" + "".join(parts) + "</track>\n")
+        n += 1
+    f.write("</trackList>\n</playlist>\n")
+    return n
+
+
+_WRITERS = {"m3u": write_m3u, "pls": write_pls, "xspf": write_xspf}
+
+
+def export_file(pm: "PlaylistManager", playlist: str, path: str, relative: bool = False) -> int:
+    """Write ``playlist`` to ``path`` in the format its extension names.
+
+    Items are written straight from the manager's list; the file is replaced
+    atomically. With ``relative``, local paths are written relative to the
+    file's folder. Returns the number of entries written.
+    """
+    p = pm.get(playlist)
+    if p is None:
+        raise KeyError(playlist)
+    writer = _WRITERS[format_of(path)]
+    base_dir = os.path.dirname(os.path.abspath(path)) if relative else None
+    tmp = path + ".tmp"
+    with _open_text(tmp, "w") as f:
+        n = writer(f, p.media_files, base_dir)
+    os.replace(tmp, path)
+    return n
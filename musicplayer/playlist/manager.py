@@ -1,13 +1,98 @@
-from typing import Dict, List, Optional
+import sys
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
-from models import Playlist, MediaFile
-from .storage import PlaylistStorage
+from models import Playlist, MediaFile, SourceProvider
+from .persister import WriteBehind
+from .sqlite_storage import SqlitePlaylistStorage
+from .storage import LazyPlaylist, PlaylistStorage, _apply_op, _op_names, _order_by_keys, detach, item_key
+
+# A reorder needing more block moves than this is recorded by keys instead
+_MAX_REORDER_MOVES = 32
+
+
+def _merge_commits(older, newer):  # noqa: ANN001, ANN202
+    # Coalesced writes must keep every op; only the newest snapshot matters
+    return older[0] + newer[0], newer[1]
+
+
+def _reorder_moves(order: List[int], limit: int) -> Optional[List[Tuple[List[int], int]]]:
+    """Block moves (``indices``, ``to``, as "move" records take them) that
+    turn a list into ``[items[i] for i in order]``.
+
+    Items along a longest increasing run of old positions stay put; every
+    other run of consecutive new positions is moved in one block after its
+    new predecessor. None when that takes more than ``limit`` moves.
+    """
+    tails: List[int] = []  # smallest old position ending an increasing run of each length
+    ends: List[int] = []  # new position of that element
+    prev = [-1] * len(order)
+    for t, i in enumerate(order):
+        k = bisect_left(tails, i)
+        if k == len(tails):
+            tails.append(i)
+            ends.append(t)
+        else:
+            tails[k], ends[k] = i, t
+        prev[t] = ends[k - 1] if k else -1
+    stay = set()
+    t = ends[-1] if ends else -1
+    while t >= 0:
+        stay.add(t)
+        t = prev[t]
+    runs: List[List[Tuple[int, int]]] = []
+    for t, i in enumerate(order):
+        if t in stay:
+            continue
+        if runs and runs[-1][-1][0] == t - 1 and runs[-1][-1][1] < i:
+            runs[-1].append((t, i))
+        else:
+            runs.append([(t, i)])
+            if len(runs) > limit:
+                return None
+    cur = list(range(len(order)))
+    moves = []
+    for run in runs:
+        block = [i for _, i in run]
+        chosen = set(block)
+        at_old = {x: p for p, x in enumerate(cur) if x in chosen}
+        rest = [x for x in cur if x not in chosen]
+        t = run[0][0]
+        at = rest.index(order[t - 1]) + 1 if t else 0
+        moves.append(([at_old[i] for i in block], at))
+        cur = rest[:at] + block + rest[at:]
+    return moves if cur == order else None
 
 
 class PlaylistManager:
-    def __init__(self, storage: Optional[PlaylistStorage] = None):
+    def __init__(
+        self,
+        storage: Optional[Union[PlaylistStorage, SqlitePlaylistStorage]] = None,
+        write_delay: float = 0.0,
+    ):
         self.storage = storage or PlaylistStorage()
         self._playlists: Dict[str, Playlist] = {p.name: p for p in self.storage.load()}
+        # With a write delay, saves happen on a background thread and edits
+        # arriving within the delay are coalesced into one write
+        self._writer = (
+            WriteBehind(self._write, delay=write_delay, merge=_merge_commits) if write_delay > 0 else None
+        )
+        # Nesting depth of batch() blocks; writes are deferred while > 0
+        self._batch_depth = 0
+        # Journal records (see storage._apply_op) not yet handed to storage
+        self._ops: List[Dict[str, Any]] = []
+        # Per playlist, item_key -> ascending positions. Built on first lookup
+        # (so unopened playlists stay undecoded), extended in place by appends
+        # and dropped by edits that shift positions, to be rebuilt on demand
+        self._keys: Dict[str, Dict[str, List[int]]] = {}
+        # Called by sync() with the names of playlists changed elsewhere
+        self._subscribers: List[Callable[[Optional[Set[str]]], None]] = []
+
+    @property
+    def generation(self) -> int:
+        """Storage generation this manager is in sync with; bumped by every commit."""
+        return self.storage.generation
 
     @property
     def names(self) -> List[str]:
@@ -21,13 +106,14 @@ class PlaylistManager:
             raise ValueError(f"Playlist '{name}' already exists")
         p = Playlist(name=name, media_files=[])
         self._playlists[name] = p
-        self._persist()
+        self._persist({"op": "create", "name": name})
         return p
 
     def delete(self, name: str) -> None:
         if name in self._playlists:
             del self._playlists[name]
-            self._persist()
+            self._keys.pop(name, None)
+            self._persist({"op": "delete", "name": name})
 
     def rename(self, old: str, new: str) -> None:
         if old not in self._playlists:
@@ -37,31 +123,408 @@ class PlaylistManager:
         p = self._playlists.pop(old)
         p.name = new
         self._playlists[new] = p
-        self._persist()
+        if old in self._keys:
+            self._keys[new] = self._keys.pop(old)
+        self._persist({"op": "rename", "old": old, "new": new})
 
     def add(self, playlist: str, item: MediaFile) -> None:
         p = self._require(playlist)
         p.media_files.append(item)
-        self._persist()
+        self._index_appended(playlist, [item])
+        self._persist({"op": "add", "playlist": playlist, "items": [item]})
 
     def remove(self, playlist: str, index: int) -> None:
         p = self._require(playlist)
         if 0 <= index < len(p.media_files):
-            del p.media_files[index]
-            self._persist()
+            key = item_key(p.media_files.pop(index))
+            self._index_removed(playlist, [index], [key])
+            self._persist({"op": "remove", "playlist": playlist, "indices": [index], "keys": [key]})
 
     def move(self, playlist: str, old_index: int, new_index: int) -> None:
         p = self._require(playlist)
         if 0 <= old_index < len(p.media_files) and 0 <= new_index < len(p.media_files):
             item = p.media_files.pop(old_index)
             p.media_files.insert(new_index, item)
-            self._persist()
+            self._index_moved(playlist, [old_index], new_index)
+            self._persist(
+                {"op": "move", "playlist": playlist, "indices": [old_index], "keys": [item_key(item)], "to": new_index}
+            )
+
+    def add_many(self, playlist: str, items: Iterable[MediaFile], unique: bool = False) -> int:
+        """Append ``items`` to ``playlist``; persists once. Returns the number added.
+
+        With ``unique``, items whose ``item_key`` is already in the playlist
+        (or earlier in ``items``) are skipped.
+        """
+        p = self._require(playlist)
+        items = list(items)
+        if unique:
+            index = self._index(playlist)
+            fresh: List[MediaFile] = []
+            seen = set()
+            for it in items:
+                key = item_key(it)
+                if key not in index and key not in seen:
+                    seen.add(key)
+                    fresh.append(it)
+            items = fresh
+        if items:
+            p.media_files.extend(items)
+            self._index_appended(playlist, items)
+            self._persist({"op": "add", "playlist": playlist, "items": items})
+        return len(items)
+
+    def remove_many(self, playlist: str, indices: Iterable[int]) -> int:
+        """Remove the items at ``indices`` (out-of-range ones are ignored); persists once."""
+        p = self._require(playlist)
+        drop = sorted({i for i in indices if 0 <= i < len(p.media_files)})
+        if drop:
+            # Keys let storage find the same items if another process shifted them
+            keys = [item_key(p.media_files[i]) for i in drop]
+            chosen = set(drop)
+            p.media_files = [it for i, it in enumerate(p.media_files) if i not in chosen]
+            self._index_removed(playlist, drop, keys)
+            self._persist({"op": "remove", "playlist": playlist, "indices": drop, "keys": keys})
+        return len(drop)
+
+    def move_many(self, playlist: str, indices: Iterable[int], new_index: int) -> int:
+        """Move the items at ``indices`` as a block so the first lands at ``new_index``.
+
+        The moved items keep their relative order; ``new_index`` is a position
+        in the resulting list and is clamped to it. Persists once.
+        """
+        p = self._require(playlist)
+        picked = sorted({i for i in indices if 0 <= i < len(p.media_files)})
+        if not picked:
+            return 0
+        chosen = set(picked)
+        block = [p.media_files[i] for i in picked]
+        rest = [it for i, it in enumerate(p.media_files) if i not in chosen]
+        at = max(0, min(new_index, len(rest)))
+        p.media_files = rest[:at] + block + rest[at:]
+        self._index_moved(playlist, picked, at)
+        self._persist(
+            {"op": "move", "playlist": playlist, "indices": picked, "keys": [item_key(it) for it in block], "to": at}
+        )
+        return len(block)
+
+    def reorder(self, playlist: str, keys: Iterable[str]) -> bool:
+        """Put ``playlist`` in the order given by item keys; persists once.
+
+        The n-th occurrence of a key in ``keys`` takes the n-th item with that
+        key, so duplicates keep their identity. Items ``keys`` does not
+        account for stay, in their current order, after the ordered ones.
+        Returns False when the order did not change.
+
+        Recorded as a few block moves when that is all it takes (e.g. items
+        dragged around), otherwise as the new order of keys; either way
+        another process's concurrent edits to the playlist survive.
+        """
+        p = self._require(playlist)
+        items = p.media_files
+        order = _order_by_keys(self._index(playlist), len(items), keys)
+        if all(i == pos for pos, i in enumerate(order)):
+            return False
+        moves = _reorder_moves(order, _MAX_REORDER_MOVES)
+        p.media_files = [items[i] for i in order]
+        if moves is None:
+            self._keys.pop(playlist, None)  # every position changed; rebuilt on demand
+            self._persist({"op": "reorder", "playlist": playlist, "keys": [item_key(it) for it in p.media_files]})
+            return True
+        ops = []
+        cur = items
+        for picked, at in moves:
+            chosen = set(picked)
+            block = [cur[i] for i in picked]
+            rest = [it for i, it in enumerate(cur) if i not in chosen]
+            cur = rest[:at] + block + rest[at:]
+            self._index_moved(playlist, picked, at)
+            ops.append(
+                {"op": "move", "playlist": playlist, "indices": picked, "keys": [item_key(it) for it in block], "to": at}
+            )
+        self._persist(*ops)
+        return True
+
+    def contains(self, playlist: str, item: Union[MediaFile, str]) -> bool:
+        """Whether ``playlist`` holds an item with the key of ``item`` (an item or a key)."""
+        return bool(self.positions(playlist, item))
+
+    def positions(self, playlist: str, item: Union[MediaFile, str]) -> List[int]:
+        """Indices of the items in ``playlist`` sharing the key of ``item``."""
+        key = item if isinstance(item, str) else item_key(item)
+        return list(self._index(playlist).get(key, ()))
+
+    @contextmanager
+    def batch(self) -> Iterator["PlaylistManager"]:
+        """Group several mutations so they are written to storage once.
+
+        ``with pm.batch(): ...`` defers every persist until the outermost
+        block exits (also on error, so in-memory and on-disk state agree).
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._commit()
+
+    def update_durations(self, durations: Dict[str, int]) -> int:
+        """Fill in durations (seconds) of local items by file path; persists once.
+
+        Only playlists whose items are already decoded are looked at (through
+        the key index), so unopened lazy playlists stay undecoded; they get
+        their durations when they are opened and probed.
+        """
+        touched = 0
+        ops = []
+        for p in self._decoded():
+            index = self._index(p.name)
+            items = p.media_files
+            values: Dict[str, Any] = {}
+            for path, d in durations.items():
+                for i in index.get(f"{SourceProvider.local.value}:{path}", ()):
+                    it = items[i]
+                    if d and d != it.duration:
+                        it.duration = d
+                        touched += 1
+                        values[item_key(it)] = d
+            if values:
+                ops.append({"op": "patch", "playlist": p.name, "field": "duration", "values": values})
+        if ops:
+            self._persist(*ops)
+        return touched
+
+    def update_availability(self, availability: Dict[str, str]) -> int:
+        """Flag YouTube items by video ID (see ``audit.py``); persists once.
+
+        Only ``availability`` changes, so items whose video is gone keep the
+        title and artist they were saved with.
+        """
+        # Unopened playlists are only read to see whether anything changes;
+        # just the ones that do change are kept decoded
+        changed = {
+            name
+            for name, it in self.iter_items()
+            if it.provider == SourceProvider.youtube
+            and availability.get(it.source_id)
+            and availability[it.source_id] != it.availability
+        }
+        touched = 0
+        ops = []
+        for name in changed:
+            p = self._playlists[name]
+            values: Dict[str, Any] = {}
+            for it in p.media_files:
+                if it.provider != SourceProvider.youtube:
+                    continue
+                a = availability.get(it.source_id)
+                if a and a != it.availability:
+                    it.availability = sys.intern(a)
+                    touched += 1
+                    values[item_key(it)] = a
+            if values:
+                ops.append({"op": "patch", "playlist": p.name, "field": "availability", "values": values})
+        if ops:
+            self._persist(*ops)
+        return touched
+
+    def collapse_duplicates(self, canonical: Dict[str, str], playlist: Optional[str] = None) -> int:
+        """Point local items at their canonical copy and drop repeats.
+
+        ``canonical`` maps duplicate file paths to the path that replaces
+        them (see ``DuplicateReport.canonical_map``). Within each playlist only
+        the first occurrence of a canonical file is kept. Applies to one
+        playlist or, by default, all of them; returns the number of items
+        rewritten or removed.
+        """
+        targets = [self._require(playlist)] if playlist else self.all()
+        touched = 0
+        ops = []
+        for p in targets:
+            before = touched
+            seen = set()
+            kept: List[MediaFile] = []
+            for it in p.media_files:
+                if it.provider != SourceProvider.local or not it.file_path:
+                    kept.append(it)
+                    continue
+                path = canonical.get(it.file_path, it.file_path)
+                if path in seen:
+                    touched += 1
+                    continue
+                seen.add(path)
+                if path != it.file_path:
+                    it.file_path = path
+                    touched += 1
+                kept.append(it)
+            p.media_files = kept
+            if touched > before:
+                self._keys.pop(p.name, None)
+                ops.append({"op": "set", "playlist": p.name, "items": list(kept)})
+        if ops:
+            self._persist(*ops)
+        return touched
 
     def all(self) -> List[Playlist]:
         return list(self._playlists.values())
 
-    def _persist(self) -> None:
-        self.storage.save(self.all())
+    def iter_items(self) -> Iterator[Tuple[str, MediaFile]]:
+        """``(playlist name, item)`` for every item of every playlist.
+
+        Unopened lazy playlists are read through storage one at a time and
+        not kept, so a pass over the whole library does not leave it all
+        decoded in memory.
+        """
+        for p in self.all():
+            items = p.peek() if isinstance(p, LazyPlaylist) else p.media_files
+            for it in items:
+                yield p.name, it
+
+    def _decoded(self) -> List[Playlist]:
+        # Playlists whose items are in memory
+        return [p for p in self._playlists.values() if not isinstance(p, LazyPlaylist) or p.loaded]
+
+    def _persist(self, *ops: Dict[str, Any]) -> None:
+        """Record ``ops`` and write them out (deferred inside ``batch()``).
+
+        Called without ops after changing playlists directly, which makes
+        storage write a full snapshot.
+        """
+        if not ops:
+            self._keys.clear()  # items may have changed in any way
+        self._ops.extend(ops or ({"op": "snapshot"},))
+        if not self._batch_depth:
+            self._commit()
+
+    def _commit(self) -> None:
+        if not self._ops:
+            return
+        ops, self._ops = self._ops, []
+        # Shallow copies, so later edits on this thread don't race the writer;
+        # playlists never opened stay undecoded
+        snapshot = [detach(p) for p in self.all()]
+        if self._writer is None:
+            self._write((ops, snapshot))
+        else:
+            self._writer.submit((ops, snapshot))
+
+    def _write(self, payload: Tuple[List[Dict[str, Any]], List[Playlist]]) -> None:
+        ops, snapshot = payload
+        self.storage.commit(ops, snapshot)
+
+    def subscribe(self, callback: Callable[[Optional[Set[str]]], None]) -> None:
+        """Call ``callback`` whenever ``sync`` brings in changes made elsewhere.
+
+        It receives the names of the playlists involved, or None when
+        everything was reloaded.
+        """
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Optional[Set[str]]], None]) -> None:
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def sync(self) -> bool:
+        """Pick up edits other managers or processes committed to the same storage.
+
+        Pending local edits are written first. Other processes' journal
+        records are replayed here one by one; when that is not possible
+        (the storage was compacted elsewhere, or both sides restructured the
+        same playlist) everything is reloaded. Returns True if anything
+        changed; subscribers are notified. Does nothing inside ``batch()``.
+        """
+        if self._batch_depth:
+            return False
+        self.flush()
+        ops = self.storage.poll()
+        if ops is not None and not ops:
+            return False
+        changed: Optional[Set[str]]
+        if ops is None:
+            self._playlists = {p.name: p for p in self.storage.load()}
+            self._keys.clear()
+            changed = None
+        else:
+            changed = set()
+            for op in ops:
+                _apply_op(self._playlists, op)
+                changed.update(_op_names(op))
+            for name in changed:
+                self._keys.pop(name, None)
+        for callback in list(self._subscribers):
+            callback(changed)
+        return True
+
+    def flush(self) -> None:
+        """Block until every change so far has been written."""
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self) -> None:
+        """Write pending changes and stop the background writer, if any."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def _index(self, name: str) -> Dict[str, List[int]]:
+        index = self._keys.get(name)
+        if index is None:
+            index = {}
+            for i, it in enumerate(self._require(name).media_files):
+                index.setdefault(item_key(it), []).append(i)
+            self._keys[name] = index
+        return index
+
+    def _index_appended(self, name: str, items: List[MediaFile]) -> None:
+        index = self._keys.get(name)
+        if index is None:
+            return
+        start = len(self._playlists[name].media_files) - len(items)
+        for i, it in enumerate(items, start):
+            index.setdefault(item_key(it), []).append(i)
+
+    def _index_removed(self, name: str, drop: List[int], keys: List[str]) -> None:
+        # ``drop``: ascending removed positions, ``keys`` their keys
+        index = self._keys.get(name)
+        if index is None or not drop:
+            return
+        gone = set(drop)
+        for key in set(keys):
+            kept = [i for i in index.get(key, ()) if i not in gone]
+            if kept:
+                index[key] = kept
+            else:
+                index.pop(key, None)
+        lo = drop[0]
+        for positions in index.values():
+            if positions[-1] > lo:
+                for j in range(bisect_right(positions, lo), len(positions)):
+                    positions[j] -= bisect_left(drop, positions[j])
+
+    def _index_moved(self, name: str, picked: List[int], at: int) -> None:
+        # Same arguments as a "move" record: ascending old positions of the
+        # block, and where it starts among the remaining items
+        index = self._keys.get(name)
+        if index is None or not picked:
+            return
+        n = len(picked)
+        new_of = {p: at + k for k, p in enumerate(picked)}
+        # Positions outside [lo, hi] keep their place
+        lo, hi = min(picked[0], at), max(picked[-1], at + n - 1)
+
+        def new(p: int) -> int:
+            if p in new_of:
+                return new_of[p]
+            r = p - bisect_left(picked, p)
+            return r if r < at else r + n
+
+        for key, positions in index.items():
+            if positions[-1] < lo or positions[0] > hi:
+                continue
+            moved = sorted(new(p) if lo <= p <= hi else p for p in positions)
+            if moved != positions:
+                index[key] = moved
 
     def _require(self, name: str) -> Playlist:
         p = self.get(name)
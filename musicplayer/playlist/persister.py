@@ -0,0 +1,150 @@
+"""Write-behind persistence for playlists.
+
+``PlaylistManager`` hands a cheap snapshot of its playlists to a
+``WriteBehind`` after each change. A background thread waits until changes
+stop arriving for ``delay`` seconds (or ``max_delay`` has passed since the
+first pending one) and saves only the newest snapshot, so a burst of edits
+costs one write and the GUI thread never waits on the disk. With ``merge``
+a newer submission is combined with the pending one instead of replacing it
+(e.g. to accumulate journal records). A failed save is put back in front of
+anything submitted since and retried with exponential backoff (up to
+``max_backoff`` seconds), so a transient error (disk full, file locked by a
+virus scanner) does not lose edits.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class WriteBehind:
+    def __init__(
+        self,
+        save: Callable[[Any], None],
+        delay: float = 0.5,
+        max_delay: float = 2.0,
+        merge: Optional[Callable[[Any, Any], Any]] = None,
+        max_backoff: float = 30.0,
+    ) -> None:
+        self._save = save
+        self._merge = merge
+        self.delay = delay
+        self.max_delay = max_delay
+        self.max_backoff = max_backoff
+        self._cond = threading.Condition()
+        self._pending: Any = None
+        self._has_pending = False
+        self._writing = False
+        self._flush_now = False
+        self._closed = False
+        self._first = 0.0
+        self._last = 0.0
+        # Failed saves in a row, and in total (lets flush() notice one)
+        self._failures = 0
+        self._errors = 0
+        self._retry_at = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def pending(self) -> bool:
+        with self._cond:
+            return self._has_pending or self._writing
+
+    def submit(self, snapshot: Any) -> None:
+        """Queue ``snapshot`` for saving, replacing any snapshot not yet written."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("WriteBehind is closed")
+            now = time.monotonic()
+            if not self._has_pending:
+                self._first = now
+            elif self._merge is not None:
+                snapshot = self._merge(self._pending, snapshot)
+            self._pending, self._has_pending, self._last = snapshot, True, now
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="playlist-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+            self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write any pending snapshot now.
+
+        Returns False if ``timeout`` ran out or the save failed (it stays
+        queued for a retry).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            errors = self._errors
+            self._flush_now = True
+            self._cond.notify_all()
+            try:
+                while self._has_pending or self._writing:
+                    if self._thread is None or not self._thread.is_alive() or self._errors != errors:
+                        return False
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self._flush_now = False
+        return True
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Flush and stop the writer thread."""
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+            atexit.unregister(self.close)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._has_pending:
+                        now = time.monotonic()
+                        due = max(min(self._last + self.delay, self._first + self.max_delay), self._retry_at)
+                        if self._flush_now or self._closed or now >= due:
+                            break
+                        self._cond.wait(due - now)
+                    elif self._closed:
+                        return
+                    else:
+                        self._cond.wait()
+                snapshot, self._pending, self._has_pending = self._pending, None, False
+                self._writing = True
+            try:
+                self._save(snapshot)
+                failed = False
+            except Exception:
+                logging.exception("Saving playlists failed")
+                failed = True
+            with self._cond:
+                self._writing = False
+                if not failed:
+                    self._failures, self._retry_at = 0, 0.0
+                elif self._closed:
+                    logging.error("Discarding unsaved playlist changes after a failed save on close")
+                else:
+                    self._requeue(snapshot)
+                self._cond.notify_all()
+
+    def _requeue(self, snapshot: Any) -> None:
+        # Caller holds the condition. The failed snapshot is older than
+        # anything submitted while it was being written
+        if self._has_pending:
+            if self._merge is not None:
+                self._pending = self._merge(snapshot, self._pending)
+        else:
+            self._pending, self._has_pending = snapshot, True
+            self._first = self._last = time.monotonic()
+        self._errors += 1
+        self._failures += 1
+        self._retry_at = time.monotonic() + min(self.max_backoff, self.delay * 2 ** self._failures)
+        self._flush_now = False  # one attempt per flush(); retries follow the backoff
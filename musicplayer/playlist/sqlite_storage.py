@@ -0,0 +1,345 @@
+"""SQLite playlist storage with one row per item.
+
+Items are ordered by a REAL ``pos`` column. New items are appended ``_GAP``
+past the last one and moved items are given positions between their new
+neighbours, so ``add``/``remove``/``move`` touch only the affected rows. When
+repeated moves exhaust the room between two neighbours, that playlist's
+positions are renumbered once.
+
+Implements the same ``load``/``commit``/``save`` interface as
+``PlaylistStorage``, including lazily loaded playlists: ``load`` reads only
+the playlist table. ``migrate_json`` imports an existing ``playlists.json``.
+
+Other processes may use the same database. Every commit bumps a
+``generation`` in the meta table inside its write transaction. A commit that
+finds someone else's generation first refreshes its row caches and, until
+the caller reloads, rebases its position-based edits (remove/move) onto the
+rows as they are now, finding each item by key (see ``_rebase_op``); ``poll``
+then asks the caller to reload.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from models import MediaFile, Playlist
+from . import codec
+from .storage import (
+    _PATCHABLE,
+    DEFAULT_PLAYLISTS_PATH,
+    LazyPlaylist,
+    PlaylistStorage,
+    _items_from_json,
+    _order_by_keys,
+    _rebase_op,
+    _slots,
+    item_key,
+)
+
+
+DEFAULT_PLAYLISTS_DB_PATH = os.path.join(os.getcwd(), "playlists.db")
+
+_GAP = 1024.0
+# Smallest spacing kept between neighbouring positions before renumbering
+_MIN_SPACING = 1e-6
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS playlists (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    pos REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    playlist_id INTEGER NOT NULL REFERENCES playlists(id) ON DELETE CASCADE,
+    pos REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_order ON items(playlist_id, pos);
+INSERT OR IGNORE INTO meta(key, value) VALUES ('generation', 0);
+"""
+
+
+def _encode(item: MediaFile) -> str:
+    return json.dumps(codec.encode(item), separators=(",", ":"))
+
+
+class SqlitePlaylistStorage:
+    def __init__(self, path: str = DEFAULT_PLAYLISTS_DB_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        # name -> playlist row id, and playlist id -> [(item id, pos)] in order
+        # (filled per playlist on first use); maps the manager's list indices
+        # to rows without querying
+        self._ids: Dict[str, int] = {}
+        self._rows: Dict[int, List[Tuple[int, float]]] = {}
+        # Generation of the database our caches (and the caller) reflect, and
+        # whether another process has committed since
+        self._generation = 0
+        self._stale = False
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def _read_generation(self) -> int:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return int(row[0]) if row else 0
+
+    def poll(self) -> Optional[List[Dict[str, Any]]]:
+        """``[]`` when nobody else committed since ``load``; None means reload."""
+        with self._lock:
+            if self._stale or self._read_generation() != self._generation:
+                return None
+            return []
+
+    def _begin(self) -> None:
+        # Take the write lock up front so the generation can't move under us
+        self._conn.execute("BEGIN IMMEDIATE")
+        current = self._read_generation()
+        if current != self._generation:
+            # Until the caller reloads, its indices may not match our rows
+            self._stale = True
+            self._ids = {name: pid for pid, name in self._conn.execute("SELECT id, name FROM playlists")}
+            self._rows = {}
+        self._generation = current + 1
+        self._conn.execute("UPDATE meta SET value = ? WHERE key = 'generation'", (self._generation,))
+
+    def _rebase(
+        self, op: Dict[str, Any], playlists: List[Playlist], settled: Set[str]
+    ) -> Optional[Dict[str, Any]]:
+        # Inside the write transaction, so the rows can't change under us
+        name = op.get("playlist")
+        if name is None or not self._stale:
+            return op
+        if name in settled:
+            return None
+        pid = self._ids.get(name)
+        if pid is None:
+            logging.warning("Playlist '%s' was deleted or renamed by another process; dropping an edit to it", name)
+            return None
+        rebased = _rebase_op(self._keys_of(pid), op) if op.get("op") in ("remove", "move") else op
+        if rebased is None:
+            logging.warning("Playlist '%s' was changed by another process too; keeping this process's version", name)
+            # Our final state covers the rest of this commit's records for it
+            settled.add(name)
+            mine = {p.name: p for p in playlists}.get(name)
+            return {"op": "set", "playlist": name, "items": list(mine.media_files)} if mine is not None else None
+        return rebased
+
+    def _keys_of(self, pid: int) -> List[str]:
+        rows = self._conn.execute("SELECT data FROM items WHERE playlist_id = ? ORDER BY pos, id", (pid,)).fetchall()
+        return [item_key(it) for it in _items_from_json([json.loads(data) for (data,) in rows])]
+
+    def load(self) -> List[Playlist]:
+        with self._lock:
+            self._ids, self._rows = {}, {}
+            self._generation, self._stale = self._read_generation(), False
+            playlists = []
+            for pid, name in self._conn.execute("SELECT id, name FROM playlists ORDER BY pos, id"):
+                playlists.append(LazyPlaylist(name, self._load_items, pid))
+                self._ids[name] = pid
+        return playlists
+
+    def _load_items(self, pid: int) -> List[MediaFile]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, pos, data FROM items WHERE playlist_id = ? ORDER BY pos, id", (pid,)
+            ).fetchall()
+            self._rows[pid] = [(iid, pos) for iid, pos, _ in rows]
+        # Rows written before the codec hold one JSON object per item
+        with codec.paused_gc():
+            return _items_from_json([json.loads(data) for _, _, data in rows])
+
+    def _rows_of(self, pid: int) -> List[Tuple[int, float]]:
+        rows = self._rows.get(pid)
+        if rows is None:
+            rows = self._rows[pid] = [
+                (iid, pos)
+                for iid, pos in self._conn.execute(
+                    "SELECT id, pos FROM items WHERE playlist_id = ? ORDER BY pos, id", (pid,)
+                )
+            ]
+        return rows
+
+    def commit(self, ops: Iterable[Dict[str, Any]], playlists: List[Playlist]) -> None:
+        """Apply the manager's journal ops as row updates in one transaction."""
+        ops = list(ops)
+        if any(op.get("op") == "snapshot" for op in ops):
+            self.save(playlists)
+            return
+        with self._lock:
+            try:
+                with self._conn:
+                    self._begin()
+                    settled: Set[str] = set()
+                    for op in ops:
+                        op = self._rebase(op, playlists, settled)
+                        if op is not None:
+                            self._apply(op)
+            except Exception:
+                self.load()  # resync the position caches with what was rolled back
+                raise
+
+    def save(self, playlists: List[Playlist]) -> None:
+        """Replace everything with ``playlists``.
+
+        Rows of playlists that were never loaded are kept as they are.
+        """
+        keep = {p.source: p for p in playlists if isinstance(p, LazyPlaylist) and p.unloaded_from(self._load_items)}
+        with self._lock, self._conn:
+            self._begin()
+            marks = ",".join("?" * len(keep))
+            self._conn.execute(f"DELETE FROM playlists WHERE id NOT IN ({marks})", list(keep))
+            # Park kept names first so renames among them can't collide
+            self._conn.executemany("UPDATE playlists SET name = ? WHERE id = ?", [(f"\0{pid}", pid) for pid in keep])
+            self._ids = {}
+            self._rows = {pid: rows for pid, rows in self._rows.items() if pid in keep}
+            for i, p in enumerate(playlists):
+                if isinstance(p, LazyPlaylist) and p.unloaded_from(self._load_items) and keep[p.source] is p:
+                    pid = p.source
+                    self._conn.execute("UPDATE playlists SET name = ?, pos = ? WHERE id = ?", (p.name, i * _GAP, pid))
+                else:
+                    pid = self._conn.execute(
+                        "INSERT INTO playlists(name, pos) VALUES (?, ?)", (p.name, i * _GAP)
+                    ).lastrowid
+                    self._rows[pid] = []
+                    self._append(pid, p.media_files)
+                self._ids[p.name] = pid
+
+    def _apply(self, op: Dict[str, Any]) -> None:
+        kind = op["op"]
+        if kind == "create":
+            if op["name"] in self._ids:
+                return  # another process created it first
+            pid = self._conn.execute(
+                "INSERT INTO playlists(name, pos) VALUES (?, (SELECT COALESCE(MAX(pos), 0) + ? FROM playlists))",
+                (op["name"], _GAP),
+            ).lastrowid
+            self._ids[op["name"]] = pid
+            self._rows[pid] = []
+        elif kind == "delete":
+            pid = self._ids.pop(op["name"], None)
+            if pid is not None:
+                self._conn.execute("DELETE FROM playlists WHERE id = ?", (pid,))
+                self._rows.pop(pid, None)
+        elif kind == "rename":
+            pid = self._ids.pop(op["old"], None)
+            if pid is not None:
+                # The manager moves a renamed playlist to the end of its order
+                self._conn.execute(
+                    "UPDATE playlists SET name = ?, pos = (SELECT MAX(pos) + ? FROM playlists) WHERE id = ?",
+                    (op["new"], _GAP, pid),
+                )
+                self._ids[op["new"]] = pid
+        else:
+            pid = self._ids.get(op["playlist"])
+            if pid is None:
+                return
+            if kind == "add":
+                self._append(pid, op["items"])
+            elif kind == "set":
+                self._conn.execute("DELETE FROM items WHERE playlist_id = ?", (pid,))
+                self._rows[pid] = []
+                self._append(pid, op["items"])
+            elif kind == "remove":
+                self._remove(pid, op["indices"])
+            elif kind == "move":
+                self._move(pid, op["indices"], op["to"])
+            elif kind == "reorder":
+                rows = self._rows_of(pid)
+                order = _order_by_keys(_slots(self._keys_of(pid)), len(rows), op["keys"])
+                self._renumber(pid, [rows[i][0] for i in order])
+            elif kind == "patch" and op.get("field") in _PATCHABLE:
+                self._patch(pid, op["field"], op["values"])
+
+    def _patch(self, pid: int, field: str, values: Dict[str, Any]) -> None:
+        changed = []
+        for iid, data in self._conn.execute("SELECT id, data FROM items WHERE playlist_id = ?", (pid,)).fetchall():
+            item = _items_from_json([json.loads(data)])[0]
+            v = values.get(item_key(item))
+            if v is not None and hasattr(item, field):
+                setattr(item, field, v)
+                changed.append((_encode(item), iid))
+        self._conn.executemany("UPDATE items SET data = ? WHERE id = ?", changed)
+
+    def _append(self, pid: int, items: Iterable[MediaFile]) -> None:
+        rows = self._rows_of(pid)
+        pos = rows[-1][1] if rows else 0.0
+        for item in items:
+            pos += _GAP
+            iid = self._conn.execute(
+                "INSERT INTO items(playlist_id, pos, data) VALUES (?, ?, ?)", (pid, pos, _encode(item))
+            ).lastrowid
+            rows.append((iid, pos))
+
+    def _remove(self, pid: int, indices: Iterable[int]) -> None:
+        rows = self._rows_of(pid)
+        drop = {i for i in indices if 0 <= i < len(rows)}
+        self._conn.executemany("DELETE FROM items WHERE id = ?", [(rows[i][0],) for i in drop])
+        self._rows[pid] = [r for i, r in enumerate(rows) if i not in drop]
+
+    def _move(self, pid: int, indices: Iterable[int], to: int) -> None:
+        rows = self._rows_of(pid)
+        chosen = {i for i in indices if 0 <= i < len(rows)}
+        if not chosen:
+            return
+        block = [rows[i][0] for i in sorted(chosen)]
+        rest = [r for i, r in enumerate(rows) if i not in chosen]
+        at = max(0, min(to, len(rest)))
+        lo = rest[at - 1][1] if at > 0 else (rest[0][1] - _GAP if rest else 0.0)
+        hi = rest[at][1] if at < len(rest) else lo + _GAP * (len(block) + 1)
+        step = (hi - lo) / (len(block) + 1)
+        if step < _MIN_SPACING:
+            self._renumber(pid, [r[0] for r in rest[:at]] + block + [r[0] for r in rest[at:]])
+            return
+        moved = [(iid, lo + step * (k + 1)) for k, iid in enumerate(block)]
+        self._conn.executemany("UPDATE items SET pos = ? WHERE id = ?", [(pos, iid) for iid, pos in moved])
+        self._rows[pid] = rest[:at] + moved + rest[at:]
+
+    def _renumber(self, pid: int, order: List[int]) -> None:
+        rows = [(iid, (k + 1) * _GAP) for k, iid in enumerate(order)]
+        self._conn.executemany("UPDATE items SET pos = ? WHERE id = ?", [(pos, iid) for iid, pos in rows])
+        self._rows[pid] = rows
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def migrate_json(json_path: str = DEFAULT_PLAYLISTS_PATH, db_path: str = DEFAULT_PLAYLISTS_DB_PATH) -> int:
+    """One-time import of ``playlists.json`` (and its journal) into ``db_path``.
+
+    Does nothing when the database already holds playlists or was migrated
+    before; returns the number of playlists imported. The JSON files are
+    left in place and unmodified.
+    """
+    storage = SqlitePlaylistStorage(db_path)
+    try:
+        with storage._lock:
+            done = storage._conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from'").fetchone()
+            has_rows = storage._conn.execute("SELECT 1 FROM playlists LIMIT 1").fetchone()
+        if done or has_rows or not os.path.exists(json_path):
+            return 0
+        playlists = PlaylistStorage(json_path).read()
+        storage.save(playlists)
+        with storage._lock, storage._conn:
+            storage._conn.execute(
+                "INSERT OR REPLACE INTO meta(key, value) VALUES ('migrated_from', ?)", (os.path.abspath(json_path),)
+            )
+        return len(playlists)
+    finally:
+        storage.close()
@@ -1,16 +1,46 @@
 import json
+import logging
 import os
-from dataclasses import asdict
-from typing import List, Union, Dict, Any
+import re
+import threading
+from dataclasses import dataclass
+from typing import List, Union, Dict, Any, Iterable, Callable, Optional, Set, Tuple
 
 from models import MediaFile, OnlineMediaFile, Playlist, SourceProvider
+from . import codec
+from .filelock import FileLock
 
 
 DEFAULT_PLAYLISTS_PATH = os.path.join(os.getcwd(), "playlists.json")
 
+# The journal is folded into a fresh snapshot once it grows past this many
+# bytes or past the size of the snapshot itself, whichever is larger
+COMPACT_MIN_BYTES = 256 * 1024
+
+_HEAD_SEQ_RE = re.compile(rb'^\{"seq":(\d+)')
+
+
+# Public attributes of the older one-dict-per-item layout (OnlineMediaFile
+# derives url/thumbnail_url from private fields, so asdict() would not
+# produce them); the default layout is codec rows
+_MEDIAFILE_FIELDS = ("title", "artist", "duration", "file_path", "provider", "note")
+_ONLINE_FIELDS = _MEDIAFILE_FIELDS + ("url", "source_id", "streaming_quality", "thumbnail_url", "availability")
+
+
+def item_key(it: MediaFile) -> str:
+    """Identity of an item for duplicate checks: provider plus file path or source id/URL."""
+    prov = getattr(it, "provider", None)
+    prov_val = prov.value if hasattr(prov, "value") else str(prov)
+    if prov_val == "local":
+        return f"{prov_val}:{getattr(it, 'file_path', '')}"
+    sid = getattr(it, "source_id", None)
+    url = getattr(it, "url", None)
+    return f"{prov_val}:{sid or url or ''}"
+
 
 def _mediafile_to_dict(item: Union[MediaFile, OnlineMediaFile]) -> Dict[str, Any]:
-    data = asdict(item)
+    names = _ONLINE_FIELDS if isinstance(item, OnlineMediaFile) else _MEDIAFILE_FIELDS
+    data = {name: getattr(item, name) for name in names}
     # Enum to value
     if isinstance(item.provider, SourceProvider):
         data["provider"] = item.provider.value
@@ -34,6 +64,7 @@ def _dict_to_mediafile(d: Dict[str, Any]) -> Union[MediaFile, OnlineMediaFile]:
             source_id=d.get("source_id"),
             streaming_quality=d.get("streaming_quality"),
             thumbnail_url=d.get("thumbnail_url"),
+            availability=d.get("availability"),
         )
     return MediaFile(
         title=d.get("title", ""),
@@ -45,29 +76,626 @@ def _dict_to_mediafile(d: Dict[str, Any]) -> Union[MediaFile, OnlineMediaFile]:
     )
 
 
+def _items_to_json(items: List[MediaFile], compact: bool) -> List[Any]:
+    return codec.encode_many(items) if compact else [_mediafile_to_dict(it) for it in items]
+
+
+def _items_from_json(items: List[Any]) -> List[MediaFile]:
+    # Accepts codec rows and the older per-item dicts alike
+    return codec.decode_many(items, _dict_to_mediafile)
+
+
+class LazyPlaylist(Playlist):
+    """A playlist whose items are decoded from storage on first access.
+
+    ``source`` tells the storage where the items live; it is only meaningful
+    while the playlist is not loaded, i.e. while its items are exactly what
+    the storage holds for it.
+    """
+
+    def __init__(self, name: str, load: Callable[[Any], List[MediaFile]], source: Any):
+        self.name = name
+        self.source = source
+        self._load = load
+        self._items: Optional[List[MediaFile]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._items is not None
+
+    def unloaded_from(self, load: Callable[[Any], List[MediaFile]]) -> bool:
+        """True while the items are still only in the storage behind ``load``."""
+        return self._items is None and self._load == load
+
+    @property  # type: ignore[override]
+    def media_files(self) -> List[MediaFile]:
+        items = self._items
+        if items is None:
+            with self._lock:
+                if self._items is None:
+                    self._items = self._load(self.source)
+                items = self._items
+        return items
+
+    @media_files.setter
+    def media_files(self, items: List[MediaFile]) -> None:
+        self._items = items
+
+    def peek(self) -> List[MediaFile]:
+        """The items, decoded just for the caller if not loaded yet (not kept)."""
+        items = self._items
+        return items if items is not None else self._load(self.source)
+
+
+def detach(p: Playlist) -> Playlist:
+    """A copy of ``p`` that later edits to ``p`` cannot change.
+
+    Unloaded lazy playlists are copied without loading them.
+    """
+    if isinstance(p, LazyPlaylist) and not p.loaded:
+        return LazyPlaylist(p.name, p._load, p.source)
+    return Playlist(name=p.name, media_files=list(p.media_files))
+
+
+def _playlist_to_json(p: Playlist, compact: bool = True) -> bytes:
+    wire = {"name": p.name, "rows" if compact else "media_files": _items_to_json(p.media_files, compact)}
+    return json.dumps(wire, separators=(",", ":")).encode("utf-8")
+
+
+def _playlist_items(data: Dict[str, Any]) -> List[MediaFile]:
+    return _items_from_json(data.get("rows") or data.get("media_files") or [])
+
+
+@dataclass
+class _Span:
+    # Where one playlist's JSON object sits in the snapshot file
+    name: str
+    offset: int
+    length: int
+
+
+def _encode_op(op: Dict[str, Any], compact: bool = True) -> Dict[str, Any]:
+    if "items" in op:
+        op = dict(op, items=_items_to_json(op["items"], compact))
+    return op
+
+
+def _order_by_keys(slots: Dict[str, List[int]], count: int, keys: Iterable[str]) -> List[int]:
+    """Positions of a playlist's ``count`` items in the order ``keys`` gives.
+
+    ``slots`` maps each key to its ascending positions. The n-th occurrence
+    of a key takes the n-th item with that key, so duplicates keep their
+    identity; items ``keys`` does not account for follow in their order.
+    """
+    taken: Dict[str, int] = {}
+    order: List[int] = []
+    for key in keys:
+        free = slots.get(key)
+        n = taken.get(key, 0)
+        if free and n < len(free):
+            order.append(free[n])
+            taken[key] = n + 1
+    used = set(order)
+    order.extend(i for i in range(count) if i not in used)
+    return order
+
+
+def _slots(keys: Iterable[str]) -> Dict[str, List[int]]:
+    slots: Dict[str, List[int]] = {}
+    for j, key in enumerate(keys):
+        slots.setdefault(key, []).append(j)
+    return slots
+
+
+# Item attributes a "patch" record may set
+_PATCHABLE = frozenset({"duration", "availability"})
+
+
+def _apply_op(playlists: Dict[str, Playlist], op: Dict[str, Any]) -> None:
+    """Replay one journal record; mirrors the corresponding PlaylistManager method."""
+    kind = op.get("op")
+    if kind == "create":
+        playlists.setdefault(op["name"], Playlist(name=op["name"], media_files=[]))
+    elif kind == "delete":
+        playlists.pop(op["name"], None)
+    elif kind == "rename":
+        p = playlists.pop(op["old"], None)
+        if p is not None:
+            p.name = op["new"]
+            playlists[op["new"]] = p
+    elif op.get("playlist") in playlists:
+        p = playlists[op["playlist"]]
+        if kind == "add":
+            p.media_files.extend(_items_from_json(op["items"]))
+        elif kind == "set":
+            p.media_files = _items_from_json(op["items"])
+        elif kind == "remove":
+            drop = set(op["indices"])
+            p.media_files = [it for i, it in enumerate(p.media_files) if i not in drop]
+        elif kind == "move":
+            chosen = set(op["indices"])
+            block = [p.media_files[i] for i in sorted(chosen) if i < len(p.media_files)]
+            rest = [it for i, it in enumerate(p.media_files) if i not in chosen]
+            at = max(0, min(op["to"], len(rest)))
+            p.media_files = rest[:at] + block + rest[at:]
+        elif kind == "reorder":
+            items = p.media_files
+            order = _order_by_keys(_slots(item_key(it) for it in items), len(items), op["keys"])
+            p.media_files = [items[i] for i in order]
+        elif kind == "patch" and op.get("field") in _PATCHABLE:
+            values = op["values"]
+            for it in p.media_files:
+                v = values.get(item_key(it))
+                if v is not None and hasattr(it, op["field"]):
+                    setattr(it, op["field"], v)
+
+
+def _rebase_op(keys: List[str], op: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Re-express ``op`` for a playlist whose items now have ``keys``.
+
+    Used when another process changed the playlist after this one computed
+    ``op``. Appends and patches apply as they are. Removes and moves name
+    each item by position and by key; every position is moved to the
+    nearest item that still has the same key, and items that are gone
+    meanwhile are skipped. Reorders name items by key only and also apply
+    as they are. Returns None for records that can't be remapped
+    (positional records written before they carried keys); "set" records
+    are returned unchanged and simply replace the playlist.
+    """
+    if op.get("op") not in ("remove", "move"):
+        return op
+    if "keys" not in op:
+        return None
+    slots = _slots(keys)
+    pairs = []
+    for i, key in zip(op["indices"], op["keys"]):
+        free = slots.get(key)
+        if not free:
+            continue  # removed elsewhere meanwhile
+        j = min(free, key=lambda j: abs(j - i))
+        free.remove(j)
+        pairs.append((j, key))
+    pairs.sort()
+    return dict(op, indices=[j for j, _ in pairs], keys=[key for _, key in pairs])
+
+
+def _op_names(op: Dict[str, Any]) -> List[str]:
+    # Playlist names a journal record reads or writes
+    return [op[k] for k in ("name", "old", "new", "playlist") if op.get(k) is not None]
+
+
+def _fsync_dir(path: str) -> None:
+    # Make the rename itself durable; not possible (or needed) on Windows
+    if os.name != "posix":
+        return
+    fd = os.open(path or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
 class PlaylistStorage:
-    def __init__(self, path: str = DEFAULT_PLAYLISTS_PATH):
+    """Playlists as a JSON snapshot plus an append-only journal of edits.
+
+    ``commit`` appends a few hundred bytes per edit to ``<path>.journal``;
+    once the journal outgrows the snapshot it is compacted by writing a new
+    snapshot to a temp file, fsyncing it and renaming it over ``path``.
+    Every record carries a sequence number and the snapshot stores the last
+    one it includes, so ``load`` replays exactly the records that came after
+    it, whether the last run crashed mid-append or mid-compaction.
+
+    Items are written as ``codec`` rows; ``compact=False`` writes the older
+    one-dict-per-item layout instead. Both layouts are always readable.
+
+    Several processes may share the files: every read and write happens under
+    an advisory lock on ``<path>.lock``, and the sequence number doubles as a
+    generation counter. Before appending, ``commit`` reads the records other
+    processes appended since it last looked; ``poll`` hands those over so the
+    caller can replay them (see ``PlaylistManager.sync``). When both sides
+    edited the same playlist, this process's records are rebased onto the
+    other process's (see ``_rebase_op``): appends and patches apply as they
+    are, removes and moves are remapped to the same items by key, and only a
+    ``set`` (a whole-playlist rewrite) still overrides the other side, which
+    is logged. The caller then reloads so it sees the merged result.
+    Compaction waits until the caller has seen every foreign record, since a
+    snapshot made without them would drop them.
+    """
+
+    def __init__(self, path: str = DEFAULT_PLAYLISTS_PATH, compact: bool = True):
         self.path = path
+        self.compact = compact
+        self.journal_path = path + ".journal"
+        # Byte offset of every playlist in the snapshot, so load() can return
+        # LazyPlaylists and decode a playlist only when it is first used
+        self.index_path = path + ".idx"
+        self._seq = 0
+        self._snapshot_bytes = 0
+        self._journal_bytes = 0
+        # Serialises snapshot reads (lazy loads) with snapshot rewrites and
+        # journal appends, across threads and processes
+        self._lock = FileLock(path + ".lock")
+        # (size, mtime, inode) of the snapshot as of our last read or write,
+        # and of the one our lazy playlists' spans point into
+        self._snapshot_id: Optional[tuple] = None
+        self._span_id: Optional[tuple] = None
+        # Records other processes appended that poll() has not handed out;
+        # _stale means they could not be tracked (another process compacted,
+        # or edits conflicted structurally) and load() is needed instead
+        self._incoming: List[Dict[str, Any]] = []
+        self._stale = False
+        # (snapshot id, name -> where its items are) for a snapshot another
+        # process wrote after our spans were taken; see _read_named
+        self._rewritten: Optional[Tuple[Optional[tuple], Dict[str, Any]]] = None
+
+    @property
+    def generation(self) -> int:
+        """Sequence number of the newest record seen; grows with every commit by any process."""
+        return self._seq
 
     def load(self) -> List[Playlist]:
-        if not os.path.exists(self.path):
-            return []
-        with open(self.path, "r", encoding="utf-8") as f:
-            raw = json.load(f)
-        playlists: List[Playlist] = []
+        with self._lock:
+            self._incoming, self._stale, self._rewritten = [], False, None
+            indexed = self._load_indexed()
+            playlists = indexed if indexed is not None else self._load_full()
+            self._snapshot_id = self._span_id = self._stat_snapshot()
+            self._replay(playlists)
+            if indexed is None and os.path.exists(self.path):
+                # Older or hand-edited file: rewrite it once in the indexed layout
+                self.save(list(playlists.values()))
+            return list(playlists.values())
+
+    def read(self) -> List[Playlist]:
+        """Fully parsed playlists, without modifying any file.
+
+        Unlike ``load`` this neither upgrades a legacy snapshot nor trims a
+        damaged journal tail, so a store can be copied elsewhere as is.
+        """
+        with self._lock:
+            playlists = self._load_full()
+            self._replay(playlists, repair=False)
+            return list(playlists.values())
+
+    def poll(self) -> Optional[List[Dict[str, Any]]]:
+        """Records other processes committed since the last ``poll`` or ``load``.
+
+        Returns None when they cannot be replayed on top of the caller's
+        state; the caller should ``load()`` again.
+        """
+        with self._lock:
+            self._catch_up()
+            if self._stale:
+                return None
+            ops, self._incoming = self._incoming, []
+            return ops
+
+    def _stat_snapshot(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns, st.st_ino
+
+    def _catch_up(self) -> None:
+        # Caller holds the lock
+        if self._stat_snapshot() != self._snapshot_id:
+            self._resync_foreign_snapshot()
+            return
+        try:
+            size = os.path.getsize(self.journal_path)
+        except OSError:
+            size = 0
+        if size < self._journal_bytes:
+            self._resync_foreign_snapshot()
+            return
+        if size == self._journal_bytes:
+            return
+        good = self._journal_bytes
+        with open(self.journal_path, "rb") as f:
+            f.seek(good)
+            data = f.read()
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                op = json.loads(line)
+            except ValueError:
+                break
+            good += len(line)
+            if op.get("seq", 0) > self._seq:
+                self._seq = op["seq"]
+                self._incoming.append(op)
+        if good < size:
+            # Torn tail from a writer that crashed; appending after it would
+            # hide our records from every later replay
+            logging.warning("Discarding damaged playlist journal tail at byte %d", good)
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(good)
+        self._journal_bytes = good
+
+    def _resync_foreign_snapshot(self) -> None:
+        # Another process compacted. Its snapshot already holds the records we
+        # had not read, which can no longer be told apart; only make sure our
+        # next records are numbered after everything on disk.
+        self._stale = True
+        self._incoming = []
+        seq = self._seq
+        try:
+            with open(self.path, "rb") as f:
+                m = _HEAD_SEQ_RE.match(f.read(64))
+            if m:
+                seq = max(seq, int(m.group(1)))
+        except OSError:
+            pass
+        good = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        break
+                    good += len(line)
+                    seq = max(seq, op.get("seq", 0))
+            if good < os.path.getsize(self.journal_path):
+                with open(self.journal_path, "r+b") as f:
+                    f.truncate(good)
+        self._seq = seq
+        self._journal_bytes = good
+        self._snapshot_id = self._stat_snapshot()
+        self._snapshot_bytes = self._snapshot_id[0] if self._snapshot_id else 0
+
+    def _load_indexed(self) -> Optional[Dict[str, Playlist]]:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                idx = json.load(f)
+            st = os.stat(self.path)
+        except (OSError, ValueError):
+            return None
+        if idx.get("size") != st.st_size or idx.get("mtime_ns") != st.st_mtime_ns:
+            return None  # snapshot changed after the index was written
+        self._seq = int(idx.get("seq", 0))
+        self._snapshot_bytes = st.st_size
+        return {
+            name: LazyPlaylist(name, self._read_span, _Span(name, offset, length))
+            for name, offset, length in idx.get("playlists", [])
+        }
+
+    def _load_full(self) -> Dict[str, Playlist]:
+        seq = 0
+        raw: Any = []
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f, codec.paused_gc():
+                raw = json.load(f)
+            self._snapshot_bytes = os.path.getsize(self.path)
+        if isinstance(raw, dict):
+            seq = int(raw.get("seq", 0))
+            raw = raw.get("playlists")
+        playlists: Dict[str, Playlist] = {}
         for p in raw or []:
-            items = [_dict_to_mediafile(it) for it in p.get("media_files", [])]
-            playlists.append(Playlist(name=p.get("name", ""), media_files=items))
+            playlists[p.get("name", "")] = Playlist(name=p.get("name", ""), media_files=_playlist_items(p))
+        self._seq = seq
+        return playlists
+
+    def _read_raw(self, span: _Span) -> bytes:
+        with self._lock, open(self.path, "rb") as f:
+            f.seek(span.offset)
+            return f.read(span.length)
+
+    def _read_span(self, span: _Span) -> List[MediaFile]:
+        with self._lock:
+            if self._stat_snapshot() != self._span_id:
+                # Rewritten by another process; the offsets are meaningless now
+                return self._read_named(span.name)
+            raw = self._read_raw(span)
+        with codec.paused_gc():
+            return _playlist_items(json.loads(raw))
+
+    def _read_named(self, name: str) -> List[MediaFile]:
+        # Caller holds the lock. The snapshot was rewritten elsewhere; look it
+        # up once per rewrite (through its own .idx if that is current, else
+        # one parse) and serve every unloaded playlist from that
+        self._stale = True
+        st = self._stat_snapshot()
+        if self._rewritten is None or self._rewritten[0] != st:
+            fresh = PlaylistStorage(self.path, self.compact)
+            fresh._lock = self._lock
+            where: Optional[Dict[str, Any]] = fresh._load_indexed()
+            if where is not None:
+                fresh._span_id = st
+            else:
+                raw: Any = []
+                if os.path.exists(self.path):
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        raw = json.load(f)
+                if isinstance(raw, dict):
+                    raw = raw.get("playlists")
+                where = {data.get("name", ""): data for data in raw or []}
+            self._rewritten = (st, where)
+        source = self._rewritten[1].get(name)
+        if source is None:
+            return []
+        if isinstance(source, LazyPlaylist):
+            return source.peek()
+        with codec.paused_gc():
+            return _playlist_items(source)
+
+    def _replay(self, playlists: Dict[str, Playlist], repair: bool = True) -> None:
+        self._journal_bytes = 0
+        if not os.path.exists(self.journal_path):
+            return
+        good = 0
+        with open(self.journal_path, "rb") as f:
+            for line in f:
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    # Torn write from a crash; drop it and everything after
+                    logging.warning("Discarding damaged playlist journal tail at byte %d", good)
+                    break
+                good += len(line)
+                if op.get("seq", 0) > self._seq:
+                    _apply_op(playlists, op)
+                    self._seq = op["seq"]
+        if repair and good < os.path.getsize(self.journal_path):
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(good)
+        self._journal_bytes = good
+
+    def commit(self, ops: Iterable[Dict[str, Any]], playlists: List[Playlist]) -> None:
+        """Record ``ops`` in the journal; ``playlists`` is the state they lead to.
+
+        A ``{"op": "snapshot"}`` record (state changed in ways no op
+        describes) or an oversized journal triggers a full ``save`` instead.
+        """
+        ops = list(ops)
+        if not ops:
+            return
+        with self._lock:
+            self._catch_up()
+            if any(op.get("op") == "snapshot" for op in ops):
+                self._save_merged(playlists)
+                return
+            ops = self._rebase(ops, playlists)
+            lines = []
+            for op in ops:
+                self._seq += 1
+                lines.append(json.dumps(dict(_encode_op(op, self.compact), seq=self._seq), separators=(",", ":")) + "\n")
+            data = "".join(lines).encode("utf-8")
+            with open(self.journal_path, "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self._journal_bytes += len(data)
+            if self._incoming or self._stale:
+                return  # ``playlists`` lacks other processes' edits; don't fold them away
+            if self._journal_bytes > max(COMPACT_MIN_BYTES, self._snapshot_bytes):
+                # The records are durable already; a failed compaction must not
+                # fail the commit, or a retry would append them a second time
+                try:
+                    self.save(playlists)
+                except OSError:
+                    logging.exception("Compacting the playlist journal failed; will retry on a later save")
+
+    def _rebase(self, ops: List[Dict[str, Any]], playlists: List[Playlist]) -> List[Dict[str, Any]]:
+        # Caller holds the lock. Our records were computed against the
+        # caller's state; when other processes' records (unseen by the
+        # caller) touch the same playlists, or the caller is already behind
+        # (stale), re-express ours against what is on disk
+        foreign = {n for op in self._incoming for n in _op_names(op)}
+        touched = {op["playlist"] for op in ops if op.get("playlist") is not None}
+        if not self._stale and not touched & foreign:
+            return ops
+        renamed: Dict[str, str] = {}
+        for op in self._incoming:
+            if op.get("op") == "rename":
+                renamed = {old: (op["new"] if new == op["old"] else new) for old, new in renamed.items()}
+                renamed[op["old"]] = op["new"]
+        disk = self._disk_playlists()
+        mine = {p.name: p for p in playlists}
+        settled: Set[str] = set()
+        out = []
+        for op in ops:
+            name = op.get("playlist")
+            if name is None:
+                _apply_op(disk, op)
+                out.append(op)
+                continue
+            if name in settled:
+                continue
+            target = renamed.get(name, name)
+            if target not in disk:
+                logging.warning("Playlist '%s' was deleted or renamed by another process; dropping an edit to it", name)
+                continue
+            rebased = _rebase_op([item_key(it) for it in disk[target].media_files], dict(op, playlist=target))
+            if rebased is None or (rebased.get("op") == "set" and name in foreign):
+                logging.warning("Playlist '%s' was changed by another process too; keeping this process's version", name)
+                if rebased is None:
+                    # Write our final state once; the rest of our records for it are in there
+                    rebased = {"op": "set", "playlist": target, "items": list(mine[name].media_files)} if name in mine else None
+                    settled.add(name)
+                    if rebased is None:
+                        continue
+            _apply_op(disk, _encode_op(rebased))
+            out.append(rebased)
+        # The caller's copies lack the other side's edits; have it reload
+        self._stale = True
+        return out
+
+    def _disk_playlists(self) -> Dict[str, Playlist]:
+        # Caller holds the lock. What load() would return, without its side
+        # effects; only playlists that are then used get decoded
+        fresh = PlaylistStorage(self.path, self.compact)
+        fresh._lock = self._lock
+        playlists = fresh._load_indexed()
+        if playlists is None:
+            playlists = fresh._load_full()
+        fresh._snapshot_id = fresh._span_id = fresh._stat_snapshot()
+        fresh._replay(playlists)
         return playlists
 
+    def _save_merged(self, playlists: List[Playlist]) -> None:
+        # A full snapshot of our state; fold in other processes' unseen
+        # records first so they are not lost, and have the caller reload
+        if self._incoming:
+            merged = {p.name: detach(p) for p in playlists}
+            for op in self._incoming:
+                _apply_op(merged, op)
+            playlists = list(merged.values())
+            self._incoming = []
+            self._stale = True
+        self.save(playlists)
+
     def save(self, playlists: List[Playlist]) -> None:
-        wire = []
-        for p in playlists:
-            wire.append(
-                {
-                    "name": p.name,
-                    "media_files": [_mediafile_to_dict(it) for it in p.media_files],
-                }
-            )
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(wire, f, indent=2)
+        """Write a complete snapshot atomically and reset the journal.
+
+        One playlist per line; playlists that were never loaded are copied
+        over byte for byte instead of being decoded and re-encoded. Every
+        offset after the first changed playlist moves, so the ``.idx`` is
+        rewritten whole too: a save is O(all playlists), which ``commit``
+        amortises by only compacting once the journal outgrows the snapshot.
+        """
+        with self._lock:
+            buf = bytearray(b'{"seq":%d,"playlists":[\n' % self._seq)
+            entries = []
+            moved = []
+            spans_valid = self._stat_snapshot() == self._span_id
+            for i, p in enumerate(playlists):
+                if i:
+                    buf += b",\n"
+                if spans_valid and isinstance(p, LazyPlaylist) and p.unloaded_from(self._read_span):
+                    chunk = self._read_raw(p.source)
+                    if p.source.name != p.name:  # renamed without being loaded
+                        chunk = json.dumps(dict(json.loads(chunk), name=p.name), separators=(",", ":")).encode()
+                    moved.append((p.source, p.name, len(buf), len(chunk)))
+                else:
+                    chunk = _playlist_to_json(p, self.compact)
+                entries.append([p.name, len(buf), len(chunk)])
+                buf += chunk
+            buf += b"\n]}\n"
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(buf)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            _fsync_dir(os.path.dirname(self.path))
+            # Unloaded playlists (and copies sharing their span) now live at new offsets
+            for span, name, offset, length in moved:
+                span.name, span.offset, span.length = name, offset, length
+            st = os.stat(self.path)
+            self._snapshot_bytes = st.st_size
+            self._snapshot_id = (st.st_size, st.st_mtime_ns, st.st_ino)
+            if spans_valid:
+                self._span_id = self._snapshot_id
+            idx = {"seq": self._seq, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "playlists": entries}
+            with open(self.index_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(idx, f, separators=(",", ":"))
+            os.replace(self.index_path + ".tmp", self.index_path)
+            # Records up to self._seq are in the snapshot now; a crash before this
+            # truncation is harmless because load() skips them by sequence number
+            if self._journal_bytes or os.path.exists(self.journal_path):
+                with open(self.journal_path, "wb"):
+                    pass
+            self._journal_bytes = 0
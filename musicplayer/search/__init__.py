@@ -1,5 +1,7 @@
 __all__ = [
     "search_local",
+    "iter_search_local",
+    "search_local_ranked",
     "search_youtube",
     "search_soundcloud",
 ]
\ No newline at end of file
@@ -0,0 +1,144 @@
+"""Two-tier cache of API responses for the shared HTTP client.
+
+Recently used responses are held in an in-memory LRU, so a repeated search
+is answered without touching the disk or the network. Behind it, responses
+are kept in a SQLite file (``http_cache.db``) that survives restarts. Each
+entry has an expiry time. Once it passes, the entry is revalidated with
+``If-None-Match`` against the ETag the API sent; a ``304`` renews the entry
+without downloading the body again. The file is capped at ``max_bytes``: when
+it grows past that, the least recently used entries are evicted.
+
+Entries are keyed on the URL plus the sorted query parameters with
+whitespace collapsed. The API key is left out of the key, so it never ends
+up on disk, and changing it keeps the cache valid.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+
+DEFAULT_CACHE_PATH = os.path.join(os.getcwd(), "http_cache.db")
+
+# Query parameters that identify the caller rather than the resource
+_UNKEYED = frozenset({"key", "client_id"})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    etag TEXT,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed);
+"""
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: Optional[str]
+    expires: float  # time.time() after which the entry must be revalidated
+
+
+def cache_key(url: str, params: Optional[dict] = None) -> str:
+    items = sorted(
+        (str(k), " ".join(str(v).split())) for k, v in (params or {}).items() if k not in _UNKEYED and v is not None
+    )
+    return f"{url}?{urllib.parse.urlencode(items)}" if items else url
+
+
+class ResponseCache:
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, memory_items: int = 256, max_bytes: int = 32 * 1024 * 1024):
+        self.path = path
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self._memory: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """The stored entry for ``key``, fresh or expired, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+            row = self._conn.execute("SELECT body, etag, expires FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            entry = CachedResponse(bytes(row[0]), row[1], row[2])
+            with self._conn:
+                self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._remember(key, entry)
+            return entry
+
+    def put(self, key: str, body: bytes, etag: Optional[str], ttl: float) -> CachedResponse:
+        now = time.time()
+        entry = CachedResponse(body, etag, now + ttl)
+        with self._lock:
+            self._remember(key, entry)
+            if len(body) > self.max_bytes:
+                return entry  # kept in memory only
+            with self._conn:
+                old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                self._conn.execute(
+                    "INSERT INTO responses(key, body, etag, expires, accessed, size) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET body = excluded.body, etag = excluded.etag, "
+                    "expires = excluded.expires, accessed = excluded.accessed, size = excluded.size",
+                    (key, body, etag, entry.expires, now, len(body)),
+                )
+                self._size += len(body) - (old[0] if old else 0)
+                if self._size > self.max_bytes:
+                    self._evict()
+        return entry
+
+    def renew(self, key: str, entry: CachedResponse, ttl: float) -> CachedResponse:
+        """Extend an entry the server confirmed unchanged (``304``)."""
+        now = time.time()
+        entry = entry._replace(expires=now + ttl)
+        with self._lock, self._conn:
+            self._remember(key, entry)
+            self._conn.execute(
+                "UPDATE responses SET expires = ?, accessed = ? WHERE key = ?", (entry.expires, now, key)
+            )
+        return entry
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM responses")
+            self._size = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _remember(self, key: str, entry: CachedResponse) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict(self) -> None:
+        # Down to 90% of the cap so eviction doesn't run on every put
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+        gone = []
+        for key, size in rows:
+            if self._size <= target:
+                break
+            gone.append((key,))
+            self._size -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", gone)
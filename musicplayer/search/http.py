@@ -0,0 +1,157 @@
+"""Shared HTTP client for the online providers.
+
+Every request to YouTube/SoundCloud goes through one ``requests.Session``,
+so connections are kept alive and reused (one TCP+TLS handshake per host
+instead of per request), responses are gzip-compressed, and timeouts and
+retries are applied in one place. Transient failures (connection errors,
+429 and 5xx) are retried with exponential backoff, honouring Retry-After.
+
+Requests made with a ``ttl`` are answered from the client's response cache
+(see ``cache.py``) while the stored copy is fresh, and revalidated with its
+ETag once it is not.
+
+API base URLs are module attributes (overridable through the
+``MUSICPLAYER_YOUTUBE_API`` / ``MUSICPLAYER_SOUNDCLOUD_API`` environment
+variables) so the providers can be pointed at a local stand-in server.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+from ..version import __version__
+from .cache import CachedResponse, ResponseCache, cache_key
+
+YOUTUBE_API_BASE = os.environ.get("MUSICPLAYER_YOUTUBE_API", "https://www.googleapis.com/youtube/v3")
+SOUNDCLOUD_API_BASE = os.environ.get("MUSICPLAYER_SOUNDCLOUD_API", "https://api.soundcloud.com")
+
+DEFAULT_TIMEOUT = 15.0
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_RETRIES = 3
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+def youtube_url(endpoint: str) -> str:
+    return f"{YOUTUBE_API_BASE.rstrip('/')}/{endpoint}"
+
+
+def soundcloud_url(endpoint: str) -> str:
+    return f"{SOUNDCLOUD_API_BASE.rstrip('/')}/{endpoint}"
+
+
+class HttpClient:
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = 0.5,
+        pool_size: int = 16,
+        cache: Optional[ResponseCache] = None,
+    ) -> None:
+        self.timeout: Timeout = (connect_timeout, timeout)
+        self.cache = cache
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            respect_retry_after_header=True,
+            # Hand the last response back so callers can report it
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(
+            {"Accept-Encoding": "gzip, deflate", "User-Agent": f"MusicPlayer/{__version__}"}
+        )
+
+    def get(
+        self,
+        url: str,
+        params: Optional[dict] = None,
+        timeout: Optional[Timeout] = None,
+        ttl: Optional[float] = None,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """GET ``url``; with ``ttl`` (seconds), successful responses are cached for that long."""
+        if ttl is None or self.cache is None:
+            return self.session.get(url, params=params, timeout=timeout or self.timeout, **kwargs)
+        key = cache_key(url, params)
+        entry = self.cache.get(key)
+        if entry is not None and entry.expires > time.time():
+            return _cached_response(url, entry)
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        r = self.session.get(url, params=params, timeout=timeout or self.timeout, headers=headers, **kwargs)
+        if r.status_code == 304 and entry is not None:
+            return _cached_response(url, self.cache.renew(key, entry, ttl))
+        if r.status_code == 200:
+            self.cache.put(key, r.content, r.headers.get("ETag"), ttl)
+        return r
+
+    def close(self) -> None:
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+
+def _cached_response(url: str, entry: CachedResponse) -> requests.Response:
+    r = requests.Response()
+    r.status_code = 200
+    r.url = url
+    r._content = entry.body
+    r.encoding = "utf-8"
+    r.headers = CaseInsensitiveDict({"Content-Type": "application/json; charset=UTF-8"})
+    if entry.etag:
+        r.headers["ETag"] = entry.etag
+    return r
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def client() -> HttpClient:
+    """The process-wide client, created on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def configure(**kwargs: Any) -> HttpClient:
+    """Replace the process-wide client with one built from ``kwargs``."""
+    global _client
+    new = HttpClient(**kwargs)
+    with _client_lock:
+        old, _client = _client, new
+    if old is not None:
+        if old.cache is new.cache:
+            old.cache = None  # handed over to the new client
+        old.close()
+    return new
+
+
+def get(
+    url: str,
+    params: Optional[dict] = None,
+    timeout: Optional[Timeout] = None,
+    ttl: Optional[float] = None,
+    **kwargs: Any,
+) -> requests.Response:
+    return client().get(url, params=params, timeout=timeout, ttl=ttl, **kwargs)
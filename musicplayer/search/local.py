@@ -1,23 +1,45 @@
 import os
-from typing import List
+import threading
+import time
+from typing import TYPE_CHECKING, Iterator, List, Optional
 
 from models import MediaFile, SourceProvider
+from ..library.query import is_structured
+
+if TYPE_CHECKING:  # pragma: no cover
+    from ..library.index import LibraryIndex
 
 
 SUPPORTED_EXTS = {".mp3", ".wav", ".flac", ".ogg", ".m4a"}
 
+# Partial batches are flushed after this long so the first matches show up quickly
+_FLUSH_INTERVAL = 0.05
+
+
+def search_local(
+    root: str, query: str = "", index: Optional["LibraryIndex"] = None, workers: int = 1
+) -> List[MediaFile]:
+    """Search local media under ``root``.
+
+    With a ``LibraryIndex`` the query is answered from the index, which is
+    built on first use for ``root`` and refreshed separately, and may use the
+    field filters and sorting of ``library.query`` (``artist:x duration>300
+    sort:-mtime``). Without one the tree is walked (``workers`` sibling
+    directories at a time) and filenames are substring-matched.
+    """
+    if index is not None:
+        if not index.is_built_for(root):
+            index.refresh(root)
+        return index.search(query)
+    from ..library.scanner import walk_media
 
-def search_local(root: str, query: str = "") -> List[MediaFile]:
     results: List[MediaFile] = []
     q = (query or "").lower()
-    for dirpath, _, filenames in os.walk(root):
-        for fn in filenames:
-            ext = os.path.splitext(fn)[1].lower()
-            if ext not in SUPPORTED_EXTS:
-                continue
+    for _, files in walk_media(root, workers):
+        for full in files:
+            fn = os.path.basename(full)
             if q and q not in fn.lower():
                 continue
-            full = os.path.join(dirpath, fn)
             results.append(
                 MediaFile(
                     title=os.path.splitext(fn)[0],
@@ -28,3 +50,72 @@ def search_local(root: str, query: str = "") -> List[MediaFile]:
                 )
             )
     return results
+
+
+def search_local_ranked(root: str, query: str, index: "LibraryIndex", limit: int = 50) -> List[MediaFile]:
+    """Typo- and word-order-tolerant local search, best matches first.
+
+    Unlike ``search_local`` this always needs a ``LibraryIndex``; results are
+    ranked by trigram similarity over title, artist, album and path.
+    """
+    if not index.is_built_for(root):
+        index.refresh(root)
+    return index.fuzzy_search(query, limit=limit)
+
+
+def iter_search_local(
+    root: str,
+    query: str = "",
+    index: Optional["LibraryIndex"] = None,
+    batch_size: int = 200,
+    cancel: Optional[threading.Event] = None,
+    workers: int = 1,
+) -> Iterator[List[MediaFile]]:
+    """Streaming ``search_local``: yield matches in batches as they are found.
+
+    Uses ``index`` when it has already been built for ``root``; otherwise the
+    tree is walked and a partial batch is yielded at least every
+    ``_FLUSH_INTERVAL`` seconds. Structured queries need the index, which is
+    built first in that case. Setting ``cancel`` stops the search at the next
+    batch or directory boundary.
+    """
+    if index is not None and not index.is_built_for(root) and is_structured(query):
+        index.refresh(root)
+    if index is not None and index.is_built_for(root):
+        for batch in index.iter_search(query, batch_size):
+            if cancel is not None and cancel.is_set():
+                return
+            yield batch
+        return
+    from ..library.scanner import walk_media
+
+    q = (query or "").lower()
+    batch: List[MediaFile] = []
+    last_flush = 0.0  # first non-empty batch goes out immediately
+    walk = walk_media(root, workers)
+    try:
+        for _, files in walk:
+            if cancel is not None and cancel.is_set():
+                return
+            for full in files:
+                fn = os.path.basename(full)
+                if q and q not in fn.lower():
+                    continue
+                batch.append(
+                    MediaFile(
+                        title=os.path.splitext(fn)[0],
+                        artist="",
+                        duration=0,
+                        file_path=full,
+                        provider=SourceProvider.local,
+                    )
+                )
+            now = time.monotonic()
+            if batch and (len(batch) >= batch_size or now - last_flush >= _FLUSH_INTERVAL):
+                yield batch
+                batch = []
+                last_flush = now
+        if batch:
+            yield batch
+    finally:
+        walk.close()
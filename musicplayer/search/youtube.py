@@ -1,15 +1,28 @@
-from typing import List, Optional
+import logging
+import queue
+import sys
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 import re
 import urllib.parse
+
 import requests
 
 from models import OnlineMediaFile, SourceProvider
+from . import http
+
+# How long search results and single-video lookups are served from the
+# response cache before being revalidated
+SEARCH_CACHE_TTL = 6 * 3600
+VIDEO_CACHE_TTL = 24 * 3600
 
 
 def search_youtube(api_key: str, query: str, max_results: int = 10) -> List[OnlineMediaFile]:
     if not api_key:
         return []
-    url = "https://www.googleapis.com/youtube/v3/search"
+    url = http.youtube_url("search")
     params = {
         "part": "snippet",
         "q": query,
@@ -17,7 +30,7 @@ def search_youtube(api_key: str, query: str, max_results: int = 10) -> List[Onli
         "maxResults": max_results,
         "key": api_key,
     }
-    r = requests.get(url, params=params, timeout=10)
+    r = http.get(url, params=params, ttl=SEARCH_CACHE_TTL)
     r.raise_for_status()
     data = r.json()
     items = []
@@ -96,6 +109,244 @@ def _parse_iso8601_duration(value: str) -> int:
     return total
 
 
+# videos.list accepts at most this many IDs per call
+VIDEOS_PER_REQUEST = 50
+
+
+def _availability(meta: dict, region: Optional[str] = None) -> str:
+    status = meta.get('status') or {}
+    if status.get('uploadStatus') not in (None, 'processed', 'uploaded'):
+        return 'unavailable'  # rejected, deleted or failed
+    if status.get('privacyStatus') == 'private':
+        return 'private'  # only listed for the owner's own key
+    restriction = (meta.get('contentDetails') or {}).get('regionRestriction') or {}
+    if region and (
+        region in (restriction.get('blocked') or ())
+        or ('allowed' in restriction and region not in restriction['allowed'])
+    ):
+        return 'region_blocked'
+    if status.get('embeddable') is False:
+        return 'not_embeddable'  # playback here goes through the embed player
+    return status.get('privacyStatus') or 'public'
+
+
+def _fetch_video_batch(api_key: str, ids: List[str], parts: str, region: Optional[str]) -> Dict[str, dict]:
+    params = {
+        'part': parts,
+        'id': ','.join(ids),
+        'maxResults': len(ids),
+        'key': api_key,
+    }
+    r = http.get(http.youtube_url('videos'), params=params)
+    r.raise_for_status()
+    details: Dict[str, dict] = {}
+    for meta in r.json().get('items') or []:
+        d = details[meta.get('id')] = {'availability': _availability(meta, region)}
+        if 'snippet' in meta:
+            snippet = meta['snippet'] or {}
+            thumbs = snippet.get('thumbnails') or {}
+            d.update(
+                title=snippet.get('title') or '',
+                channel=snippet.get('channelTitle') or '',
+                duration=_parse_iso8601_duration((meta.get('contentDetails') or {}).get('duration') or ''),
+                thumbnail_url=(thumbs.get('medium') or thumbs.get('default') or {}).get('url'),
+            )
+    # Deleted and private videos are simply left out of the response
+    for vid in ids:
+        details.setdefault(vid, {'availability': 'unavailable'})
+    return details
+
+
+def fetch_video_details(
+    api_key: str,
+    video_ids: Iterable[str],
+    workers: int = 4,
+    parts: str = 'snippet,contentDetails,status',
+    region: Optional[str] = None,
+) -> Dict[str, dict]:
+    """Details of many videos with one videos.list call per 50 IDs.
+
+    The calls run ``workers`` at a time over the shared HTTP session. Each
+    value has ``availability``; videos the API returned also have
+    ``title``, ``channel``, ``duration`` (seconds) and ``thumbnail_url``
+    when ``parts`` includes the snippet. With ``region`` (an ISO 3166 code),
+    videos not viewable there are reported as ``'region_blocked'``.
+    """
+    ids = list(dict.fromkeys(v for v in video_ids if v))
+    if not api_key or not ids:
+        return {}
+    batches = [ids[i:i + VIDEOS_PER_REQUEST] for i in range(0, len(ids), VIDEOS_PER_REQUEST)]
+    details: Dict[str, dict] = {}
+    if len(batches) == 1 or workers <= 1:
+        for batch in batches:
+            details.update(_fetch_video_batch(api_key, batch, parts, region))
+        return details
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='youtube-videos') as pool:
+        for found in pool.map(lambda b: _fetch_video_batch(api_key, b, parts, region), batches):
+            details.update(found)
+    return details
+
+
+def enrich(api_key: str, items: Iterable[OnlineMediaFile], workers: int = 4) -> int:
+    """Fill durations, canonical titles/channels and availability of YouTube items in place.
+
+    Returns the number of items updated. Items the API no longer returns
+    keep their data and are marked ``availability='unavailable'``.
+    """
+    targets = [it for it in items if it.provider == SourceProvider.youtube and it.source_id]
+    details = fetch_video_details(api_key, (it.source_id for it in targets), workers)
+    touched = 0
+    for it in targets:
+        d = details.get(it.source_id)
+        if not d:
+            continue
+        if 'title' in d:
+            it.title = d['title'] or it.title
+            it.artist = sys.intern(d['channel']) if d['channel'] else it.artist
+            it.duration = d['duration'] or it.duration
+            if d['thumbnail_url']:
+                it.thumbnail_url = d['thumbnail_url']
+        it.availability = sys.intern(d['availability'])
+        touched += 1
+    return touched
+
+
+# Only what the import reads; keeps playlistItems pages small
+_PLAYLIST_ITEM_FIELDS = (
+    'nextPageToken,pageInfo/totalResults,'
+    'items/snippet(title,channelTitle,videoOwnerChannelTitle,resourceId/videoId,thumbnails/default/url)'
+)
+
+
+class PlaylistPage(NamedTuple):
+    items: List[OnlineMediaFile]
+    title: str  # channel of the first item; the default name for the import
+    total: int  # items the playlist reports, deleted/private ones included
+    warning: Optional[str] = None  # why the page's details could not be looked up
+
+
+def _playlist_pages(api_key: str, playlist_id: str, stop: threading.Event) -> Iterator[dict]:
+    params = {
+        'part': 'snippet',
+        'playlistId': playlist_id,
+        'maxResults': 50,
+        'fields': _PLAYLIST_ITEM_FIELDS,
+        'key': api_key,
+    }
+    while not stop.is_set():
+        r = http.get(http.youtube_url('playlistItems'), params=params)
+        if r.status_code != 200:
+            if r.status_code in (401, 403):
+                raise RuntimeError('YouTube playlist is private or inaccessible (HTTP 403/401).')
+            raise RuntimeError(f'YouTube API error {r.status_code}: {r.text[:200]}')
+        data = r.json()
+        yield data
+        token = data.get('nextPageToken')
+        if not token:
+            return
+        params['pageToken'] = token
+
+
+def _page_items(data: dict) -> List[OnlineMediaFile]:
+    items = []
+    for it in data.get('items') or []:
+        snip = it.get('snippet') or {}
+        vid = (snip.get('resourceId') or {}).get('videoId')
+        if not vid:
+            continue
+        items.append(
+            OnlineMediaFile(
+                title=snip.get('title') or '(untitled)',
+                artist=snip.get('videoOwnerChannelTitle') or snip.get('channelTitle') or '',
+                duration=0,
+                file_path='',
+                provider=SourceProvider.youtube,
+                url=f'https://www.youtube.com/watch?v={vid}',
+                source_id=vid,
+                thumbnail_url=((snip.get('thumbnails') or {}).get('default') or {}).get('url'),
+            )
+        )
+    return items
+
+
+def _enrich_page(api_key: str, items: List[OnlineMediaFile]) -> Optional[str]:
+    # playlistItems has no durations; one videos.list call fills them (and
+    # availability) for the page. The items are still usable without, so a
+    # failed call (quota, key, network) is returned for the caller to report
+    try:
+        enrich(api_key, items, workers=1)
+    except requests.RequestException as e:
+        logging.warning("Could not look up details of %d playlist items: %s", len(items), e)
+        return str(e)
+    return None
+
+
+def iter_playlist(api_key: str, playlist_id: str, workers: int = 4, prefetch: int = 4) -> Iterator[PlaylistPage]:
+    """Stream the items of a YouTube playlist page by page, in playlist order.
+
+    Each page needs the previous page's token, so a background thread walks
+    the pages (up to ``prefetch`` ahead of the consumer) while earlier pages
+    are enriched on a pool of ``workers``. A page is yielded as soon as it
+    and the pages before it are enriched, so the first items arrive after
+    two round trips and the whole import takes about as long as fetching
+    the pages. Closing the iterator stops the fetching.
+    """
+    pages: 'queue.Queue[object]' = queue.Queue(maxsize=max(1, prefetch))
+    stop = threading.Event()
+    end = object()
+
+    def put(value: object) -> None:
+        while not stop.is_set():
+            try:
+                pages.put(value, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def fetch() -> None:
+        try:
+            for data in _playlist_pages(api_key, playlist_id, stop):
+                put(data)
+        except Exception as e:
+            put(e)
+        put(end)
+
+    threading.Thread(target=fetch, name='youtube-playlist', daemon=True).start()
+    pending: Deque[Tuple[Future, List[OnlineMediaFile], int]] = deque()
+    title: Optional[str] = None
+    error: Optional[Exception] = None
+    done = False
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='youtube-videos') as pool:
+            while not done or pending:
+                if not done:
+                    try:
+                        # Only block on the network when nothing is ready to yield
+                        data = pages.get(timeout=0.05 if pending else None)
+                    except queue.Empty:
+                        data = None
+                    if data is end:
+                        done = True
+                    elif isinstance(data, Exception):
+                        # Hand over what was fetched before the failure first
+                        error, done = data, True
+                    elif isinstance(data, dict):
+                        items = _page_items(data)
+                        if title is None:
+                            first = (data.get('items') or [{}])[0].get('snippet') or {}
+                            title = first.get('channelTitle') or 'YouTube Playlist'
+                        total = int((data.get('pageInfo') or {}).get('totalResults') or 0)
+                        pending.append((pool.submit(_enrich_page, api_key, items), items, total))
+                while pending and (done or pending[0][0].done()):
+                    future, items, total = pending.popleft()
+                    warning = future.result()
+                    yield PlaylistPage(items, title or 'YouTube Playlist', total, warning)
+    finally:
+        stop.set()
+    if error is not None:
+        raise error
+
+
 def from_url(api_key: str, url: str) -> Optional[OnlineMediaFile]:
     """Fetch a single YouTube video by URL. Returns None if not resolvable.
 
@@ -106,13 +357,13 @@ def from_url(api_key: str, url: str) -> Optional[OnlineMediaFile]:
     vid = _extract_video_id(url)
     if not vid:
         return None
-    endpoint = 'https://www.googleapis.com/youtube/v3/videos'
+    endpoint = http.youtube_url('videos')
     params = {
-        'part': 'snippet,contentDetails',
+        'part': 'snippet,contentDetails,status',
         'id': vid,
         'key': api_key,
     }
-    r = requests.get(endpoint, params=params, timeout=10)
+    r = http.get(endpoint, params=params, ttl=VIDEO_CACHE_TTL)
     if r.status_code != 200:
         try:
             r.raise_for_status()
@@ -140,5 +391,6 @@ def from_url(api_key: str, url: str) -> Optional[OnlineMediaFile]:
         provider=SourceProvider.youtube,
         url=watch_url,
         source_id=vid,
-        thumbnail_url=thumb.get('url')
+        thumbnail_url=thumb.get('url'),
+        availability=_availability(meta),
     )
@@ -0,0 +1,31 @@
+"""File URIs written to XSPF must read back as the same path."""
+
+import io
+import nturl2path
+import pathlib
+
+import pytest
+
+from models import MediaFile
+from musicplayer.playlist.formats import _path_from_uri, iter_xspf, write_xspf
+
+
+@pytest.mark.parametrize(
+    "path, uri",
+    [
+        (r"C:\Music\a b.mp3", "file:///C:/Music/a%20b.mp3"),
+        (r"\\nas\share\x#y.mp3", "file://nas/share/x%23y.mp3"),
+    ],
+)
+def test_windows_file_uri_round_trip(path, uri):
+    assert pathlib.PureWindowsPath(path).as_uri() == uri
+    assert _path_from_uri(uri, nturl2path.url2pathname) == path
+
+
+def test_xspf_local_round_trip(tmp_path):
+    path = str(tmp_path / "a b#1.mp3")
+    out = io.StringIO()
+    write_xspf(out, [MediaFile(title="t", artist="", duration=0, file_path=path)])
+    (entry,) = iter_xspf(io.BytesIO(out.getvalue().encode("utf-8")))
+    assert entry.location.startswith("file:///")
+    assert _path_from_uri(entry.location) == path
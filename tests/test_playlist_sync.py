@@ -0,0 +1,83 @@
+"""Two managers sharing one store: concurrent edits to a playlist must merge."""
+
+import pytest
+
+from models import MediaFile
+from musicplayer.playlist.manager import PlaylistManager
+from musicplayer.playlist.sqlite_storage import SqlitePlaylistStorage
+from musicplayer.playlist.storage import PlaylistStorage
+
+
+def _item(n: int) -> MediaFile:
+    return MediaFile(title=f"t{n}", artist="", duration=0, file_path=f"/music/{n}.mp3")
+
+
+def _paths(pm: PlaylistManager, name: str = "p") -> list:
+    return [it.file_path for it in pm.get(name).media_files]
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def managers(request, tmp_path):
+    def storage():
+        if request.param == "json":
+            return PlaylistStorage(str(tmp_path / "playlists.json"))
+        return SqlitePlaylistStorage(str(tmp_path / "playlists.db"))
+
+    first = PlaylistManager(storage())
+    first.create("p")
+    first.add_many("p", [_item(n) for n in range(5)])
+    second = PlaylistManager(storage())
+    # Both views are loaded before either side edits
+    assert _paths(first) == _paths(second)
+    yield first, second
+    first.close()
+    second.close()
+
+
+def _converged(a: PlaylistManager, b: PlaylistManager) -> list:
+    a.sync()
+    b.sync()
+    assert _paths(a) == _paths(b)
+    return _paths(a)
+
+
+def test_add_then_remove_many(managers):
+    a, b = managers
+    a.add("p", _item(9))
+    b.remove_many("p", [0, 2])
+    assert _converged(a, b) == ["/music/1.mp3", "/music/3.mp3", "/music/4.mp3", "/music/9.mp3"]
+
+
+def test_remove_many_then_add(managers):
+    a, b = managers
+    b.remove_many("p", [0, 2])
+    a.add("p", _item(9))
+    assert _converged(a, b) == ["/music/1.mp3", "/music/3.mp3", "/music/4.mp3", "/music/9.mp3"]
+
+
+def test_add_then_move_many(managers):
+    a, b = managers
+    a.add("p", _item(9))
+    b.move_many("p", [0, 1], 3)
+    assert _converged(a, b) == [f"/music/{n}.mp3" for n in (2, 3, 4, 0, 1, 9)]
+
+
+def test_remove_shifted_by_other_remove(managers):
+    a, b = managers
+    a.remove_many("p", [0])
+    b.remove_many("p", [3])  # item 3, now at position 2 on disk
+    assert _converged(a, b) == ["/music/1.mp3", "/music/2.mp3", "/music/4.mp3"]
+
+
+def test_same_item_removed_twice(managers):
+    a, b = managers
+    a.remove_many("p", [1])
+    b.remove_many("p", [1])
+    assert _converged(a, b) == ["/music/0.mp3", "/music/2.mp3", "/music/3.mp3", "/music/4.mp3"]
+
+
+def test_add_then_reorder(managers):
+    a, b = managers
+    a.add("p", _item(9))
+    b.reorder("p", [f"local:/music/{n}.mp3" for n in (4, 1, 2, 3, 0)])
+    assert _converged(a, b) == [f"/music/{n}.mp3" for n in (4, 1, 2, 3, 0, 9)]